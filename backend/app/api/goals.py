@@ -1,21 +1,41 @@
 from __future__ import annotations
 
 import calendar
+import hashlib
 import json
 import sqlite3
 from datetime import date, datetime, time, timedelta
+from collections.abc import AsyncIterator
 from typing import Any, Literal
 
-from fastapi import APIRouter, Depends, Query
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, Depends, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from starlette.types import Receive, Scope, Send
 
+from app.api.reminder_policy import policy_to_dto
 from app.auth import require_auth
 from app.config import get_settings
-from app.db import get_connection, now_iso
+from app.db import fetch_returning, now_iso
+from app.db_executor import db_read, db_write
 from app.errors import APIError
+from app.event_archive import read_archived_events, read_event_counts
+from app.idempotency import IdempotencyKey, Rendered, idempotency_key, write_once
+from app.rollover import rollover_overdue_goals, user_today
+from app.snooze import get_snooze_waker
 
 SourceType = Literal["telegram", "mobile"]
 
+MAX_CALENDAR_RANGE_DAYS = 366
+DEFAULT_EVENTS_PAGE_SIZE = 100
+MAX_EVENTS_PAGE_SIZE = 500
+DEFAULT_CHANGES_PAGE_SIZE = 500
+MAX_CHANGES_PAGE_SIZE = 1000
+# 9 bound parameters per goal row keeps a statement well below SQLite's variable limit.
+INSERT_ROWS_PER_STATEMENT = 500
+MAX_NDJSON_LINE_BYTES = 64 * 1024
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl")
+
 router = APIRouter(prefix="/api/goals", tags=["goals"], dependencies=[Depends(require_auth)])
 
 
@@ -48,17 +68,6 @@ class ConfirmIn(BaseModel):
     confirmed: bool = True
 
 
-def _db() -> sqlite3.Connection:
-    return get_connection(get_settings().db_path)
-
-
-def _single_user_id(connection: sqlite3.Connection) -> int:
-    row = connection.execute("SELECT id FROM users ORDER BY id LIMIT 1").fetchone()
-    if row is None:
-        raise APIError("INTERNAL_ERROR", "Default user not initialized", 500)
-    return int(row["id"])
-
-
 def _normalize_title(title: str) -> str:
     value = title.strip()
     if not value:
@@ -86,7 +95,7 @@ def _normalize_time(value: str | None) -> str | None:
     return parsed.strftime("%H:%M")
 
 
-def _goal_to_dto(row: sqlite3.Row) -> dict[str, Any]:
+def goal_to_dto(row: sqlite3.Row) -> dict[str, Any]:
     return {
         "id": row["id"],
         "title": row["title"],
@@ -103,6 +112,7 @@ def _goal_to_dto(row: sqlite3.Row) -> dict[str, Any]:
         "canceled_at": row["canceled_at"],
         "created_at": row["created_at"],
         "updated_at": row["updated_at"],
+        "version": row["version"],
     }
 
 
@@ -127,19 +137,18 @@ def _create_event(
     payload: dict[str, Any] | None = None,
 ) -> sqlite3.Row:
     timestamp = now_iso()
-    cursor = connection.execute(
+    event = fetch_returning(
+        connection,
         """
-        INSERT INTO goal_action_events (goal_id, action_type, action_payload, source, created_at)
-        VALUES (?, ?, ?, ?, ?)
+        INSERT INTO goal_action_events (goal_id, action_type, action_payload, source, created_at, event_date)
+        VALUES (?, ?, ?, ?, ?, ?)
+        RETURNING *
         """,
-        (goal_id, action_type, json.dumps(payload or {}), source, timestamp),
+        (goal_id, action_type, json.dumps(payload or {}), source, timestamp, timestamp[:10]),
     )
-    event_id = cursor.lastrowid
-    if event_id is None:
+    if event is None:
         raise APIError("INTERNAL_ERROR", "Event insert failed", 500)
-    return connection.execute(
-        "SELECT * FROM goal_action_events WHERE id = ?", (int(event_id),)
-    ).fetchone()
+    return event
 
 
 def _fetch_goal(connection: sqlite3.Connection, user_id: int, goal_id: int) -> sqlite3.Row:
@@ -149,138 +158,354 @@ def _fetch_goal(connection: sqlite3.Connection, user_id: int, goal_id: int) -> s
     ).fetchone()
     if row is None:
         raise APIError("NOT_FOUND", "Goal not found", 404)
-    return _apply_snooze_expired(connection, row)
+    return row
 
 
-def _parse_dt(value: str) -> datetime:
-    try:
-        dt = datetime.fromisoformat(value)
-    except ValueError as exc:
-        raise APIError("INTERNAL_ERROR", "Invalid datetime in DB", 500) from exc
-    if dt.tzinfo is None:
-        return dt.astimezone()
-    return dt
+def _goal_etag(row: sqlite3.Row) -> str:
+    """ETag "<id>-<version>.<digest>" of the goal's DTO.
 
+    Reminder bookkeeping changes the DTO without bumping version, so the
+    digest keeps If-None-Match honest while If-Match compares the version only.
+    """
+    dto = json.dumps(goal_to_dto(row), sort_keys=True, separators=(",", ":"))
+    digest = hashlib.blake2b(dto.encode(), digest_size=6).hexdigest()
+    return f'"{row["id"]}-{row["version"]}.{digest}"'
 
-def _apply_snooze_expired(connection: sqlite3.Connection, row: sqlite3.Row) -> sqlite3.Row:
-    if row["status"] != "snoozed" or not row["snooze_until"]:
-        return row
 
-    snooze_until = _parse_dt(row["snooze_until"])
-    if datetime.now().astimezone() < snooze_until:
-        return row
+def _entity_tags(header: str) -> list[str]:
+    return [tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()]
 
-    timestamp = now_iso()
-    connection.execute(
-        """
-        UPDATE goals
-        SET status = 'active', snooze_until = NULL, updated_at = ?
-        WHERE id = ? AND status = 'snoozed'
-        """,
-        (timestamp, row["id"]),
-    )
-    refreshed = connection.execute("SELECT * FROM goals WHERE id = ?", (row["id"],)).fetchone()
-    if refreshed is None:
-        raise APIError("INTERNAL_ERROR", "Goal update failed", 500)
-    return refreshed
+
+def _if_none_match(if_none_match: str | None, etag: str) -> bool:
+    """True when an If-None-Match header matches the current ETag (weak comparison)."""
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in _entity_tags(if_none_match)
+
+
+def _if_match_versions(if_match: str | None, goal_id: int) -> list[int] | None:
+    """Versions accepted by an If-Match header; None when any version will do."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = []
+    for tag in _entity_tags(if_match):
+        prefix, _, version = tag.strip('"').partition("-")
+        # Tags without the digest (older responses) still name a version.
+        version = version.partition(".")[0]
+        if prefix == str(goal_id) and version.isdigit():
+            versions.append(int(version))
+    return versions
 
 
-def _assert_state(current: str, allowed: set[str], action: str) -> None:
-    if current not in allowed:
+def _transition_goal(
+    connection: sqlite3.Connection,
+    user_id: int,
+    goal_id: int,
+    allowed: tuple[str, ...],
+    action: str,
+    if_match: str | None,
+    set_sql: str,
+    set_params: tuple[Any, ...],
+) -> sqlite3.Row:
+    """Apply a state transition as one conditional UPDATE ... RETURNING.
+
+    The status (and, with If-Match, the version) check lives in the WHERE
+    clause, so concurrent requests cannot race between check and write. Only
+    when no row matched is the goal re-read to report 404, 409 or 412.
+    A snooze that has ended counts as 'active' even before the snooze waker
+    (which only runs in the worker that took the snooze) has woken it.
+    """
+    versions = _if_match_versions(if_match, goal_id)
+    timestamp = now_iso()
+    status_sql = f"status IN ({', '.join('?' * len(allowed))})"
+    params: list[Any] = [*set_params, goal_id, user_id, *allowed]
+    wakes_snooze = "active" in allowed and "snoozed" not in allowed
+    if wakes_snooze:
+        status_sql = f"({status_sql} OR (status = 'snoozed' AND julianday(snooze_until) <= julianday(?)))"
+        params.append(timestamp)
+    where = f"id = ? AND user_id = ? AND {status_sql}"
+    if versions is not None:
+        where += f" AND version IN ({', '.join('?' * len(versions))})"
+        params.extend(versions)
+
+    updated = None
+    if versions != []:
+        updated = fetch_returning(
+            connection,
+            f"""
+            UPDATE goals
+            SET {set_sql}, version = version + 1
+            WHERE {where}
+            RETURNING *
+            """,
+            params,
+        )
+    if updated is not None:
+        return updated
+
+    current = _fetch_goal(connection, user_id, goal_id)
+    snooze_ended = (
+        wakes_snooze
+        and current["status"] == "snoozed"
+        and current["snooze_until"] is not None
+        and datetime.fromisoformat(current["snooze_until"]).astimezone() <= datetime.fromisoformat(timestamp)
+    )
+    if current["status"] not in allowed and not snooze_ended:
         raise APIError(
             "CONFLICT_STATE",
-            f"Cannot {action} when goal status is '{current}'",
+            f"Cannot {action} when goal status is '{current['status']}'",
             409,
         )
+    raise APIError(
+        "PRECONDITION_FAILED",
+        f"Goal was modified, current ETag is {_goal_etag(current)}",
+        412,
+    )
 
 
-def _create_goal(connection: sqlite3.Connection, user_id: int, item: GoalCreateIn) -> sqlite3.Row:
+def _prepare_goal(item: GoalCreateIn) -> tuple[str, str | None, str, str | None, str | None, str]:
+    return (
+        _normalize_title(item.title),
+        item.note,
+        _normalize_date(item.target_date),
+        _normalize_time(item.target_time),
+        item.priority,
+        item.source,
+    )
+
+
+def _insert_goals(
+    connection: sqlite3.Connection,
+    user_id: int,
+    prepared: list[tuple[str, str | None, str, str | None, str | None, str]],
+) -> list[sqlite3.Row]:
+    """Insert already validated goals plus their 'created' events (a db_write job).
+
+    Goals go in as multi-row INSERT ... RETURNING statements and events via one
+    executemany, instead of four statements per goal.
+    """
     timestamp = now_iso()
-    title = _normalize_title(item.title)
-    target_date = _normalize_date(item.target_date)
-    target_time = _normalize_time(item.target_time)
+    rows: list[sqlite3.Row] = []
+    for start in range(0, len(prepared), INSERT_ROWS_PER_STATEMENT):
+        part = prepared[start:start + INSERT_ROWS_PER_STATEMENT]
+        values_sql = ", ".join(["(?, ?, ?, ?, ?, ?, 'active', ?, 0, ?, ?)"] * len(part))
+        params: list[Any] = []
+        for title, note, target_date, target_time, priority, source in part:
+            params.extend((user_id, title, note, target_date, target_time, priority, source, timestamp, timestamp))
+        inserted = connection.execute(
+            f"""
+            INSERT INTO goals (
+                user_id,
+                title,
+                note,
+                target_date,
+                target_time,
+                priority,
+                status,
+                created_from,
+                reminder_ignore_count,
+                created_at,
+                updated_at
+            ) VALUES {values_sql}
+            RETURNING *
+            """,
+            params,
+        ).fetchall()
+        if len(inserted) != len(part):
+            raise APIError("INTERNAL_ERROR", "Goal insert failed", 500)
+        rows.extend(sorted(inserted, key=lambda row: row["id"]))
 
-    cursor = connection.execute(
+    connection.executemany(
         """
-        INSERT INTO goals (
-            user_id,
-            title,
-            note,
-            target_date,
-            target_time,
-            priority,
-            status,
-            snooze_until,
-            created_from,
-            last_reminded_at,
-            reminder_ignore_count,
-            completed_at,
-            canceled_at,
-            created_at,
-            updated_at
-        ) VALUES (?, ?, ?, ?, ?, ?, 'active', NULL, ?, NULL, 0, NULL, NULL, ?, ?)
+        INSERT INTO goal_action_events (goal_id, action_type, action_payload, source, created_at, event_date)
+        VALUES (?, 'created', ?, ?, ?, ?)
         """,
-        (
-            user_id,
-            title,
-            item.note,
-            target_date,
-            target_time,
-            item.priority,
-            item.source,
-            timestamp,
-            timestamp,
-        ),
+        [
+            (row["id"], json.dumps({"target_date": row["target_date"]}), row["created_from"], timestamp, timestamp[:10])
+            for row in rows
+        ],
     )
-    raw_goal_id = cursor.lastrowid
-    if raw_goal_id is None:
-        raise APIError("INTERNAL_ERROR", "Goal insert failed", 500)
-    goal_id = int(raw_goal_id)
-    _create_event(connection, goal_id, "created", item.source, {"target_date": target_date})
-    row = connection.execute("SELECT * FROM goals WHERE id = ?", (goal_id,)).fetchone()
-    if row is None:
-        raise APIError("INTERNAL_ERROR", "Goal create failed", 500)
-    return row
+    return rows
 
 
 @router.post("")
-def create_goal(payload: GoalCreateIn) -> dict[str, object]:
-    with _db() as connection:
-        user_id = _single_user_id(connection)
-        goal = _create_goal(connection, user_id, payload)
-        connection.commit()
-        return {"ok": True, "data": {"goal": _goal_to_dto(goal)}}
+async def create_goal(
+    payload: GoalCreateIn,
+    response: Response,
+    user_id: int = Depends(require_auth),
+    idempotency: IdempotencyKey | None = Depends(idempotency_key),
+) -> Any:
+    prepared = _prepare_goal(payload)
+
+    def render(rows: list[sqlite3.Row]) -> Rendered:
+        return {"ok": True, "data": {"goal": goal_to_dto(rows[0])}}, {"ETag": _goal_etag(rows[0])}
+
+    return await write_once(
+        idempotency, response, lambda connection: _insert_goals(connection, user_id, [prepared]), render
+    )
 
 
 @router.post("/batch")
-def create_goals_batch(payload: GoalBatchIn) -> dict[str, object]:
+async def create_goals_batch(
+    payload: GoalBatchIn,
+    response: Response,
+    user_id: int = Depends(require_auth),
+    idempotency: IdempotencyKey | None = Depends(idempotency_key),
+) -> Any:
     if not payload.items:
         raise APIError("VALIDATION_ERROR", "items must not be empty", 400)
+    max_items = get_settings().batch_max_items
+    if len(payload.items) > max_items:
+        raise APIError(
+            "VALIDATION_ERROR",
+            f"items must have at most {max_items} entries; use /api/goals/batch/stream for more",
+            400,
+        )
+
+    # Validate everything before touching the database: the batch is all-or-nothing.
+    prepared = []
+    for index, item in enumerate(payload.items):
+        try:
+            prepared.append(_prepare_goal(item))
+        except APIError as exc:
+            raise APIError(exc.code, f"items[{index}]: {exc.message}", exc.status_code) from exc
+
+    def render(rows: list[sqlite3.Row]) -> Rendered:
+        body = {
+            "ok": True,
+            "data": {
+                "created_count": len(rows),
+                "goals": [goal_to_dto(row) for row in rows],
+            },
+        }
+        return body, {}
 
     try:
-        with _db() as connection:
-            user_id = _single_user_id(connection)
-            rows = [_create_goal(connection, user_id, item) for item in payload.items]
-            connection.commit()
-            return {
-                "ok": True,
-                "data": {
-                    "created_count": len(rows),
-                    "goals": [_goal_to_dto(row) for row in rows],
-                },
-            }
+        return await write_once(
+            idempotency, response, lambda connection: _insert_goals(connection, user_id, prepared), render
+        )
     except APIError:
         raise
     except Exception as exc:
         raise APIError("INTERNAL_ERROR", f"Batch operation failed: {str(exc)}", 500) from exc
 
 
+async def _insert_stream_chunk(
+    user_id: int,
+    chunk: list[tuple[int, tuple[str, str | None, str, str | None, str | None, str]]],
+) -> list[dict[str, Any]]:
+    try:
+        rows = await db_write(_insert_goals, user_id, [prepared for _, prepared in chunk])
+    except (APIError, sqlite3.Error) as exc:
+        code, message = (
+            (exc.code, exc.message)
+            if isinstance(exc, APIError)
+            else ("INTERNAL_ERROR", "Goal insert failed")
+        )
+        return [{"index": index, "ok": False, "error": {"code": code, "message": message}} for index, _ in chunk]
+    return [{"index": index, "ok": True, "goal": goal_to_dto(row)} for (index, _), row in zip(chunk, rows)]
+
+
+async def _stream_batch_results(request: Request, user_id: int) -> AsyncIterator[bytes]:
+    chunk_size = get_settings().batch_chunk_size
+    pending: list[dict[str, Any] | tuple[int, Any]] = []
+    created = failed = 0
+
+    async def flush() -> AsyncIterator[bytes]:
+        nonlocal created, failed
+        valid = [entry for entry in pending if isinstance(entry, tuple)]
+        inserted = iter(await _insert_stream_chunk(user_id, valid) if valid else [])
+        for entry in pending:
+            result = next(inserted) if isinstance(entry, tuple) else entry
+            if result["ok"]:
+                created += 1
+            else:
+                failed += 1
+            yield (json.dumps(result, ensure_ascii=False) + "\n").encode()
+        pending.clear()
+
+    index = 0
+    stream_error: APIError | None = None
+    try:
+        async for line in _ndjson_lines(request):
+            if not line.strip():
+                continue
+            try:
+                item = GoalCreateIn.model_validate_json(line)
+                pending.append((index, _prepare_goal(item)))
+            except ValidationError as exc:
+                message = exc.errors()[0].get("msg", "Invalid item") if exc.errors() else "Invalid item"
+                pending.append({"index": index, "ok": False, "error": {"code": "VALIDATION_ERROR", "message": message}})
+            except APIError as exc:
+                pending.append({"index": index, "ok": False, "error": {"code": exc.code, "message": exc.message}})
+            index += 1
+            if len(pending) >= chunk_size:
+                async for out in flush():
+                    yield out
+    except APIError as exc:
+        # Headers are already sent, so a broken stream is reported in-band.
+        stream_error = exc
+
+    async for out in flush():
+        yield out
+    summary: dict[str, Any] = {"received_count": index, "created_count": created, "failed_count": failed}
+    if stream_error is not None:
+        summary["error"] = {"code": stream_error.code, "message": stream_error.message}
+    yield (json.dumps({"summary": summary}) + "\n").encode()
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body generator keeps reading the request stream.
+
+    Starlette's default disconnect listener would consume the request body
+    messages; a client disconnect surfaces through request.stream() instead.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+
+
+async def _ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+        if len(buffer) > MAX_NDJSON_LINE_BYTES:
+            raise APIError("VALIDATION_ERROR", f"NDJSON line exceeds {MAX_NDJSON_LINE_BYTES} bytes", 400)
+    if buffer:
+        yield buffer
+
+
+@router.post("/batch/stream")
+async def create_goals_batch_stream(
+    request: Request,
+    user_id: int = Depends(require_auth),
+) -> StreamingResponse:
+    """NDJSON ingestion: one GoalCreateIn per request line, one result per response line.
+
+    Items are validated as they arrive and committed in chunks of
+    BATCH_CHUNK_SIZE, so invalid lines fail individually (partial success)
+    and memory stays bounded regardless of the batch size.
+    """
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith(NDJSON_MEDIA_TYPES):
+        raise APIError("VALIDATION_ERROR", "Content-Type must be application/x-ndjson", 400)
+    return _DuplexStreamingResponse(_stream_batch_results(request, user_id), media_type="application/x-ndjson")
+
+
 @router.get("")
-def list_goals(date_value: str = Query(..., alias="date")) -> dict[str, object]:
+async def list_goals(
+    date_value: str = Query(..., alias="date"),
+    user_id: int = Depends(require_auth),
+) -> dict[str, object]:
     target_date = _normalize_date(date_value)
-    with _db() as connection:
-        user_id = _single_user_id(connection)
-        rows = connection.execute(
+
+    def fetch(connection: sqlite3.Connection) -> list[sqlite3.Row]:
+        return connection.execute(
             """
             SELECT * FROM goals
             WHERE user_id = ? AND target_date = ?
@@ -297,19 +522,52 @@ def list_goals(date_value: str = Query(..., alias="date")) -> dict[str, object]:
             """,
             (user_id, target_date),
         ).fetchall()
-        normalized_rows = [_apply_snooze_expired(connection, row) for row in rows]
-        connection.commit()
-        return {
-            "ok": True,
-            "data": {
-                "date": target_date,
-                "items": [_goal_to_dto(row) for row in normalized_rows],
-            },
-        }
+
+    rows = await db_read(fetch)
+    return {
+        "ok": True,
+        "data": {
+            "date": target_date,
+            "items": [goal_to_dto(row) for row in rows],
+        },
+    }
+
+
+def _calendar_days(
+    connection: sqlite3.Connection,
+    user_id: int,
+    first_day: date,
+    last_day: date,
+) -> list[dict[str, Any]]:
+    rows = connection.execute(
+        """
+        SELECT target_date, status, cnt
+        FROM goal_daily_counts
+        WHERE user_id = ? AND target_date BETWEEN ? AND ?
+        """,
+        (user_id, first_day.isoformat(), last_day.isoformat()),
+    ).fetchall()
+
+    counts_by_date: dict[str, dict[str, int]] = {}
+    for row in rows:
+        counts_by_date.setdefault(row["target_date"], {})[row["status"]] = row["cnt"]
+
+    days_data = []
+    current = first_day
+    while current <= last_day:
+        target_date = current.isoformat()
+        counts = counts_by_date.get(target_date, {})
+        day = {status: counts.get(status, 0) for status in ("active", "snoozed", "completed", "canceled")}
+        days_data.append({"date": target_date, **day, "total": sum(day.values())})
+        current += timedelta(days=1)
+    return days_data
 
 
 @router.get("/calendar")
-def get_calendar(month: str = Query(...)) -> dict[str, object]:
+async def get_calendar(
+    month: str = Query(...),
+    user_id: int = Depends(require_auth),
+) -> dict[str, object]:
     try:
         year, month_num = map(int, month.split("-"))
     except (ValueError, IndexError) as exc:
@@ -318,166 +576,278 @@ def get_calendar(month: str = Query(...)) -> dict[str, object]:
     if month_num < 1 or month_num > 12:
         raise APIError("VALIDATION_ERROR", "month must be 01-12", 400)
 
-    with _db() as connection:
-        user_id = _single_user_id(connection)
-        month_cal = calendar.monthcalendar(year, month_num)
-        days_data = []
-
-        for week in month_cal:
-            for day_num in week:
-                if day_num == 0:
-                    continue
-
-                target_date = f"{year:04d}-{month_num:02d}-{day_num:02d}"
-                rows = connection.execute(
-                    """
-                    SELECT status, COUNT(*) as cnt
-                    FROM goals
-                    WHERE user_id = ? AND target_date = ?
-                    GROUP BY status
-                    """,
-                    (user_id, target_date),
-                ).fetchall()
-
-                counts = {"active": 0, "snoozed": 0, "completed": 0, "canceled": 0}
-                total = 0
-                for row in rows:
-                    counts[row["status"]] = row["cnt"]
-                    total += row["cnt"]
-
-                days_data.append({
-                    "date": target_date,
-                    "active": counts["active"],
-                    "snoozed": counts["snoozed"],
-                    "completed": counts["completed"],
-                    "canceled": counts["canceled"],
-                    "total": total,
-                })
-
-        return {
-            "ok": True,
-            "data": {
-                "month": month,
-                "days": days_data,
-            },
-        }
+    try:
+        first_day = date(year, month_num, 1)
+    except ValueError as exc:
+        raise APIError("VALIDATION_ERROR", "month must be YYYY-MM", 400) from exc
+    last_day = first_day.replace(day=calendar.monthrange(year, month_num)[1])
+
+    return {
+        "ok": True,
+        "data": {
+            "month": month,
+            "days": await db_read(_calendar_days, user_id, first_day, last_day),
+        },
+    }
+
+
+@router.get("/calendar/range")
+async def get_calendar_range(
+    from_value: str = Query(..., alias="from"),
+    to_value: str = Query(..., alias="to"),
+    user_id: int = Depends(require_auth),
+) -> dict[str, object]:
+    first_day = date.fromisoformat(_normalize_date(from_value))
+    last_day = date.fromisoformat(_normalize_date(to_value))
+    if first_day > last_day:
+        raise APIError("VALIDATION_ERROR", "from must not be after to", 400)
+    if (last_day - first_day).days >= MAX_CALENDAR_RANGE_DAYS:
+        raise APIError(
+            "VALIDATION_ERROR",
+            f"range must not exceed {MAX_CALENDAR_RANGE_DAYS} days",
+            400,
+        )
+
+    return {
+        "ok": True,
+        "data": {
+            "from": first_day.isoformat(),
+            "to": last_day.isoformat(),
+            "days": await db_read(_calendar_days, user_id, first_day, last_day),
+        },
+    }
+
+
+def _read_events(
+    connection: sqlite3.Connection,
+    user_id: int,
+    target_date: str,
+    before_id: int | None,
+    limit: int,
+) -> list[Any]:
+    # Keyset pagination, newest first: the next page starts below the last id seen.
+    query = """
+        SELECT e.* FROM goal_action_events e
+        JOIN goals g ON e.goal_id = g.id
+        WHERE e.event_date = ? AND g.user_id = ?
+    """
+    params: list[Any] = [target_date, user_id]
+    if before_id is not None:
+        query += " AND e.id < ?"
+        params.append(before_id)
+    query += " ORDER BY e.id DESC LIMIT ?"
+    params.append(limit)
+    rows: list[Any] = connection.execute(query, params).fetchall()
+    if len(rows) < limit:
+        # A day's archived events all have lower ids than its live ones.
+        below = rows[-1]["id"] if rows else before_id
+        rows += read_archived_events(connection, user_id, target_date, below, limit - len(rows))
+    return rows
 
 
 @router.get("/events")
-def list_events(date_value: str = Query(..., alias="date")) -> dict[str, object]:
+async def list_events(
+    date_value: str = Query(..., alias="date"),
+    before_id: int | None = Query(None, gt=0),
+    limit: int = Query(DEFAULT_EVENTS_PAGE_SIZE, ge=1, le=MAX_EVENTS_PAGE_SIZE),
+    user_id: int = Depends(require_auth),
+) -> dict[str, object]:
     target_date = _normalize_date(date_value)
+    rows = await db_read(_read_events, user_id, target_date, before_id, limit)
+
+    return {
+        "ok": True,
+        "data": {
+            "date": target_date,
+            "items": [_event_to_dto(row) for row in rows],
+            "next_before_id": rows[-1]["id"] if len(rows) == limit else None,
+        },
+    }
 
-    with _db() as connection:
-        user_id = _single_user_id(connection)
 
-        rows = connection.execute(
-            """
-            SELECT e.* FROM goal_action_events e
-            JOIN goals g ON e.goal_id = g.id
-            WHERE g.user_id = ? AND DATE(e.created_at) = ?
-            ORDER BY e.created_at DESC
-            """,
-            (user_id, target_date),
+@router.get("/events/summary")
+async def get_events_summary(
+    from_value: str = Query(..., alias="from"),
+    to_value: str = Query(..., alias="to"),
+    user_id: int = Depends(require_auth),
+) -> dict[str, object]:
+    first_day = date.fromisoformat(_normalize_date(from_value))
+    last_day = date.fromisoformat(_normalize_date(to_value))
+    if first_day > last_day:
+        raise APIError("VALIDATION_ERROR", "from must not be after to", 400)
+    if (last_day - first_day).days >= MAX_CALENDAR_RANGE_DAYS:
+        raise APIError(
+            "VALIDATION_ERROR",
+            f"range must not exceed {MAX_CALENDAR_RANGE_DAYS} days",
+            400,
+        )
+
+    return {
+        "ok": True,
+        "data": {
+            "from": first_day.isoformat(),
+            "to": last_day.isoformat(),
+            "days": await db_read(read_event_counts, user_id, first_day, last_day),
+        },
+    }
+
+
+def _read_changes(connection: sqlite3.Connection, user_id: int, since: int, limit: int) -> dict[str, Any]:
+    changes = connection.execute(
+        """
+        SELECT seq, entity, entity_id, deleted FROM sync_changes
+        WHERE user_id = ? AND seq > ?
+        ORDER BY seq
+        LIMIT ?
+        """,
+        (user_id, since, limit + 1),
+    ).fetchall()
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    goal_ids = [row["entity_id"] for row in changes if row["entity"] == "goal" and not row["deleted"]]
+    goals = []
+    if goal_ids:
+        placeholders = ",".join("?" * len(goal_ids))
+        goals = connection.execute(
+            f"SELECT * FROM goals WHERE user_id = ? AND id IN ({placeholders}) ORDER BY id",
+            (user_id, *goal_ids),
         ).fetchall()
+    policy = None
+    if any(row["entity"] == "policy" for row in changes):
+        policy = connection.execute("SELECT * FROM reminder_policies WHERE user_id = ?", (user_id,)).fetchone()
 
-        return {
-            "ok": True,
-            "data": {
-                "date": target_date,
-                "items": [_event_to_dto(row) for row in rows],
-            },
-        }
+    return {
+        "goals": [goal_to_dto(row) for row in goals],
+        "deleted_goal_ids": [row["entity_id"] for row in changes if row["entity"] == "goal" and row["deleted"]],
+        "policy": policy_to_dto(policy) if policy is not None else None,
+        "cursor": changes[-1]["seq"] if changes else since,
+        "has_more": has_more,
+    }
+
+
+@router.get("/changes")
+async def list_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_CHANGES_PAGE_SIZE, ge=1, le=MAX_CHANGES_PAGE_SIZE),
+    user_id: int = Depends(require_auth),
+) -> dict[str, object]:
+    # Each goal/policy has one sync_changes row carrying the seq of its latest
+    # write, so a page costs O(changes since the cursor), not O(all goals).
+    return {"ok": True, "data": await db_read(_read_changes, user_id, since, limit)}
+
+
+@router.get("/{goal_id}")
+async def get_goal(
+    goal_id: int,
+    request: Request,
+    response: Response,
+    user_id: int = Depends(require_auth),
+) -> Any:
+    goal = await db_read(_fetch_goal, user_id, goal_id)
+    etag = _goal_etag(goal)
+    if _if_none_match(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return {"ok": True, "data": {"goal": goal_to_dto(goal)}}
+
+
+def _action_result(result: tuple[sqlite3.Row, sqlite3.Row]) -> Rendered:
+    goal, event = result
+    body = {
+        "ok": True,
+        "data": {
+            "goal": goal_to_dto(goal),
+            "event": _event_to_dto(event),
+        },
+    }
+    return body, {"ETag": _goal_etag(goal)}
 
 
 @router.put("/{goal_id}")
-def update_goal(goal_id: int, payload: GoalUpdateIn) -> dict[str, object]:
+async def update_goal(
+    goal_id: int,
+    payload: GoalUpdateIn,
+    response: Response,
+    if_match: str | None = Header(None),
+    user_id: int = Depends(require_auth),
+    idempotency: IdempotencyKey | None = Depends(idempotency_key),
+) -> Any:
     if payload.model_dump(exclude_none=True) == {}:
         raise APIError("VALIDATION_ERROR", "No fields provided for update", 400)
 
-    with _db() as connection:
-        user_id = _single_user_id(connection)
-        goal = _fetch_goal(connection, user_id, goal_id)
-        _assert_state(goal["status"], {"active", "snoozed"}, "update")
-
-        title = _normalize_title(payload.title) if payload.title is not None else goal["title"]
-        target_date = _normalize_date(payload.target_date) if payload.target_date is not None else goal["target_date"]
-        target_time = _normalize_time(payload.target_time) if payload.target_time is not None else goal["target_time"]
-        note = payload.note if payload.note is not None else goal["note"]
-        priority = payload.priority if payload.priority is not None else goal["priority"]
-        timestamp = now_iso()
+    title = _normalize_title(payload.title) if payload.title is not None else None
+    target_date = _normalize_date(payload.target_date) if payload.target_date is not None else None
+    target_time = _normalize_time(payload.target_time) if payload.target_time is not None else None
 
-        connection.execute(
+    def update(connection: sqlite3.Connection) -> tuple[sqlite3.Row, sqlite3.Row]:
+        updated = _transition_goal(
+            connection,
+            user_id,
+            goal_id,
+            ("active", "snoozed"),
+            "update",
+            if_match,
             """
-            UPDATE goals
-            SET title = ?, note = ?, target_date = ?, target_time = ?, priority = ?, updated_at = ?
-            WHERE id = ?
+            title = COALESCE(?, title), note = COALESCE(?, note), target_date = COALESCE(?, target_date),
+            target_time = COALESCE(?, target_time), priority = COALESCE(?, priority), updated_at = ?
             """,
-            (title, note, target_date, target_time, priority, timestamp, goal_id),
+            (title, payload.note, target_date, target_time, payload.priority, now_iso()),
         )
-        event = _create_event(connection, goal_id, "updated", "mobile")
-        updated = connection.execute("SELECT * FROM goals WHERE id = ?", (goal_id,)).fetchone()
-        connection.commit()
-
-        if updated is None:
-            raise APIError("INTERNAL_ERROR", "Goal update failed", 500)
+        return updated, _create_event(connection, goal_id, "updated", "mobile")
 
-        return {
-            "ok": True,
-            "data": {
-                "goal": _goal_to_dto(updated),
-                "event": _event_to_dto(event),
-            },
-        }
+    return await write_once(idempotency, response, update, _action_result)
 
 
 @router.post("/{goal_id}/complete")
-def complete_goal(goal_id: int, _: ConfirmIn | None = None) -> dict[str, object]:
-    with _db() as connection:
-        user_id = _single_user_id(connection)
-        goal = _fetch_goal(connection, user_id, goal_id)
-        _assert_state(goal["status"], {"active", "snoozed"}, "complete")
-
+async def complete_goal(
+    goal_id: int,
+    response: Response,
+    _: ConfirmIn | None = None,
+    if_match: str | None = Header(None),
+    user_id: int = Depends(require_auth),
+    idempotency: IdempotencyKey | None = Depends(idempotency_key),
+) -> Any:
+    def complete(connection: sqlite3.Connection) -> tuple[sqlite3.Row, sqlite3.Row]:
         timestamp = now_iso()
-        connection.execute(
-            """
-            UPDATE goals
-            SET status = 'completed', completed_at = ?, snooze_until = NULL, updated_at = ?
-            WHERE id = ?
-            """,
-            (timestamp, timestamp, goal_id),
+        updated = _transition_goal(
+            connection,
+            user_id,
+            goal_id,
+            ("active", "snoozed"),
+            "complete",
+            if_match,
+            "status = 'completed', completed_at = ?, snooze_until = NULL, updated_at = ?",
+            (timestamp, timestamp),
         )
-        event = _create_event(connection, goal_id, "completed", "mobile")
-        updated = connection.execute("SELECT * FROM goals WHERE id = ?", (goal_id,)).fetchone()
-        connection.commit()
+        return updated, _create_event(connection, goal_id, "completed", "mobile")
 
-        return {
-            "ok": True,
-            "data": {
-                "goal": _goal_to_dto(updated),
-                "event": _event_to_dto(event),
-            },
-        }
+    return await write_once(idempotency, response, complete, _action_result)
 
 
 @router.post("/{goal_id}/snooze")
-def snooze_goal(goal_id: int, payload: SnoozeIn) -> dict[str, object]:
-    with _db() as connection:
-        user_id = _single_user_id(connection)
-        goal = _fetch_goal(connection, user_id, goal_id)
-        _assert_state(goal["status"], {"active"}, "snooze")
-
-        snooze_until = (
-            datetime.now().astimezone() + timedelta(minutes=payload.minutes)
-        ).isoformat(timespec="seconds")
-        timestamp = now_iso()
-
-        connection.execute(
-            """
-            UPDATE goals
-            SET status = 'snoozed', snooze_until = ?, updated_at = ?
-            WHERE id = ?
-            """,
-            (snooze_until, timestamp, goal_id),
+async def snooze_goal(
+    goal_id: int,
+    payload: SnoozeIn,
+    response: Response,
+    if_match: str | None = Header(None),
+    user_id: int = Depends(require_auth),
+    idempotency: IdempotencyKey | None = Depends(idempotency_key),
+) -> Any:
+    snooze_until = (
+        datetime.now().astimezone() + timedelta(minutes=payload.minutes)
+    ).isoformat(timespec="seconds")
+
+    def snooze(connection: sqlite3.Connection) -> tuple[sqlite3.Row, sqlite3.Row]:
+        updated = _transition_goal(
+            connection,
+            user_id,
+            goal_id,
+            ("active",),
+            "snooze",
+            if_match,
+            "status = 'snoozed', snooze_until = ?, updated_at = ?",
+            (snooze_until, now_iso()),
         )
         event = _create_event(
             connection,
@@ -486,139 +856,90 @@ def snooze_goal(goal_id: int, payload: SnoozeIn) -> dict[str, object]:
             "mobile",
             {"minutes": payload.minutes, "snooze_until": snooze_until},
         )
-        updated = connection.execute("SELECT * FROM goals WHERE id = ?", (goal_id,)).fetchone()
-        connection.commit()
+        return updated, event
 
-        return {
-            "ok": True,
-            "data": {
-                "goal": _goal_to_dto(updated),
-                "event": _event_to_dto(event),
-            },
-        }
+    result = await write_once(idempotency, response, snooze, _action_result)
+    get_snooze_waker().schedule(snooze_until)
+    return result
 
 
 @router.post("/{goal_id}/move-to-tomorrow")
-def move_to_tomorrow(goal_id: int) -> dict[str, object]:
-    with _db() as connection:
-        user_id = _single_user_id(connection)
-        goal = _fetch_goal(connection, user_id, goal_id)
-        _assert_state(goal["status"], {"active", "snoozed"}, "move to tomorrow")
-
-        old_date = date.fromisoformat(goal["target_date"])
-        new_date = (old_date + timedelta(days=1)).isoformat()
-        timestamp = now_iso()
-        connection.execute(
+async def move_to_tomorrow(
+    goal_id: int,
+    response: Response,
+    if_match: str | None = Header(None),
+    user_id: int = Depends(require_auth),
+    idempotency: IdempotencyKey | None = Depends(idempotency_key),
+) -> Any:
+    def move(connection: sqlite3.Connection) -> tuple[sqlite3.Row, sqlite3.Row]:
+        updated = _transition_goal(
+            connection,
+            user_id,
+            goal_id,
+            ("active", "snoozed"),
+            "move to tomorrow",
+            if_match,
             """
-            UPDATE goals
-            SET target_date = ?, status = 'active', snooze_until = NULL, reminder_ignore_count = 0, updated_at = ?
-            WHERE id = ?
+            target_date = date(target_date, '+1 day'), status = 'active', snooze_until = NULL,
+            reminder_ignore_count = 0, updated_at = ?
             """,
-            (new_date, timestamp, goal_id),
+            (now_iso(),),
         )
+        old_date = (date.fromisoformat(updated["target_date"]) - timedelta(days=1)).isoformat()
         event = _create_event(
             connection,
             goal_id,
             "moved_to_tomorrow",
             "mobile",
-            {"from": goal["target_date"], "to": new_date},
+            {"from": old_date, "to": updated["target_date"]},
         )
-        updated = connection.execute("SELECT * FROM goals WHERE id = ?", (goal_id,)).fetchone()
-        connection.commit()
+        return updated, event
 
-        return {
-            "ok": True,
-            "data": {
-                "goal": _goal_to_dto(updated),
-                "event": _event_to_dto(event),
-            },
-        }
+    return await write_once(idempotency, response, move, _action_result)
 
 
 @router.post("/rollover")
-def rollover_goals() -> dict[str, object]:
+async def rollover_goals(user_id: int = Depends(require_auth)) -> dict[str, object]:
     """AUTO_MOVE_TO_TOMORROW — перенести все просроченные активные/snoozed цели на следующий день.
 
-    Idempotent: можно запускать повторно — повторный вызов в тот же день
-    не перенесёт уже перенесённые цели (target_date будет >= today).
+    Выполняется автоматически в полночь по users.timezone (app/rollover.py);
+    эндпоинт оставлен для ручного запуска. Повторный вызов в тот же день
+    не трогает цели, у которых target_date уже >= today.
     """
-    today = date.today().isoformat()
-    timestamp = now_iso()
-
-    with _db() as connection:
-        user_id = _single_user_id(connection)
-
-        overdue_rows = connection.execute(
-            """
-            SELECT * FROM goals
-            WHERE user_id = ? AND status IN ('active', 'snoozed') AND target_date < ?
-            ORDER BY target_date, id
-            """,
-            (user_id, today),
-        ).fetchall()
+    moved = await db_write(
+        lambda connection: rollover_overdue_goals(connection, user_id, user_today(connection, user_id))
+    )
 
-        moved = []
-        for row in overdue_rows:
-            old_date = date.fromisoformat(row["target_date"])
-            new_date = (old_date + timedelta(days=1)).isoformat()
-
-            connection.execute(
-                """
-                UPDATE goals
-                SET target_date = ?, status = 'active', snooze_until = NULL,
-                    reminder_ignore_count = 0, updated_at = ?
-                WHERE id = ? AND status IN ('active', 'snoozed')
-                """,
-                (new_date, timestamp, row["id"]),
-            )
-            _create_event(
-                connection,
-                row["id"],
-                "auto_moved_to_tomorrow",
-                "backend_auto",
-                {"from": row["target_date"], "to": new_date},
-            )
-            updated = connection.execute(
-                "SELECT * FROM goals WHERE id = ?", (row["id"],)
-            ).fetchone()
-            if updated is not None:
-                moved.append(updated)
-
-        connection.commit()
-
-        return {
-            "ok": True,
-            "data": {
-                "moved_count": len(moved),
-                "goals": [_goal_to_dto(g) for g in moved],
-            },
-        }
+    return {
+        "ok": True,
+        "data": {
+            "moved_count": len(moved),
+            "goals": [goal_to_dto(g) for g in moved],
+        },
+    }
 
 
 @router.post("/{goal_id}/cancel")
-def cancel_goal(goal_id: int, _: ConfirmIn | None = None) -> dict[str, object]:
-    with _db() as connection:
-        user_id = _single_user_id(connection)
-        goal = _fetch_goal(connection, user_id, goal_id)
-        _assert_state(goal["status"], {"active", "snoozed"}, "cancel")
-
+async def cancel_goal(
+    goal_id: int,
+    response: Response,
+    _: ConfirmIn | None = None,
+    if_match: str | None = Header(None),
+    user_id: int = Depends(require_auth),
+    idempotency: IdempotencyKey | None = Depends(idempotency_key),
+) -> Any:
+    def cancel(connection: sqlite3.Connection) -> tuple[sqlite3.Row, sqlite3.Row]:
         timestamp = now_iso()
-        connection.execute(
-            """
-            UPDATE goals
-            SET status = 'canceled', canceled_at = ?, snooze_until = NULL, updated_at = ?
-            WHERE id = ?
-            """,
-            (timestamp, timestamp, goal_id),
+        updated = _transition_goal(
+            connection,
+            user_id,
+            goal_id,
+            ("active", "snoozed"),
+            "cancel",
+            if_match,
+            "status = 'canceled', canceled_at = ?, snooze_until = NULL, updated_at = ?",
+            (timestamp, timestamp),
         )
-        event = _create_event(connection, goal_id, "canceled", "mobile")
-        updated = connection.execute("SELECT * FROM goals WHERE id = ?", (goal_id,)).fetchone()
-        connection.commit()
+        return updated, _create_event(connection, goal_id, "canceled", "mobile")
 
-        return {
-            "ok": True,
-            "data": {
-                "goal": _goal_to_dto(updated),
-                "event": _event_to_dto(event),
-            },
-        }
+    return await write_once(idempotency, response, cancel, _action_result)
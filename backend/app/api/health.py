@@ -2,15 +2,28 @@ from __future__ import annotations
 
 from fastapi import APIRouter
 
+from app.api.reminders import get_report_buffer
+from app.api.stream import get_change_broker
+from app.db import get_pool
+from app.db_executor import get_executor
+from app.event_archive import get_event_archiver
+from app.reminders import get_reminder_scheduler
+
 router = APIRouter(tags=["health"])
 
 
 @router.get("/health")
-def healthcheck() -> dict[str, object]:
+async def healthcheck() -> dict[str, object]:
     return {
         "ok": True,
         "data": {
             "service": "mvp-control-backend",
             "status": "up",
+            "db_pool": get_pool().stats(),
+            "db_executor": get_executor().stats(),
+            "stream": get_change_broker().stats(),
+            "reminders": scheduler.stats() if (scheduler := get_reminder_scheduler()) else None,
+            "reminder_reports": get_report_buffer().stats(),
+            "event_archive": archiver.stats() if (archiver := get_event_archiver()) else None,
         },
     }
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import sqlite3
+from datetime import date, datetime
+from typing import Any
+
+from fastapi import APIRouter, Depends, Query
+
+from app.auth import require_auth
+from app.db_executor import db_read
+from app.errors import APIError
+from app.reminders import UserContext, load_user_contexts, plan_day
+
+router = APIRouter(prefix="/api/reminder-plan", tags=["reminder-plan"], dependencies=[Depends(require_auth)])
+
+
+def _load_plan_inputs(
+    connection: sqlite3.Connection, user_id: int, day: date
+) -> tuple[UserContext | None, list[sqlite3.Row]]:
+    context = load_user_contexts(connection, (user_id,)).get(user_id)
+    goals = connection.execute(
+        "SELECT * FROM goals WHERE user_id = ? AND target_date = ? AND status = 'active' ORDER BY id",
+        (user_id, day.isoformat()),
+    ).fetchall()
+    return context, goals
+
+
+@router.get("")
+async def get_reminder_plan(
+    date_value: str = Query(..., alias="date"),
+    user_id: int = Depends(require_auth),
+) -> dict[str, object]:
+    try:
+        day = date.fromisoformat(date_value)
+    except ValueError as exc:
+        raise APIError("VALIDATION_ERROR", "date must be YYYY-MM-DD", 400) from exc
+
+    context, goals = await db_read(_load_plan_inputs, user_id, day)
+    if context is None:
+        raise APIError("INTERNAL_ERROR", "Policy not initialized for user", 500)
+    plan = plan_day(goals, context, day, datetime.now().astimezone())
+
+    # Goals share fire minutes, so each instant is formatted once.
+    labels: dict[datetime, str] = {}
+    items: list[dict[str, Any]] = []
+    for goal in goals:
+        fire_at = []
+        for instant in plan[goal["id"]]:
+            label = labels.get(instant)
+            if label is None:
+                label = labels[instant] = instant.isoformat()
+            fire_at.append(label)
+        items.append({"goal_id": goal["id"], "fire_at": fire_at})
+
+    return {
+        "ok": True,
+        "data": {
+            "date": day.isoformat(),
+            "policy_updated_at": context.policy["updated_at"],
+            "items": items,
+        },
+    }
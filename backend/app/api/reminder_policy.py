@@ -8,13 +8,12 @@ from fastapi import APIRouter, Depends
 from pydantic import BaseModel, Field
 
 from app.auth import require_auth
-from app.config import get_settings
-from app.db import get_connection, now_iso
+from app.db import fetch_returning, now_iso
+from app.db_executor import db_read, db_write
 from app.errors import APIError
 
 router = APIRouter(prefix="/api/reminder-policy", tags=["reminder-policy"], dependencies=[Depends(require_auth)])
 
-
 class ReminderPolicyUpdateIn(BaseModel):
     active_window_start: str | None = None
     active_window_end: str | None = None
@@ -34,17 +33,6 @@ class GlobalPauseIn(BaseModel):
     minutes: int = Field(gt=0, le=1440)
 
 
-def _db() -> sqlite3.Connection:
-    return get_connection(get_settings().db_path)
-
-
-def _single_user_id(connection: sqlite3.Connection) -> int:
-    row = connection.execute("SELECT id FROM users ORDER BY id LIMIT 1").fetchone()
-    if row is None:
-        raise APIError("INTERNAL_ERROR", "Default user not initialized", 500)
-    return int(row["id"])
-
-
 def _validate_time_windows(
     active_start: str,
     active_end: str,
@@ -114,7 +102,7 @@ def _validate_persistence_mode(mode: str) -> None:
         raise APIError("VALIDATION_ERROR", f"persistence_mode must be soft|normal|hard, got {mode}", 400)
 
 
-def _policy_to_dto(row: sqlite3.Row) -> dict[str, Any]:
+def policy_to_dto(row: sqlite3.Row) -> dict[str, Any]:
     snooze_options = json.loads(row["default_snooze_options"]) if row["default_snooze_options"] else []
     return {
         "active_window_start": row["active_window_start"],
@@ -134,26 +122,29 @@ def _policy_to_dto(row: sqlite3.Row) -> dict[str, Any]:
     }
 
 
+def _fetch_policy(connection: sqlite3.Connection, user_id: int) -> sqlite3.Row:
+    row = connection.execute("SELECT * FROM reminder_policies WHERE user_id = ?", (user_id,)).fetchone()
+    if row is None:
+        raise APIError("INTERNAL_ERROR", "Policy not initialized for user", 500)
+    return row
+
+
 @router.get("")
-def get_reminder_policy() -> dict[str, object]:
-    with _db() as connection:
-        user_id = _single_user_id(connection)
-        row = connection.execute("SELECT * FROM reminder_policies WHERE user_id = ?", (user_id,)).fetchone()
-        if row is None:
-            raise APIError("INTERNAL_ERROR", "Policy not initialized for user", 500)
-        return {"ok": True, "data": {"policy": _policy_to_dto(row)}}
+async def get_reminder_policy(user_id: int = Depends(require_auth)) -> dict[str, object]:
+    return {"ok": True, "data": {"policy": policy_to_dto(await db_read(_fetch_policy, user_id))}}
 
 
 @router.put("")
-def update_reminder_policy(payload: ReminderPolicyUpdateIn) -> dict[str, object]:
+async def update_reminder_policy(
+    payload: ReminderPolicyUpdateIn,
+    user_id: int = Depends(require_auth),
+) -> dict[str, object]:
     if payload.model_dump(exclude_none=True) == {}:
         raise APIError("VALIDATION_ERROR", "No fields provided for update", 400)
 
-    with _db() as connection:
-        user_id = _single_user_id(connection)
-        current = connection.execute("SELECT * FROM reminder_policies WHERE user_id = ?", (user_id,)).fetchone()
-        if current is None:
-            raise APIError("INTERNAL_ERROR", "Policy not initialized for user", 500)
+    # Read-validate-write runs as one transaction on the writer thread.
+    def update(connection: sqlite3.Connection) -> sqlite3.Row:
+        current = _fetch_policy(connection, user_id)
 
         active_start = payload.active_window_start if payload.active_window_start is not None else current["active_window_start"]
         active_end = payload.active_window_end if payload.active_window_end is not None else current["active_window_end"]
@@ -184,7 +175,8 @@ def update_reminder_policy(payload: ReminderPolicyUpdateIn) -> dict[str, object]
         ask_about_auto = payload.ask_about_auto_moved_morning if payload.ask_about_auto_moved_morning is not None else bool(current["ask_about_auto_moved_morning"])
 
         timestamp = now_iso()
-        connection.execute(
+        updated = fetch_returning(
+            connection,
             """
             UPDATE reminder_policies
             SET active_window_start = ?,
@@ -201,6 +193,7 @@ def update_reminder_policy(payload: ReminderPolicyUpdateIn) -> dict[str, object]
                 ask_about_auto_moved_morning = ?,
                 updated_at = ?
             WHERE user_id = ?
+            RETURNING *
             """,
             (
                 active_start,
@@ -219,58 +212,47 @@ def update_reminder_policy(payload: ReminderPolicyUpdateIn) -> dict[str, object]
                 user_id,
             ),
         )
-        connection.commit()
-
-        updated = connection.execute("SELECT * FROM reminder_policies WHERE user_id = ?", (user_id,)).fetchone()
         if updated is None:
             raise APIError("INTERNAL_ERROR", "Policy update failed", 500)
+        return updated
+
+    updated = await db_write(update)
+    return {"ok": True, "data": {"policy": policy_to_dto(updated)}}
 
-        return {"ok": True, "data": {"policy": _policy_to_dto(updated)}}
+
+def _update_global_pause(connection: sqlite3.Connection, user_id: int, pause_until: str | None) -> sqlite3.Row | None:
+    return fetch_returning(
+        connection,
+        """
+        UPDATE reminder_policies
+        SET global_pause_until = ?, updated_at = ?
+        WHERE user_id = ?
+        RETURNING *
+        """,
+        (pause_until, now_iso(), user_id),
+    )
 
 
 @router.post("/global-pause")
-def set_global_pause(payload: GlobalPauseIn) -> dict[str, object]:
+async def set_global_pause(
+    payload: GlobalPauseIn,
+    user_id: int = Depends(require_auth),
+) -> dict[str, object]:
     from datetime import datetime, timedelta
 
     pause_until = (datetime.now() + timedelta(minutes=payload.minutes)).isoformat(timespec="seconds")
 
-    with _db() as connection:
-        user_id = _single_user_id(connection)
-        timestamp = now_iso()
-        connection.execute(
-            """
-            UPDATE reminder_policies
-            SET global_pause_until = ?, updated_at = ?
-            WHERE user_id = ?
-            """,
-            (pause_until, timestamp, user_id),
-        )
-        connection.commit()
-
-        updated = connection.execute("SELECT * FROM reminder_policies WHERE user_id = ?", (user_id,)).fetchone()
-        if updated is None:
-            raise APIError("INTERNAL_ERROR", "Global pause update failed", 500)
+    updated = await db_write(_update_global_pause, user_id, pause_until)
+    if updated is None:
+        raise APIError("INTERNAL_ERROR", "Global pause update failed", 500)
 
-        return {"ok": True, "data": {"policy": _policy_to_dto(updated)}}
+    return {"ok": True, "data": {"policy": policy_to_dto(updated)}}
 
 
 @router.post("/global-pause/clear")
-def clear_global_pause() -> dict[str, object]:
-    with _db() as connection:
-        user_id = _single_user_id(connection)
-        timestamp = now_iso()
-        connection.execute(
-            """
-            UPDATE reminder_policies
-            SET global_pause_until = NULL, updated_at = ?
-            WHERE user_id = ?
-            """,
-            (timestamp, user_id),
-        )
-        connection.commit()
-
-        updated = connection.execute("SELECT * FROM reminder_policies WHERE user_id = ?", (user_id,)).fetchone()
-        if updated is None:
-            raise APIError("INTERNAL_ERROR", "Clear global pause failed", 500)
+async def clear_global_pause(user_id: int = Depends(require_auth)) -> dict[str, object]:
+    updated = await db_write(_update_global_pause, user_id, None)
+    if updated is None:
+        raise APIError("INTERNAL_ERROR", "Clear global pause failed", 500)
 
-        return {"ok": True, "data": {"policy": _policy_to_dto(updated)}}
+    return {"ok": True, "data": {"policy": policy_to_dto(updated)}}
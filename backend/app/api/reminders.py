@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import sqlite3
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Literal
+
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+
+from app.auth import require_auth
+from app.config import get_settings
+from app.db_executor import db_write
+from app.errors import APIError
+
+logger = logging.getLogger(__name__)
+
+MAX_REPORTS_PER_REQUEST = 1000
+# A flush starts early once this many reports are waiting.
+FLUSH_BATCH_SIZE = 1000
+# Re-sent reports are recognised for this long.
+REPORT_RETENTION_DAYS = 7
+PRUNE_INTERVAL_SECONDS = 3600.0
+# A report's ``at`` moves last_reminded_at only if it is at most this old;
+# later than the server clock it counts as now.
+MAX_REPORT_AGE = timedelta(hours=24)
+SQL_IN_CHUNK = 500
+
+ReportKind = Literal["shown", "ignored", "tapped"]
+
+router = APIRouter(prefix="/api/reminders", tags=["reminders"], dependencies=[Depends(require_auth)])
+
+
+class ReminderReportIn(BaseModel):
+    report_id: str = Field(min_length=1, max_length=64)
+    goal_id: int = Field(gt=0)
+    kind: ReportKind
+    at: str | None = None
+
+
+class ReminderAckIn(BaseModel):
+    items: list[ReminderReportIn] = Field(min_length=1, max_length=MAX_REPORTS_PER_REQUEST)
+
+
+@dataclass(frozen=True)
+class ReminderReport:
+    user_id: int
+    report_id: str
+    goal_id: int
+    kind: ReportKind
+    reported_at: datetime
+
+
+def _chunks(values: list[Any], size: int = SQL_IN_CHUNK) -> Iterator[list[Any]]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def apply_reminder_reports(connection: sqlite3.Connection, reports: list[ReminderReport], prune: bool = False) -> int:
+    """Write a flushed batch of reports; returns how many were new.
+
+    Reports already stored (re-sent by the client) and reports for goals the
+    user does not own are dropped. The rest are recorded in reminder_reports,
+    folded into one goals UPDATE per goal via executemany, and journaled with
+    one executemany into goal_action_events. Like the scheduler's own stamps
+    this bookkeeping leaves goals.version alone.
+    """
+    report_ids: dict[int, set[str]] = {}
+    for report in reports:
+        report_ids.setdefault(report.user_id, set()).add(report.report_id)
+    known: set[tuple[int, str]] = set()
+    for user_id, ids in report_ids.items():
+        # Per user, so each lookup is a search on the (user_id, report_id) key.
+        for chunk in _chunks(sorted(ids)):
+            known.update(
+                (user_id, row["report_id"])
+                for row in connection.execute(
+                    f"""
+                    SELECT report_id FROM reminder_reports
+                    WHERE user_id = ? AND report_id IN ({','.join('?' * len(chunk))})
+                    """,
+                    (user_id, *chunk),
+                )
+            )
+    owners: dict[int, int] = {}
+    for chunk in _chunks(sorted({report.goal_id for report in reports})):
+        owners.update(
+            (row["id"], row["user_id"])
+            for row in connection.execute(f"SELECT id, user_id FROM goals WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        )
+    fresh = sorted(
+        (
+            report
+            for report in reports
+            if (report.user_id, report.report_id) not in known and owners.get(report.goal_id) == report.user_id
+        ),
+        key=lambda report: report.reported_at,
+    )
+
+    received = datetime.now().astimezone()
+    received_at = received.isoformat(timespec="seconds")
+    connection.executemany(
+        """
+        INSERT INTO reminder_reports (user_id, report_id, goal_id, kind, reported_at, received_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (report.user_id, report.report_id, report.goal_id, report.kind, report.reported_at.isoformat(), received_at)
+            for report in fresh
+        ],
+    )
+
+    # Per goal: every report means the reminder was shown; a tap resets the
+    # ignore count, ignores after the last tap add to it. These reports are
+    # the only writer of reminder_ignore_count besides resets on goal actions.
+    # The phone's clock only places last_reminded_at, within MAX_REPORT_AGE.
+    per_goal: dict[int, tuple[bool, int, str | None]] = {}
+    for report in fresh:
+        reset, ignored, last_shown = per_goal.get(report.goal_id, (False, 0, None))
+        if report.kind == "tapped":
+            reset, ignored = True, 0
+        elif report.kind == "ignored":
+            ignored += 1
+        shown_at = min(report.reported_at, received)
+        if shown_at >= received - MAX_REPORT_AGE:
+            last_shown = shown_at.isoformat(timespec="seconds")
+        per_goal[report.goal_id] = (reset, ignored, last_shown)
+    connection.executemany(
+        """
+        UPDATE goals
+        SET reminder_ignore_count = CASE WHEN ? THEN ? ELSE reminder_ignore_count + ? END,
+            last_reminded_at = CASE
+                WHEN ? IS NOT NULL AND (last_reminded_at IS NULL OR julianday(?) > julianday(last_reminded_at))
+                THEN ?
+                ELSE last_reminded_at
+            END
+        WHERE id = ?
+        """,
+        [
+            (reset, ignored, ignored, last_shown, last_shown, last_shown, goal_id)
+            for goal_id, (reset, ignored, last_shown) in per_goal.items()
+        ],
+    )
+    # Journaled at the server's time: a phone's clock must not date events
+    # onto other (possibly already archived) days; its time stays in the payload.
+    connection.executemany(
+        """
+        INSERT INTO goal_action_events (goal_id, action_type, action_payload, source, created_at, event_date)
+        VALUES (?, ?, ?, 'mobile', ?, ?)
+        """,
+        [
+            (
+                report.goal_id,
+                f"reminder_{report.kind}",
+                json.dumps({"report_id": report.report_id, "at": report.reported_at.isoformat()}),
+                received_at,
+                received.date().isoformat(),
+            )
+            for report in fresh
+        ],
+    )
+
+    if prune:
+        cutoff = (datetime.now().astimezone() - timedelta(days=REPORT_RETENTION_DAYS)).isoformat(timespec="seconds")
+        connection.execute("DELETE FROM reminder_reports WHERE received_at < ?", (cutoff,))
+    return len(fresh)
+
+
+class ReminderReportBuffer:
+    """Collects reminder reports in memory and writes them in periodic batches.
+
+    Phones report every reminder they show, so writing each report on arrival
+    would be a steady stream of tiny transactions. Reports are keyed by
+    (user, report_id), which also drops duplicates still in the buffer, and a
+    background task flushes them every ``flush_seconds`` (sooner when
+    FLUSH_BATCH_SIZE are waiting) as a single write job. Reports are lost if
+    the process dies before a flush; clients re-send, which is harmless.
+    """
+
+    def __init__(self, flush_seconds: float = 2.0, max_pending: int = 10000) -> None:
+        self._flush_seconds = flush_seconds
+        self._max_pending = max_pending
+        self._pending: dict[tuple[int, str], ReminderReport] = {}
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._next_prune = 0.0
+        self._counters = {
+            "reports_received": 0,
+            "reports_duplicate": 0,
+            "reports_applied": 0,
+            "flushes": 0,
+            "flush_failures": 0,
+        }
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="reminder-report-flush")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+    def add(self, reports: list[ReminderReport]) -> int:
+        """Buffer the reports; returns how many were not already buffered."""
+        new = {
+            (report.user_id, report.report_id): report
+            for report in reports
+            if (report.user_id, report.report_id) not in self._pending
+        }
+        if len(self._pending) + len(new) > self._max_pending:
+            raise APIError("SERVICE_UNAVAILABLE", "Too many pending reminder reports, retry later", 503)
+        self._pending.update(new)
+        self._counters["reports_received"] += len(reports)
+        self._counters["reports_duplicate"] += len(reports) - len(new)
+        if len(self._pending) >= FLUSH_BATCH_SIZE:
+            self._wake.set()
+        return len(new)
+
+    def stats(self) -> dict[str, int]:
+        return {"pending": len(self._pending), **self._counters}
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        prune = time.monotonic() >= self._next_prune
+        try:
+            applied = await db_write(apply_reminder_reports, list(batch.values()), prune)
+        except asyncio.CancelledError:
+            # Shutting down mid-flush: stop() writes them again, which is a
+            # no-op for reports the interrupted job already stored.
+            self._pending = {**batch, **self._pending}
+            raise
+        except Exception:
+            logger.exception("Failed to write %s reminder reports", len(batch))
+            self._counters["flush_failures"] += 1
+            # Back in line for the next flush; reports that arrived meanwhile win.
+            self._pending = {**batch, **self._pending}
+            return
+        if prune:
+            self._next_prune = time.monotonic() + PRUNE_INTERVAL_SECONDS
+        self._counters["flushes"] += 1
+        self._counters["reports_applied"] += applied
+
+    async def _run(self) -> None:
+        while True:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), self._flush_seconds)
+            self._wake.clear()
+            await self.flush()
+
+
+_buffer: ReminderReportBuffer | None = None
+
+
+def get_report_buffer() -> ReminderReportBuffer:
+    if _buffer is None:
+        raise RuntimeError("Reminder report buffer is not running")
+    return _buffer
+
+
+async def start_report_buffer() -> ReminderReportBuffer:
+    global _buffer
+    if _buffer is None:
+        settings = get_settings()
+        _buffer = ReminderReportBuffer(settings.reminder_ack_flush_seconds, settings.reminder_ack_max_pending)
+        await _buffer.start()
+    return _buffer
+
+
+async def stop_report_buffer() -> None:
+    global _buffer
+    if _buffer is not None:
+        await _buffer.stop()
+        _buffer = None
+
+
+def _reported_at(value: str | None, index: int) -> datetime:
+    if value is None:
+        return datetime.now().astimezone()
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError as exc:
+        raise APIError("VALIDATION_ERROR", f"items[{index}]: at must be an ISO datetime", 400) from exc
+    return parsed if parsed.tzinfo is not None else parsed.astimezone()
+
+
+@router.post("/ack", status_code=202)
+async def ack_reminders(
+    payload: ReminderAckIn,
+    user_id: int = Depends(require_auth),
+) -> dict[str, object]:
+    reports = [
+        ReminderReport(user_id, item.report_id, item.goal_id, item.kind, _reported_at(item.at, index))
+        for index, item in enumerate(payload.items)
+    ]
+    queued = get_report_buffer().add(reports)
+    return {"ok": True, "data": {"accepted": len(reports), "queued": queued}}
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import sqlite3
+from collections import deque
+from collections.abc import AsyncIterator, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.api.goals import goal_to_dto
+from app.api.reminder_policy import policy_to_dto
+from app.auth import require_auth
+from app.config import get_settings
+from app.db_executor import db_read, get_executor
+from app.errors import APIError
+
+logger = logging.getLogger(__name__)
+
+# Changes read from sync_changes per pass, both for fan-out and for replay.
+EVENTS_PAGE_SIZE = 500
+# Tells EventSource clients how long to wait before reconnecting (ms).
+RECONNECT_DELAY_MS = 3000
+
+router = APIRouter(prefix="/api", tags=["stream"], dependencies=[Depends(require_auth)])
+
+
+@dataclass(frozen=True)
+class StreamEvent:
+    seq: int
+    user_id: int
+    name: str
+    data: dict[str, Any]
+
+    def encode(self) -> str:
+        payload = json.dumps(self.data, ensure_ascii=False, separators=(",", ":"))
+        return f"id: {self.seq}\nevent: {self.name}\ndata: {payload}\n\n"
+
+
+@dataclass(eq=False)
+class Subscription:
+    """One connected client: a bounded queue that drops its oldest events when full."""
+
+    user_id: int
+    queue_size: int
+    events: deque[StreamEvent] = field(init=False)
+    dropped: int = 0
+    closed: bool = False
+    _ready: asyncio.Event = field(init=False, default_factory=asyncio.Event)
+
+    def __post_init__(self) -> None:
+        self.events = deque(maxlen=self.queue_size)
+
+    def push(self, event: StreamEvent) -> None:
+        if len(self.events) == self.queue_size:
+            self.dropped += 1
+        self.events.append(event)
+        self._ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for events (or close); False on timeout."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def drain(self) -> list[StreamEvent]:
+        events = list(self.events)
+        self.events.clear()
+        self._ready.clear()
+        return events
+
+
+def _max_seq(connection: sqlite3.Connection) -> int:
+    return connection.execute("SELECT COALESCE(MAX(seq), 0) FROM sync_changes").fetchone()[0]
+
+
+def _load_events(
+    connection: sqlite3.Connection, since: int, user_ids: Iterable[int], limit: int = EVENTS_PAGE_SIZE
+) -> tuple[list[StreamEvent], int, bool]:
+    """Events for sync_changes rows after ``since``; returns (events, cursor, has_more).
+
+    The feed keeps only the latest write per goal, so a goal changed several
+    times between two passes yields one event with its current state.
+    """
+    user_ids = list(user_ids)
+    changes = connection.execute(
+        f"""
+        SELECT seq, user_id, entity, entity_id, deleted, op FROM sync_changes
+        WHERE seq > ? AND user_id IN ({",".join("?" * len(user_ids))})
+        ORDER BY seq
+        LIMIT ?
+        """,
+        (since, *user_ids, limit),
+    ).fetchall()
+
+    goal_ids = [row["entity_id"] for row in changes if row["entity"] == "goal" and not row["deleted"]]
+    goals: dict[int, sqlite3.Row] = {}
+    if goal_ids:
+        goals = {
+            row["id"]: row
+            for row in connection.execute(
+                f"SELECT * FROM goals WHERE id IN ({','.join('?' * len(goal_ids))})", goal_ids
+            )
+        }
+    policy_user_ids = [row["entity_id"] for row in changes if row["entity"] == "policy"]
+    policies: dict[int, sqlite3.Row] = {}
+    if policy_user_ids:
+        policies = {
+            row["user_id"]: row
+            for row in connection.execute(
+                f"SELECT * FROM reminder_policies WHERE user_id IN ({','.join('?' * len(policy_user_ids))})",
+                policy_user_ids,
+            )
+        }
+
+    events = []
+    for change in changes:
+        seq, user_id, entity_id = change["seq"], change["user_id"], change["entity_id"]
+        if change["entity"] == "policy":
+            if entity_id in policies:
+                events.append(StreamEvent(seq, user_id, "policy.changed", {"policy": policy_to_dto(policies[entity_id])}))
+        elif change["deleted"]:
+            events.append(StreamEvent(seq, user_id, "goal.deleted", {"goal_id": entity_id}))
+        elif entity_id in goals:
+            # Rewritten after this pass started; its newer seq comes next time.
+            # The feed row holds the latest write, so "created" means not
+            # written since the insert (reminder stamps leave version alone).
+            name = "goal.created" if change["op"] == "insert" else "goal.updated"
+            events.append(StreamEvent(seq, user_id, name, {"goal": goal_to_dto(goals[entity_id])}))
+    cursor = changes[-1]["seq"] if changes else since
+    return events, cursor, len(changes) == limit
+
+
+class ChangeBroker:
+    """In-process fan-out of sync_changes to the SSE clients of this worker.
+
+    A single task tails the change feed: it is woken right after each group
+    commit of this worker's DB executor and otherwise polls every
+    ``poll_seconds`` to pick up writes made by other workers. Only users with
+    a connected client are read.
+    """
+
+    def __init__(self, queue_size: int = 256, poll_seconds: float = 1.0) -> None:
+        self._queue_size = queue_size
+        self._poll_seconds = poll_seconds
+        self._subscribers: dict[int, set[Subscription]] = {}
+        self._cursor = 0
+        self._wake = asyncio.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._published = 0
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._cursor = await db_read(_max_seq)
+        get_executor().add_commit_listener(self.notify)
+        self._task = asyncio.create_task(self._run(), name="change-broker")
+
+    async def stop(self) -> None:
+        get_executor().remove_commit_listener(self.notify)
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                subscription.close()
+        self._subscribers.clear()
+
+    def notify(self) -> None:
+        """Thread-safe: ask the broker to read the change feed now."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, self._queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "subscribers": sum(len(subscriptions) for subscriptions in self._subscribers.values()),
+            "cursor": self._cursor,
+            "events_published": self._published,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), self._poll_seconds)
+            self._wake.clear()
+            try:
+                await self._publish()
+            except Exception:
+                logger.exception("Failed to read the change feed")
+
+    async def _publish(self) -> None:
+        if not self._subscribers:
+            # Nobody listens: skip ahead instead of reading changes nobody gets.
+            self._cursor = await db_read(_max_seq)
+            return
+        has_more = True
+        while has_more and self._subscribers:
+            events, self._cursor, has_more = await db_read(_load_events, self._cursor, tuple(self._subscribers))
+            for event in events:
+                for subscription in self._subscribers.get(event.user_id, ()):
+                    subscription.push(event)
+            self._published += len(events)
+
+
+_broker: ChangeBroker | None = None
+
+
+def get_change_broker() -> ChangeBroker:
+    if _broker is None:
+        raise RuntimeError("Change broker is not running")
+    return _broker
+
+
+async def start_change_broker() -> ChangeBroker:
+    global _broker
+    if _broker is None:
+        settings = get_settings()
+        _broker = ChangeBroker(settings.stream_queue_size, settings.stream_poll_seconds)
+        await _broker.start()
+    return _broker
+
+
+async def stop_change_broker() -> None:
+    global _broker
+    if _broker is not None:
+        await _broker.stop()
+        _broker = None
+
+
+async def _event_stream(request: Request, user_id: int, since: int | None) -> AsyncIterator[str]:
+    heartbeat = get_settings().stream_heartbeat_seconds
+    broker = get_change_broker()
+    subscription = broker.subscribe(user_id)
+    try:
+        yield f"retry: {RECONNECT_DELAY_MS}\n\n"
+        # Subscribed first, then replayed: anything committed meanwhile is in
+        # the replay or the queue, and queued duplicates are skipped by seq.
+        if since is None:
+            last_seq = await db_read(_max_seq)
+        else:
+            last_seq, has_more = since, True
+            while has_more:
+                events, last_seq, has_more = await db_read(_load_events, last_seq, (user_id,))
+                for event in events:
+                    yield event.encode()
+
+        while not subscription.closed:
+            if not await subscription.wait(heartbeat):
+                if await request.is_disconnected():
+                    return
+                yield ": ping\n\n"
+                continue
+            if subscription.dropped:
+                # The client fell behind; it refetches the gap from the change feed.
+                subscription.dropped = 0
+                yield StreamEvent(last_seq, user_id, "resync", {"since": last_seq}).encode()
+            for event in subscription.drain():
+                if event.seq > last_seq:
+                    last_seq = event.seq
+                    yield event.encode()
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def _resume_seq(since: int | None, last_event_id: str | None) -> int | None:
+    if since is not None:
+        return since
+    if not last_event_id:
+        return None
+    try:
+        value = int(last_event_id)
+    except ValueError as exc:
+        raise APIError("VALIDATION_ERROR", "Last-Event-ID must be a change cursor", 400) from exc
+    if value < 0:
+        raise APIError("VALIDATION_ERROR", "Last-Event-ID must be a change cursor", 400)
+    return value
+
+
+@router.get("/stream")
+async def stream_changes(
+    request: Request,
+    since: int | None = Query(None, ge=0),
+    last_event_id: str | None = Header(default=None),
+    user_id: int = Depends(require_auth),
+) -> StreamingResponse:
+    """Server-Sent Events with the user's goal and policy changes.
+
+    Event ids are change-feed cursors: a reconnect with Last-Event-ID (or
+    ``?since=``) first replays what was missed, like GET /api/goals/changes.
+    """
+    return StreamingResponse(
+        _event_stream(request, user_id, _resume_seq(since, last_event_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,19 +1,117 @@
 from __future__ import annotations
 
+import hashlib
+import hmac
+import secrets
+import sqlite3
+
 from fastapi import Header
 
+from app.cache import TTLCache
 from app.config import get_settings
+from app.db import now_iso
+from app.db_executor import db_read
 from app.errors import APIError
 
+# Key under which the default (first) user's id is cached next to token hashes.
+_DEFAULT_USER_KEY = ""
+# Cached once api_tokens has a row; rows are only revoked, never deleted.
+_HAS_TOKENS_KEY = "*"
 
-def require_auth(authorization: str | None = Header(default=None)) -> None:
-    settings = get_settings()
-    if not settings.mvp_token:
-        return
+_user_ids: TTLCache[str, int] = TTLCache(get_settings().auth_cache_ttl_seconds)
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_token(connection: sqlite3.Connection, user_id: int, label: str | None = None) -> str:
+    """Create a bearer token for the user; only its hash is stored. The caller commits."""
+    token = secrets.token_urlsafe(32)
+    connection.execute(
+        "INSERT INTO api_tokens (token_hash, user_id, label, created_at) VALUES (?, ?, ?, ?)",
+        (hash_token(token), user_id, label, now_iso()),
+    )
+    _user_ids.set(_HAS_TOKENS_KEY, 1)
+    return token
+
+
+def revoke_token(connection: sqlite3.Connection, token: str) -> bool:
+    """Mark the token revoked. The caller commits.
+
+    This usually runs in the CLI, not in the server, so there is no cache to
+    invalidate here: server workers drop the token within AUTH_CACHE_TTL_SECONDS.
+    """
+    token_hash = hash_token(token)
+    cursor = connection.execute(
+        "UPDATE api_tokens SET revoked_at = ? WHERE token_hash = ? AND revoked_at IS NULL",
+        (now_iso(), token_hash),
+    )
+    return cursor.rowcount == 1
+
+
+async def _lookup(sql: str, params: tuple[str, ...]) -> sqlite3.Row | None:
+    return await db_read(lambda connection: connection.execute(sql, params).fetchone())
 
-    if not authorization or not authorization.startswith("Bearer "):
+
+async def _default_user_id() -> int:
+    user_id = _user_ids.get(_DEFAULT_USER_KEY)
+    if user_id is None:
+        row = await _lookup("SELECT id FROM users ORDER BY id LIMIT 1", ())
+        if row is None:
+            raise APIError("INTERNAL_ERROR", "Default user not initialized", 500)
+        user_id = int(row["id"])
+        _user_ids.set(_DEFAULT_USER_KEY, user_id)
+    return user_id
+
+
+async def _token_user_id(token: str) -> int | None:
+    token_hash = hash_token(token)
+    user_id = _user_ids.get(token_hash)
+    if user_id is None:
+        row = await _lookup(
+            "SELECT user_id FROM api_tokens WHERE token_hash = ? AND revoked_at IS NULL",
+            (token_hash,),
+        )
+        if row is None:
+            return None
+        user_id = int(row["user_id"])
+        _user_ids.set(token_hash, user_id)
+    return user_id
+
+
+async def _has_tokens() -> bool:
+    if _user_ids.get(_HAS_TOKENS_KEY) is not None:
+        return True
+    if await _lookup("SELECT 1 FROM api_tokens LIMIT 1", ()) is None:
+        return False
+    _user_ids.set(_HAS_TOKENS_KEY, 1)
+    return True
+
+
+async def require_auth(authorization: str | None = Header(default=None)) -> int:
+    """Resolve the bearer token to a users.id.
+
+    MVP_TOKEN maps to the first (seeded) user, tokens from api_tokens to their
+    own user; any other Authorization header is 401. While MVP_TOKEN is unset
+    and no api_tokens have been issued, every request acts as the first user
+    whatever it sends (single-user mode without auth, as the clients ship with
+    a placeholder token).
+    """
+    settings = get_settings()
+    if not settings.mvp_token and not await _has_tokens():
+        return await _default_user_id()
+    if authorization is None:
         raise APIError("UNAUTHORIZED", "Missing or invalid Authorization header", 401)
 
-    token = authorization.removeprefix("Bearer ").strip()
-    if token != settings.mvp_token:
+    token = None
+    if authorization.startswith("Bearer "):
+        token = authorization.removeprefix("Bearer ").strip()
+    if not token:
+        raise APIError("UNAUTHORIZED", "Missing or invalid Authorization header", 401)
+    if settings.mvp_token and hmac.compare_digest(token.encode(), settings.mvp_token.encode()):
+        return await _default_user_id()
+    user_id = await _token_user_id(token)
+    if user_id is None:
         raise APIError("UNAUTHORIZED", "Invalid token", 401)
+    return user_id
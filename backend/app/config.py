@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
 
@@ -12,9 +13,37 @@ class Settings:
     db_path: Path
     mvp_token: str
     telegram_secret: str
+    db_read_pool_size: int
+    db_pool_timeout_seconds: float
+    db_pool_idle_seconds: float
+    db_read_queue_depth: int
+    db_write_queue_depth: int
+    db_group_commit_window_ms: float
+    db_group_commit_max_jobs: int
+    db_pragma_profile: str
+    db_busy_timeout_ms: int
+    db_busy_retries: int
+    db_busy_backoff_ms: int
+    batch_max_items: int
+    batch_chunk_size: int
+    auth_cache_ttl_seconds: float
+    stream_queue_size: int
+    stream_heartbeat_seconds: float
+    stream_poll_seconds: float
+    reminder_sinks: str
+    bot_token: str
+    reminder_ack_flush_seconds: float
+    reminder_ack_max_pending: int
+    idempotency_ttl_seconds: float
+    idempotency_cache_size: int
+    event_archive_after_days: int
+    event_archive_batch_size: int
+    event_archive_interval_seconds: float
 
 
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
+    """Settings from the environment, read once per process."""
     db_path_raw = os.getenv("DB_PATH", "data/mvp_control.db")
     db_path = Path(db_path_raw)
     if not db_path.is_absolute():
@@ -26,4 +55,30 @@ def get_settings() -> Settings:
         db_path=db_path,
         mvp_token=os.getenv("MVP_TOKEN", ""),
         telegram_secret=os.getenv("TELEGRAM_SECRET", ""),
+        db_read_pool_size=int(os.getenv("DB_READ_POOL_SIZE", "4")),
+        db_pool_timeout_seconds=float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "5")),
+        db_pool_idle_seconds=float(os.getenv("DB_POOL_IDLE_SECONDS", "300")),
+        db_read_queue_depth=int(os.getenv("DB_READ_QUEUE_DEPTH", "256")),
+        db_write_queue_depth=int(os.getenv("DB_WRITE_QUEUE_DEPTH", "128")),
+        db_group_commit_window_ms=float(os.getenv("DB_GROUP_COMMIT_WINDOW_MS", "2")),
+        db_group_commit_max_jobs=int(os.getenv("DB_GROUP_COMMIT_MAX_JOBS", "64")),
+        db_pragma_profile=os.getenv("DB_PRAGMA_PROFILE", "wal"),
+        db_busy_timeout_ms=int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000")),
+        db_busy_retries=int(os.getenv("DB_BUSY_RETRIES", "3")),
+        db_busy_backoff_ms=int(os.getenv("DB_BUSY_BACKOFF_MS", "50")),
+        batch_max_items=int(os.getenv("BATCH_MAX_ITEMS", "10000")),
+        batch_chunk_size=int(os.getenv("BATCH_CHUNK_SIZE", "500")),
+        auth_cache_ttl_seconds=float(os.getenv("AUTH_CACHE_TTL_SECONDS", "5")),
+        stream_queue_size=int(os.getenv("STREAM_QUEUE_SIZE", "256")),
+        stream_heartbeat_seconds=float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15")),
+        stream_poll_seconds=float(os.getenv("STREAM_POLL_SECONDS", "1")),
+        reminder_sinks=os.getenv("REMINDER_SINKS", ""),
+        bot_token=os.getenv("BOT_TOKEN", ""),
+        reminder_ack_flush_seconds=float(os.getenv("REMINDER_ACK_FLUSH_SECONDS", "2")),
+        reminder_ack_max_pending=int(os.getenv("REMINDER_ACK_MAX_PENDING", "10000")),
+        idempotency_ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400")),
+        idempotency_cache_size=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "1024")),
+        event_archive_after_days=int(os.getenv("EVENT_ARCHIVE_AFTER_DAYS", "90")),
+        event_archive_batch_size=int(os.getenv("EVENT_ARCHIVE_BATCH_SIZE", "500")),
+        event_archive_interval_seconds=float(os.getenv("EVENT_ARCHIVE_INTERVAL_SECONDS", "3600")),
     )
@@ -2,8 +2,16 @@ from __future__ import annotations
 
 import json
 import sqlite3
+import threading
+import time
+from collections.abc import Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any
+
+from app.config import Settings, get_settings
 
 
 DDL = """
@@ -35,6 +43,7 @@ CREATE TABLE IF NOT EXISTS goals (
     canceled_at TEXT,
     created_at TEXT NOT NULL,
     updated_at TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
     FOREIGN KEY (user_id) REFERENCES users(id)
 );
 
@@ -42,6 +51,50 @@ CREATE INDEX IF NOT EXISTS idx_goals_user_target_date ON goals(user_id, target_d
 CREATE INDEX IF NOT EXISTS idx_goals_user_target_date_status ON goals(user_id, target_date, status);
 CREATE INDEX IF NOT EXISTS idx_goals_status ON goals(status);
 CREATE INDEX IF NOT EXISTS idx_goals_snooze_until ON goals(snooze_until);
+-- Due-snooze lookup for the wake-up pass: compares instants, not offset strings.
+CREATE INDEX IF NOT EXISTS idx_goals_snooze_due ON goals(julianday(snooze_until)) WHERE status = 'snoozed';
+
+-- Rollup of goals per (user, day, status) for calendar/stats reads.
+-- Maintained by the triggers below inside the writing transaction.
+CREATE TABLE IF NOT EXISTS goal_daily_counts (
+    user_id INTEGER NOT NULL,
+    target_date TEXT NOT NULL,
+    status TEXT NOT NULL,
+    cnt INTEGER NOT NULL,
+    PRIMARY KEY (user_id, target_date, status)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_goals_daily_counts_insert
+AFTER INSERT ON goals
+BEGIN
+    INSERT INTO goal_daily_counts (user_id, target_date, status, cnt)
+    VALUES (NEW.user_id, NEW.target_date, NEW.status, 1)
+    ON CONFLICT (user_id, target_date, status) DO UPDATE SET cnt = cnt + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_goals_daily_counts_update
+AFTER UPDATE OF user_id, target_date, status ON goals
+WHEN OLD.user_id IS NOT NEW.user_id
+    OR OLD.target_date IS NOT NEW.target_date
+    OR OLD.status IS NOT NEW.status
+BEGIN
+    UPDATE goal_daily_counts SET cnt = cnt - 1
+    WHERE user_id = OLD.user_id AND target_date = OLD.target_date AND status = OLD.status;
+    DELETE FROM goal_daily_counts
+    WHERE user_id = OLD.user_id AND target_date = OLD.target_date AND status = OLD.status AND cnt <= 0;
+    INSERT INTO goal_daily_counts (user_id, target_date, status, cnt)
+    VALUES (NEW.user_id, NEW.target_date, NEW.status, 1)
+    ON CONFLICT (user_id, target_date, status) DO UPDATE SET cnt = cnt + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_goals_daily_counts_delete
+AFTER DELETE ON goals
+BEGIN
+    UPDATE goal_daily_counts SET cnt = cnt - 1
+    WHERE user_id = OLD.user_id AND target_date = OLD.target_date AND status = OLD.status;
+    DELETE FROM goal_daily_counts
+    WHERE user_id = OLD.user_id AND target_date = OLD.target_date AND status = OLD.status AND cnt <= 0;
+END;
 
 CREATE TABLE IF NOT EXISTS reminder_policies (
     user_id INTEGER PRIMARY KEY,
@@ -69,12 +122,148 @@ CREATE TABLE IF NOT EXISTS goal_action_events (
     action_payload TEXT,
     source TEXT NOT NULL CHECK (source IN ('telegram', 'mobile', 'backend_auto')),
     created_at TEXT NOT NULL,
+    event_date TEXT,
     FOREIGN KEY (goal_id) REFERENCES goals(id)
 );
 
 CREATE INDEX IF NOT EXISTS idx_events_goal_id ON goal_action_events(goal_id);
 CREATE INDEX IF NOT EXISTS idx_events_created_at ON goal_action_events(created_at);
 CREATE INDEX IF NOT EXISTS idx_events_action_type ON goal_action_events(action_type);
+CREATE INDEX IF NOT EXISTS idx_events_event_date_id ON goal_action_events(event_date, id);
+
+-- Archived goal_action_events (EVENT_ARCHIVE_AFTER_DAYS): each row holds one
+-- run of a user's events of one day as zlib-compressed NDJSON, ids first_id..last_id.
+CREATE TABLE IF NOT EXISTS goal_event_segments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    event_date TEXT NOT NULL,
+    first_id INTEGER NOT NULL,
+    last_id INTEGER NOT NULL,
+    event_count INTEGER NOT NULL,
+    events BLOB NOT NULL,
+    created_at TEXT NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_event_segments_user_date ON goal_event_segments(user_id, event_date, last_id);
+
+-- Rollup of archived events per (user, day, action_type).
+CREATE TABLE IF NOT EXISTS goal_event_daily_counts (
+    user_id INTEGER NOT NULL,
+    event_date TEXT NOT NULL,
+    action_type TEXT NOT NULL,
+    cnt INTEGER NOT NULL,
+    PRIMARY KEY (user_id, event_date, action_type)
+) WITHOUT ROWID;
+
+-- Reminder being delivered by the server scheduler: one worker claims the
+-- goal's next reminder (anchor = last_reminded_at or created_at) before the
+-- sinks run and deletes the row when done. Claims older than a minute are
+-- taken over (worker died mid-delivery).
+CREATE TABLE IF NOT EXISTS reminder_claims (
+    goal_id INTEGER PRIMARY KEY,
+    anchor TEXT NOT NULL,
+    claimed_at TEXT NOT NULL,
+    FOREIGN KEY (goal_id) REFERENCES goals(id)
+);
+
+-- Once-per-day background jobs (e.g. midnight rollover) claim their run here
+-- so that only one uvicorn worker performs it.
+CREATE TABLE IF NOT EXISTS job_runs (
+    job TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    run_date TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (job, user_id, run_date)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS api_tokens (
+    token_hash TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    label TEXT,
+    created_at TEXT NOT NULL,
+    revoked_at TEXT,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_api_tokens_user ON api_tokens(user_id);
+
+-- Reminder reports from POST /api/reminders/ack, kept to make re-sent
+-- reports no-ops; rows older than a few days are pruned.
+CREATE TABLE IF NOT EXISTS reminder_reports (
+    user_id INTEGER NOT NULL,
+    report_id TEXT NOT NULL,
+    goal_id INTEGER NOT NULL,
+    kind TEXT NOT NULL CHECK (kind IN ('shown', 'ignored', 'tapped')),
+    reported_at TEXT NOT NULL,
+    received_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, report_id),
+    FOREIGN KEY (goal_id) REFERENCES goals(id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_reminder_reports_received_at ON reminder_reports(received_at);
+
+-- Responses of writes sent with an Idempotency-Key, replayed when the same
+-- key comes again; rows older than IDEMPOTENCY_TTL_SECONDS are pruned.
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id INTEGER NOT NULL,
+    idempotency_key TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    status_code INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, idempotency_key),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at ON idempotency_keys(created_at);
+
+-- Change feed for delta sync: one row per goal/policy holding the sequence
+-- number of its latest write (deleted = 1 is a tombstone). INSERT OR REPLACE
+-- re-issues the row with a fresh AUTOINCREMENT seq, so seq never goes back
+-- and the table stays as large as the data, not the write history.
+CREATE TABLE IF NOT EXISTS sync_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    entity TEXT NOT NULL CHECK (entity IN ('goal', 'policy')),
+    entity_id INTEGER NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    op TEXT NOT NULL DEFAULT 'update' CHECK (op IN ('insert', 'update', 'delete')),
+    UNIQUE (entity, entity_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_changes_user_seq ON sync_changes(user_id, seq);
+
+CREATE TRIGGER IF NOT EXISTS trg_goals_sync_insert
+AFTER INSERT ON goals
+BEGIN
+    INSERT OR REPLACE INTO sync_changes (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'goal', NEW.id, 'insert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_goals_sync_update
+AFTER UPDATE ON goals
+BEGIN
+    INSERT OR REPLACE INTO sync_changes (user_id, entity, entity_id) VALUES (NEW.user_id, 'goal', NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_goals_sync_delete
+AFTER DELETE ON goals
+BEGIN
+    INSERT OR REPLACE INTO sync_changes (user_id, entity, entity_id, deleted, op) VALUES (OLD.user_id, 'goal', OLD.id, 1, 'delete');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_policies_sync_insert
+AFTER INSERT ON reminder_policies
+BEGIN
+    INSERT OR REPLACE INTO sync_changes (user_id, entity, entity_id) VALUES (NEW.user_id, 'policy', NEW.user_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_policies_sync_update
+AFTER UPDATE ON reminder_policies
+BEGIN
+    INSERT OR REPLACE INTO sync_changes (user_id, entity, entity_id) VALUES (NEW.user_id, 'policy', NEW.user_id);
+END;
 """
 
 
@@ -95,88 +284,522 @@ DEFAULT_POLICY = {
 }
 
 
+# Named pragma profiles selectable via DB_PRAGMA_PROFILE. "wal" lets readers
+# proceed while a writer commits, which is what multi-worker uvicorn needs.
+PRAGMA_PROFILES: dict[str, dict[str, str | int]] = {
+    "default": {},
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 268435456,
+        "cache_size": -16000,
+        "temp_store": "MEMORY",
+    },
+}
+
+# journal_mode is stored in the database file, so it is set once at startup
+# rather than on every new connection.
+STARTUP_PRAGMAS = ("journal_mode",)
+
+
 def now_iso() -> str:
     return datetime.now(timezone.utc).astimezone().isoformat(timespec="seconds")
 
 
-def get_connection(db_path: Path) -> sqlite3.Connection:
+def storage_pragmas(settings: Settings) -> dict[str, str | int]:
+    try:
+        profile = PRAGMA_PROFILES[settings.db_pragma_profile]
+    except KeyError as exc:
+        raise ValueError(
+            f"Unknown DB_PRAGMA_PROFILE '{settings.db_pragma_profile}', "
+            f"expected one of: {', '.join(PRAGMA_PROFILES)}"
+        ) from exc
+    return {**profile, "busy_timeout": settings.db_busy_timeout_ms}
+
+
+def get_connection(
+    db_path: Path,
+    check_same_thread: bool = True,
+    pragmas: Mapping[str, str | int] | None = None,
+) -> sqlite3.Connection:
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    connection = sqlite3.connect(db_path)
+    connection = sqlite3.connect(db_path, check_same_thread=check_same_thread)
     connection.row_factory = sqlite3.Row
     connection.execute("PRAGMA foreign_keys = ON;")
+    for name, value in (pragmas or {}).items():
+        if name not in STARTUP_PRAGMAS:
+            connection.execute(f"PRAGMA {name} = {value};")
     return connection
 
 
-def init_db(db_path: Path) -> None:
-    with get_connection(db_path) as connection:
+def fetch_returning(
+    connection: sqlite3.Connection,
+    sql: str,
+    params: Sequence[Any] = (),
+) -> sqlite3.Row | None:
+    """Run a single-row INSERT/UPDATE ... RETURNING and return the written row.
+
+    Replaces the write-then-SELECT pattern with one statement. The cursor is
+    drained so the statement is finished before the caller commits.
+    """
+    rows = connection.execute(sql, params).fetchall()
+    return rows[0] if rows else None
+
+
+def is_busy_error(exc: BaseException) -> bool:
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    message = str(exc).lower()
+    return "database is locked" in message or "database is busy" in message
+
+
+class PoolTimeoutError(RuntimeError):
+    """Raised when no pooled connection becomes free within the pool timeout."""
+
+
+@dataclass
+class _PooledConnection:
+    connection: sqlite3.Connection
+    created_at: float = field(default_factory=time.monotonic)
+    last_used_at: float = field(default_factory=time.monotonic)
+
+
+class ConnectionPool:
+    """Long-lived SQLite connections: a bounded reader pool and a single writer.
+
+    SQLite allows one writer at a time, so all write transactions share one
+    connection guarded by a lock, while reads are spread over up to
+    ``read_size`` connections. Connections are opened lazily, health-checked
+    on checkout and recycled once they sit idle longer than ``idle_seconds``.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        read_size: int = 4,
+        timeout_seconds: float = 5.0,
+        idle_seconds: float = 300.0,
+        pragmas: Mapping[str, str | int] | None = None,
+        busy_retries: int = 3,
+        busy_backoff_ms: int = 50,
+    ) -> None:
+        if read_size < 1:
+            raise ValueError("read_size must be at least 1")
+        self.db_path = db_path
+        self.read_size = read_size
+        self.timeout_seconds = timeout_seconds
+        self.idle_seconds = idle_seconds
+        self.pragmas = dict(pragmas or {})
+        self.busy_retries = busy_retries
+        self.busy_backoff_ms = busy_backoff_ms
+
+        self._lock = threading.Lock()
+        self._read_slots = threading.BoundedSemaphore(read_size)
+        self._idle_readers: list[_PooledConnection] = []
+        self._writer_lock = threading.Lock()
+        self._writer: _PooledConnection | None = None
+        self._closed = False
+
+        self._readers_in_use = 0
+        self._readers_peak_in_use = 0
+        self._writer_in_use = False
+        self._counters = {
+            "read_acquired": 0,
+            "write_acquired": 0,
+            "saturated": 0,
+            "timeouts": 0,
+            "wait_ms_total": 0.0,
+            "created": 0,
+            "recycled": 0,
+            "discarded": 0,
+        }
+
+    def _open(self) -> _PooledConnection:
+        connection = get_connection(self.db_path, check_same_thread=False, pragmas=self.pragmas)
+        with self._lock:
+            self._counters["created"] += 1
+        return _PooledConnection(connection)
+
+    def _discard(self, entry: _PooledConnection, counter: str) -> None:
+        try:
+            entry.connection.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _is_healthy(self, entry: _PooledConnection) -> bool:
+        try:
+            entry.connection.execute("SELECT 1").fetchone()
+        except sqlite3.Error:
+            return False
+        return True
+
+    def _prepare(self, entry: _PooledConnection | None) -> _PooledConnection:
+        if entry is not None and time.monotonic() - entry.last_used_at > self.idle_seconds:
+            self._discard(entry, "recycled")
+            entry = None
+        if entry is not None and not self._is_healthy(entry):
+            self._discard(entry, "discarded")
+            entry = None
+        return entry if entry is not None else self._open()
+
+    def _reset(self, entry: _PooledConnection) -> bool:
+        try:
+            if entry.connection.in_transaction:
+                entry.connection.rollback()
+        except sqlite3.Error:
+            self._discard(entry, "discarded")
+            return False
+        entry.last_used_at = time.monotonic()
+        return True
+
+    def _wait_for(self, primitive: threading.Semaphore | threading.Lock) -> None:
+        if primitive.acquire(blocking=False):
+            return
+        started = time.monotonic()
+        with self._lock:
+            self._counters["saturated"] += 1
+        acquired = primitive.acquire(timeout=self.timeout_seconds)
+        with self._lock:
+            self._counters["wait_ms_total"] += (time.monotonic() - started) * 1000
+            if not acquired:
+                self._counters["timeouts"] += 1
+        if not acquired:
+            raise PoolTimeoutError("Timed out waiting for a database connection")
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        self._wait_for(self._read_slots)
+        try:
+            with self._lock:
+                entry = self._idle_readers.pop() if self._idle_readers else None
+                self._readers_in_use += 1
+                self._readers_peak_in_use = max(self._readers_peak_in_use, self._readers_in_use)
+                self._counters["read_acquired"] += 1
+            entry = self._prepare(entry)
+        except BaseException:
+            with self._lock:
+                self._readers_in_use -= 1
+            self._read_slots.release()
+            raise
+
+        try:
+            yield entry.connection
+        finally:
+            keep = self._reset(entry)
+            with self._lock:
+                self._readers_in_use -= 1
+                if keep and not self._closed:
+                    self._idle_readers.append(entry)
+                elif keep:
+                    entry.connection.close()
+            self._read_slots.release()
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        self._wait_for(self._writer_lock)
+        try:
+            with self._lock:
+                self._writer_in_use = True
+                self._counters["write_acquired"] += 1
+            self._writer = self._prepare(self._writer)
+            entry = self._writer
+        except BaseException:
+            with self._lock:
+                self._writer_in_use = False
+            self._writer_lock.release()
+            raise
+
+        try:
+            yield entry.connection
+        finally:
+            if not self._reset(entry):
+                self._writer = None
+            with self._lock:
+                self._writer_in_use = False
+            self._writer_lock.release()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "read_pool_size": self.read_size,
+                "readers_open": len(self._idle_readers) + self._readers_in_use,
+                "readers_idle": len(self._idle_readers),
+                "readers_in_use": self._readers_in_use,
+                "readers_peak_in_use": self._readers_peak_in_use,
+                "writer_in_use": self._writer_in_use,
+                **{
+                    key: round(value, 3) if isinstance(value, float) else value
+                    for key, value in self._counters.items()
+                },
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle_readers = self._idle_readers, []
+        for entry in idle:
+            entry.connection.close()
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.connection.close()
+                self._writer = None
+
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def _build_pool(settings: Settings) -> ConnectionPool:
+    return ConnectionPool(
+        settings.db_path,
+        read_size=settings.db_read_pool_size,
+        timeout_seconds=settings.db_pool_timeout_seconds,
+        idle_seconds=settings.db_pool_idle_seconds,
+        pragmas=storage_pragmas(settings),
+        busy_retries=settings.db_busy_retries,
+        busy_backoff_ms=settings.db_busy_backoff_ms,
+    )
+
+
+def init_pool(settings: Settings) -> ConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = _build_pool(settings)
+        return _pool
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _build_pool(get_settings())
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def _table_exists(connection: sqlite3.Connection, name: str) -> bool:
+    row = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+
+# Columns added after schema v1: (table, column, declaration, backfill SQL).
+# Applied to existing databases before DDL so that indexes on them can be built.
+COLUMN_MIGRATIONS: tuple[tuple[str, str, str, str | None], ...] = (
+    (
+        "goal_action_events",
+        "event_date",
+        "TEXT",
+        # created_at is stored in local time, so its date part is the local day.
+        "UPDATE goal_action_events SET event_date = substr(created_at, 1, 10) WHERE event_date IS NULL",
+    ),
+    ("goals", "version", "INTEGER NOT NULL DEFAULT 1", None),
+    (
+        "sync_changes",
+        "op",
+        "TEXT NOT NULL DEFAULT 'update' CHECK (op IN ('insert', 'update', 'delete'))",
+        # DDL then recreates the trigger with the op it writes.
+        "DROP TRIGGER IF EXISTS trg_goals_sync_insert",
+    ),
+)
+
+
+def _apply_column_migrations(connection: sqlite3.Connection) -> None:
+    for table, column, declaration, backfill in COLUMN_MIGRATIONS:
+        if not _table_exists(connection, table):
+            continue
+        columns = {row["name"] for row in connection.execute(f"PRAGMA table_info({table})")}
+        if column in columns:
+            continue
+        connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+        if backfill:
+            connection.execute(backfill)
+    connection.commit()
+
+
+def rebuild_daily_counts(connection: sqlite3.Connection) -> int:
+    """Recompute goal_daily_counts from goals; returns the number of rollup rows."""
+    connection.execute("DELETE FROM goal_daily_counts")
+    connection.execute(
+        """
+        INSERT INTO goal_daily_counts (user_id, target_date, status, cnt)
+        SELECT user_id, target_date, status, COUNT(*)
+        FROM goals
+        GROUP BY user_id, target_date, status
+        """
+    )
+    connection.commit()
+    row = connection.execute("SELECT COUNT(*) AS cnt FROM goal_daily_counts").fetchone()
+    return int(row["cnt"])
+
+
+def verify_daily_counts(connection: sqlite3.Connection) -> list[dict[str, Any]]:
+    """Return (user, day, status) keys whose rollup count disagrees with goals."""
+    rows = connection.execute(
+        """
+        WITH actual AS (
+            SELECT user_id, target_date, status, COUNT(*) AS cnt
+            FROM goals
+            GROUP BY user_id, target_date, status
+        ),
+        keys AS (
+            SELECT user_id, target_date, status FROM actual
+            UNION
+            SELECT user_id, target_date, status FROM goal_daily_counts
+        )
+        SELECT
+            k.user_id,
+            k.target_date,
+            k.status,
+            COALESCE(a.cnt, 0) AS expected,
+            COALESCE(c.cnt, 0) AS stored
+        FROM keys k
+        LEFT JOIN actual a
+            ON a.user_id = k.user_id AND a.target_date = k.target_date AND a.status = k.status
+        LEFT JOIN goal_daily_counts c
+            ON c.user_id = k.user_id AND c.target_date = k.target_date AND c.status = k.status
+        WHERE COALESCE(a.cnt, 0) != COALESCE(c.cnt, 0)
+        ORDER BY k.user_id, k.target_date, k.status
+        """
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def backfill_sync_changes(connection: sqlite3.Connection) -> int:
+    """Seed the change feed with every existing goal and policy; returns the row count.
+
+    Rows go in oldest update first so that a client syncing from 0 sees them
+    in roughly the order they were written.
+    """
+    connection.execute(
+        """
+        INSERT OR REPLACE INTO sync_changes (user_id, entity, entity_id)
+        SELECT user_id, 'goal', id FROM goals ORDER BY updated_at, id
+        """
+    )
+    connection.execute(
+        """
+        INSERT OR REPLACE INTO sync_changes (user_id, entity, entity_id)
+        SELECT user_id, 'policy', user_id FROM reminder_policies ORDER BY updated_at
+        """
+    )
+    connection.commit()
+    return connection.execute("SELECT COUNT(*) FROM sync_changes").fetchone()[0]
+
+
+def init_db(db_path: Path, pragmas: Mapping[str, str | int] | None = None) -> None:
+    with get_connection(db_path, pragmas=pragmas) as connection:
+        for name in STARTUP_PRAGMAS:
+            if pragmas and name in pragmas:
+                connection.execute(f"PRAGMA {name} = {pragmas[name]};")
+        has_daily_counts = _table_exists(connection, "goal_daily_counts")
+        has_sync_changes = _table_exists(connection, "sync_changes")
+        _apply_column_migrations(connection)
         connection.executescript(DDL)
         connection.commit()
+        if not has_daily_counts:
+            # Existing databases get the rollup backfilled once.
+            rebuild_daily_counts(connection)
+        if not has_sync_changes:
+            backfill_sync_changes(connection)
+
 
+def _insert_default_policy(connection: sqlite3.Connection, user_id: int, timestamp: str) -> None:
+    connection.execute(
+        """
+        INSERT INTO reminder_policies (
+            user_id,
+            active_window_start,
+            active_window_end,
+            quiet_period_enabled,
+            quiet_period_start,
+            quiet_period_end,
+            interval_minutes,
+            default_snooze_options,
+            sound_enabled,
+            persistence_mode,
+            escalation_enabled,
+            escalation_step_minutes,
+            global_pause_until,
+            ask_about_auto_moved_morning,
+            updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            user_id,
+            DEFAULT_POLICY["active_window_start"],
+            DEFAULT_POLICY["active_window_end"],
+            DEFAULT_POLICY["quiet_period_enabled"],
+            DEFAULT_POLICY["quiet_period_start"],
+            DEFAULT_POLICY["quiet_period_end"],
+            DEFAULT_POLICY["interval_minutes"],
+            DEFAULT_POLICY["default_snooze_options"],
+            DEFAULT_POLICY["sound_enabled"],
+            DEFAULT_POLICY["persistence_mode"],
+            DEFAULT_POLICY["escalation_enabled"],
+            DEFAULT_POLICY["escalation_step_minutes"],
+            DEFAULT_POLICY["global_pause_until"],
+            DEFAULT_POLICY["ask_about_auto_moved_morning"],
+            timestamp,
+        ),
+    )
 
-def seed_single_user_defaults(db_path: Path) -> None:
+
+def create_user(
+    connection: sqlite3.Connection,
+    display_name: str,
+    timezone: str,
+    telegram_id: str | None = None,
+) -> int:
+    """Insert a user with the default reminder policy; the caller commits."""
     timestamp = now_iso()
-    with get_connection(db_path) as connection:
+    row = fetch_returning(
+        connection,
+        """
+        INSERT INTO users (telegram_id, display_name, timezone, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        RETURNING id
+        """,
+        (telegram_id, display_name, timezone, timestamp, timestamp),
+    )
+    if row is None:
+        raise RuntimeError("Failed to create user")
+    user_id = int(row["id"])
+    _insert_default_policy(connection, user_id, timestamp)
+    return user_id
+
+
+def seed_single_user_defaults(db_path: Path, pragmas: Mapping[str, str | int] | None = None) -> None:
+    with get_connection(db_path, pragmas=pragmas) as connection:
         user = connection.execute(
             "SELECT id FROM users ORDER BY id LIMIT 1"
         ).fetchone()
 
         if user is None:
-            cursor = connection.execute(
-                """
-                INSERT INTO users (telegram_id, display_name, timezone, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                (None, "MVP User", "Europe/Paris", timestamp, timestamp),
-            )
-            raw_id = cursor.lastrowid
-            if raw_id is None:
-                raise RuntimeError("Failed to create default user")
-            user_id = int(raw_id)
+            create_user(connection, "MVP User", "Europe/Paris")
         else:
             user_id = int(user["id"])
-
-        policy = connection.execute(
-            "SELECT user_id FROM reminder_policies WHERE user_id = ?", (user_id,)
-        ).fetchone()
-
-        if policy is None:
-            connection.execute(
-                """
-                INSERT INTO reminder_policies (
-                    user_id,
-                    active_window_start,
-                    active_window_end,
-                    quiet_period_enabled,
-                    quiet_period_start,
-                    quiet_period_end,
-                    interval_minutes,
-                    default_snooze_options,
-                    sound_enabled,
-                    persistence_mode,
-                    escalation_enabled,
-                    escalation_step_minutes,
-                    global_pause_until,
-                    ask_about_auto_moved_morning,
-                    updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    user_id,
-                    DEFAULT_POLICY["active_window_start"],
-                    DEFAULT_POLICY["active_window_end"],
-                    DEFAULT_POLICY["quiet_period_enabled"],
-                    DEFAULT_POLICY["quiet_period_start"],
-                    DEFAULT_POLICY["quiet_period_end"],
-                    DEFAULT_POLICY["interval_minutes"],
-                    DEFAULT_POLICY["default_snooze_options"],
-                    DEFAULT_POLICY["sound_enabled"],
-                    DEFAULT_POLICY["persistence_mode"],
-                    DEFAULT_POLICY["escalation_enabled"],
-                    DEFAULT_POLICY["escalation_step_minutes"],
-                    DEFAULT_POLICY["global_pause_until"],
-                    DEFAULT_POLICY["ask_about_auto_moved_morning"],
-                    timestamp,
-                ),
-            )
+            policy = connection.execute(
+                "SELECT user_id FROM reminder_policies WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if policy is None:
+                _insert_default_policy(connection, user_id, now_iso())
 
         connection.commit()
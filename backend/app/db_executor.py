@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import queue
+import random
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+from app.config import Settings, get_settings
+from app.db import ConnectionPool, PoolTimeoutError, get_pool, is_busy_error
+from app.errors import APIError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ExecutorOverloadedError(RuntimeError):
+    """Raised when a read or write is submitted while its queue is full."""
+
+
+@dataclass
+class _WriteJob:
+    func: Callable[..., Any]
+    args: tuple[Any, ...]
+    future: Future[Any] = field(default_factory=Future)
+
+
+class DBExecutor:
+    """Runs all database work off the event loop on dedicated threads.
+
+    Reads go to a thread pool sized like the connection pool's reader slots,
+    so they never wait for a connection; nothing else may take reader slots
+    directly, background threads included. Writes are queued for a single
+    writer thread that owns the writer connection and group-commits them:
+    queued jobs (up to ``group_max_jobs``, waiting up to ``group_window_ms``
+    for more while writes keep coming in) share one transaction and one
+    commit, each inside its own savepoint. Both queues are bounded; a full queue rejects new work
+    immediately instead of letting latency grow without limit.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        read_workers: int = 4,
+        read_queue_depth: int = 256,
+        write_queue_depth: int = 128,
+        group_window_ms: float = 2.0,
+        group_max_jobs: int = 64,
+    ) -> None:
+        self._pool = pool
+        self._group_window_seconds = group_window_ms / 1000
+        self._group_max_jobs = max(1, group_max_jobs)
+        self._read_workers = read_workers
+        self._read_queue_depth = read_queue_depth
+        self._write_queue_depth = write_queue_depth
+        self._readers: ThreadPoolExecutor | None = None
+        self._writes: queue.Queue[_WriteJob | None] = queue.Queue(maxsize=write_queue_depth)
+        self._writer_thread: threading.Thread | None = None
+        self._commit_listeners: list[Callable[[], None]] = []
+
+        self._lock = threading.Lock()
+        self._reads_pending = 0
+        self._counters = {
+            "reads_submitted": 0,
+            "reads_rejected": 0,
+            "writes_submitted": 0,
+            "writes_rejected": 0,
+            "writes_failed": 0,
+            "write_queue_peak": 0,
+            "groups_committed": 0,
+            "group_jobs_peak": 0,
+            "busy_retries": 0,
+        }
+
+    def start(self) -> None:
+        self._readers = ThreadPoolExecutor(max_workers=self._read_workers, thread_name_prefix="db-read")
+        self._writer_thread = threading.Thread(target=self._run_writer, name="db-writer", daemon=True)
+        self._writer_thread.start()
+        logger.info(
+            "DB executor started (read workers=%s, read queue=%s, write queue=%s)",
+            self._read_workers,
+            self._read_queue_depth,
+            self._write_queue_depth,
+        )
+
+    def stop(self) -> None:
+        if self._writer_thread is not None:
+            # Queued writes are drained before the sentinel is reached.
+            self._writes.put(None)
+            self._writer_thread.join(timeout=10)
+            self._writer_thread = None
+        if self._readers is not None:
+            self._readers.shutdown(wait=True, cancel_futures=True)
+            self._readers = None
+
+    def submit_read(self, func: Callable[..., T], *args: Any) -> Future[T]:
+        """Run ``func(connection, *args)`` on a reader connection."""
+        if self._readers is None:
+            raise RuntimeError("DB executor is not running")
+        with self._lock:
+            if self._reads_pending >= self._read_queue_depth:
+                self._counters["reads_rejected"] += 1
+                raise ExecutorOverloadedError("Read queue is full")
+            self._reads_pending += 1
+            self._counters["reads_submitted"] += 1
+        future = self._readers.submit(self._run_read, func, args)
+        future.add_done_callback(self._read_done)
+        return future
+
+    def submit_write(self, func: Callable[..., T], *args: Any) -> Future[T]:
+        """Queue ``func(connection, *args)`` for the writer thread's next group commit."""
+        if self._writer_thread is None:
+            raise RuntimeError("DB executor is not running")
+        job = _WriteJob(func, args)
+        try:
+            self._writes.put_nowait(job)
+        except queue.Full as exc:
+            with self._lock:
+                self._counters["writes_rejected"] += 1
+            raise ExecutorOverloadedError("Write queue is full") from exc
+        with self._lock:
+            self._counters["writes_submitted"] += 1
+            self._counters["write_queue_peak"] = max(self._counters["write_queue_peak"], self._writes.qsize())
+        return job.future
+
+    def add_commit_listener(self, callback: Callable[[], None]) -> None:
+        """Call ``callback()`` on the writer thread after every group commit."""
+        self._commit_listeners.append(callback)
+
+    def remove_commit_listener(self, callback: Callable[[], None]) -> None:
+        if callback in self._commit_listeners:
+            self._commit_listeners.remove(callback)
+
+    async def read(self, func: Callable[..., T], *args: Any) -> T:
+        return await asyncio.wrap_future(self.submit_read(func, *args))
+
+    async def write(self, func: Callable[..., T], *args: Any) -> T:
+        return await asyncio.wrap_future(self.submit_write(func, *args))
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "read_workers": self._read_workers,
+                "read_queue_depth": self._read_queue_depth,
+                "reads_pending": self._reads_pending,
+                "write_queue_depth": self._write_queue_depth,
+                "write_queue_len": self._writes.qsize(),
+                **self._counters,
+            }
+
+    def _read_done(self, _: Future[Any]) -> None:
+        with self._lock:
+            self._reads_pending -= 1
+
+    def _run_read(self, func: Callable[..., T], args: tuple[Any, ...]) -> T:
+        with self._pool.reader() as connection:
+            return func(connection, *args)
+
+    def _collect_group(self, first: _WriteJob, wait: bool) -> tuple[list[_WriteJob], bool]:
+        """Gather jobs for one group commit; the flag is True once the stop sentinel was seen.
+
+        Already queued jobs are always taken; the window is only waited out
+        when ``wait`` is set, so an idle server does not delay lone writes.
+        """
+        group = [first]
+        deadline = time.monotonic() + (self._group_window_seconds if wait else 0)
+        while len(group) < self._group_max_jobs:
+            try:
+                remaining = deadline - time.monotonic()
+                job = self._writes.get(timeout=remaining) if remaining > 0 else self._writes.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                return group, True
+            group.append(job)
+        return group, False
+
+    def _run_writer(self) -> None:
+        stopping = False
+        last_group_size = 1
+        while not stopping:
+            first = self._writes.get()
+            if first is None:
+                return
+            # Only wait for company when the previous group actually coalesced.
+            group, stopping = self._collect_group(first, wait=last_group_size > 1)
+            last_group_size = len(group)
+            # False when the awaiting request was cancelled (client went away).
+            group = [job for job in group if job.future.set_running_or_notify_cancel()]
+            if not group:
+                continue
+            try:
+                outcomes = self._run_group(group)
+            except BaseException as exc:
+                outcomes = [(False, exc)] * len(group)
+            with self._lock:
+                self._counters["groups_committed"] += 1
+                self._counters["group_jobs_peak"] = max(self._counters["group_jobs_peak"], len(group))
+                self._counters["writes_failed"] += sum(1 for ok, _ in outcomes if not ok)
+            for job, (ok, value) in zip(group, outcomes):
+                if ok:
+                    job.future.set_result(value)
+                else:
+                    job.future.set_exception(value)
+            if any(ok for ok, _ in outcomes):
+                self._notify_commit()
+
+    def _notify_commit(self) -> None:
+        for callback in list(self._commit_listeners):
+            try:
+                callback()
+            except Exception:
+                logger.exception("Commit listener failed")
+
+    def _run_group(self, group: list[_WriteJob]) -> list[tuple[bool, Any]]:
+        """Run the jobs in one transaction with one commit.
+
+        Each job gets its own savepoint, so a failing job (a 409, a bad row)
+        is rolled back alone while the others still commit. BEGIN IMMEDIATE
+        takes the write lock up front; SQLITE_BUSY rolls back the whole group
+        and retries it. Results are handed out only after the commit.
+        """
+        with self._pool.writer() as connection:
+            for attempt in range(self._pool.busy_retries + 1):
+                try:
+                    connection.execute("BEGIN IMMEDIATE")
+                    outcomes = [self._run_in_savepoint(connection, job) for job in group]
+                    connection.commit()
+                    return outcomes
+                except BaseException as exc:
+                    if connection.in_transaction:
+                        connection.rollback()
+                    if not is_busy_error(exc) or attempt == self._pool.busy_retries:
+                        raise
+                with self._lock:
+                    self._counters["busy_retries"] += 1
+                delay = self._pool.busy_backoff_ms / 1000 * (2**attempt)
+                time.sleep(delay * random.uniform(0.5, 1.5))
+        raise AssertionError("unreachable")
+
+    def _run_in_savepoint(self, connection: sqlite3.Connection, job: _WriteJob) -> tuple[bool, Any]:
+        connection.execute("SAVEPOINT job")
+        try:
+            result = job.func(connection, *job.args)
+        except Exception as exc:
+            if is_busy_error(exc):
+                raise
+            connection.execute("ROLLBACK TO job")
+            connection.execute("RELEASE job")
+            return False, exc
+        connection.execute("RELEASE job")
+        return True, result
+
+
+_executor: DBExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _build_executor(settings: Settings) -> DBExecutor:
+    return DBExecutor(
+        get_pool(),
+        read_workers=settings.db_read_pool_size,
+        read_queue_depth=settings.db_read_queue_depth,
+        write_queue_depth=settings.db_write_queue_depth,
+        group_window_ms=settings.db_group_commit_window_ms,
+        group_max_jobs=settings.db_group_commit_max_jobs,
+    )
+
+
+def get_executor() -> DBExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = _build_executor(get_settings())
+    return _executor
+
+
+def start_db_executor() -> DBExecutor:
+    executor = get_executor()
+    executor.start()
+    return executor
+
+
+def stop_db_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.stop()
+            _executor = None
+
+
+async def db_read(func: Callable[..., T], *args: Any) -> T:
+    """Await ``func(connection, *args)`` on a reader thread; overload becomes 503."""
+    try:
+        return await get_executor().read(func, *args)
+    except (ExecutorOverloadedError, PoolTimeoutError) as exc:
+        raise APIError("SERVICE_UNAVAILABLE", "Database is busy, retry later", 503) from exc
+
+
+async def db_write(func: Callable[..., T], *args: Any) -> T:
+    """Await ``func(connection, *args)`` once its group commit is durable.
+
+    ``func`` must not commit or roll back itself; an exception it raises
+    rolls back only its own savepoint. A full write queue, a pool timeout or
+    SQLITE_BUSY after all retries become 503 SERVICE_UNAVAILABLE.
+    """
+    try:
+        return await get_executor().write(func, *args)
+    except (ExecutorOverloadedError, PoolTimeoutError) as exc:
+        raise APIError("SERVICE_UNAVAILABLE", "Database is busy, retry later", 503) from exc
+    except sqlite3.OperationalError as exc:
+        if not is_busy_error(exc):
+            raise
+        raise APIError("SERVICE_UNAVAILABLE", "Database is locked, retry later", 503) from exc
@@ -1,15 +1,94 @@
 from __future__ import annotations
 
+import argparse
+import sys
+
+from app.auth import issue_token, revoke_token
 from app.config import get_settings
-from app.db import init_db, seed_single_user_defaults
+from app.db import (
+    create_user,
+    get_connection,
+    init_db,
+    rebuild_daily_counts,
+    seed_single_user_defaults,
+    storage_pragmas,
+    verify_daily_counts,
+)
+
 
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.db_init")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="init",
+        choices=("init", "rebuild-counts", "verify-counts", "add-user", "issue-token", "revoke-token"),
+        help="init (default): create schema and seed; rebuild-counts / verify-counts: "
+        "recompute or check the goal_daily_counts rollup; add-user / issue-token / "
+        "revoke-token: manage users and their bearer tokens",
+    )
+    parser.add_argument("--name", help="add-user: display name")
+    parser.add_argument("--timezone", default="Europe/Paris", help="add-user: IANA timezone")
+    parser.add_argument("--telegram-id", help="add-user: Telegram user id")
+    parser.add_argument("--user-id", type=int, help="issue-token: owner of the token")
+    parser.add_argument("--label", help="issue-token: note to tell tokens apart")
+    parser.add_argument("--token", help="revoke-token: the token to revoke")
+    args = parser.parse_args(argv)
+    if args.command == "add-user" and not args.name:
+        parser.error("add-user requires --name")
+    if args.command == "issue-token" and args.user_id is None:
+        parser.error("issue-token requires --user-id")
+    if args.command == "revoke-token" and not args.token:
+        parser.error("revoke-token requires --token")
 
-def main() -> None:
     settings = get_settings()
-    init_db(settings.db_path)
-    seed_single_user_defaults(settings.db_path)
-    print(f"Database initialized at: {settings.db_path}")
+    pragmas = storage_pragmas(settings)
+    init_db(settings.db_path, pragmas)
+
+    if args.command == "init":
+        seed_single_user_defaults(settings.db_path, pragmas)
+        print(f"Database initialized at: {settings.db_path}")
+        return 0
+
+    with get_connection(settings.db_path, pragmas=pragmas) as connection:
+        if args.command == "add-user":
+            user_id = create_user(connection, args.name, args.timezone, args.telegram_id)
+            connection.commit()
+            print(f"User created: id={user_id}")
+            return 0
+
+        if args.command == "issue-token":
+            if connection.execute("SELECT 1 FROM users WHERE id = ?", (args.user_id,)).fetchone() is None:
+                print(f"User {args.user_id} not found")
+                return 1
+            token = issue_token(connection, args.user_id, args.label)
+            connection.commit()
+            print(f"Token for user {args.user_id} (shown once): {token}")
+            return 0
+
+        if args.command == "revoke-token":
+            revoked = revoke_token(connection, args.token)
+            connection.commit()
+            print("Token revoked" if revoked else "Token not found or already revoked")
+            return 0 if revoked else 1
+
+        if args.command == "rebuild-counts":
+            rows = rebuild_daily_counts(connection)
+            print(f"goal_daily_counts rebuilt: {rows} rows")
+            return 0
+
+        mismatches = verify_daily_counts(connection)
+    if not mismatches:
+        print("goal_daily_counts is consistent with goals")
+        return 0
+    for item in mismatches:
+        print(
+            f"user={item['user_id']} date={item['target_date']} status={item['status']}: "
+            f"expected {item['expected']}, stored {item['stored']}"
+        )
+    print(f"{len(mismatches)} mismatching rows; run `python -m app.db_init rebuild-counts`")
+    return 1
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
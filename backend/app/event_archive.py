@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from typing import Any
+
+from app.config import get_settings
+from app.db import ConnectionPool, PoolTimeoutError, get_pool, is_busy_error, now_iso
+from app.db_executor import ExecutorOverloadedError, get_executor
+
+logger = logging.getLogger(__name__)
+
+EVENT_COLUMNS = ("id", "goal_id", "action_type", "action_payload", "source", "created_at", "event_date")
+# Pause between batches of one pass, so queued API writes go first.
+BATCH_PAUSE_SECONDS = 0.05
+RETRY_DELAY_SECONDS = 30.0
+
+
+def archive_events_batch(connection: sqlite3.Connection, before_date: str, batch_size: int) -> int:
+    """Move up to ``batch_size`` events dated before ``before_date`` into segments.
+
+    Takes the oldest events by (event_date, id), so within a day archived ids
+    are always below the live ones. Each (user, day) run becomes one
+    goal_event_segments row (zlib-compressed NDJSON of the raw columns), the
+    goal_event_daily_counts rollup is bumped and the events are deleted.
+    Returns the number of events archived. Runs as a write job on the DB
+    executor.
+    """
+    rows = connection.execute(
+        f"""
+        SELECT {", ".join(f"e.{column}" for column in EVENT_COLUMNS)}, g.user_id
+        FROM goal_action_events e
+        JOIN goals g ON e.goal_id = g.id
+        WHERE e.event_date < ?
+        ORDER BY e.event_date, e.id
+        LIMIT ?
+        """,
+        (before_date, batch_size),
+    ).fetchall()
+    if not rows:
+        return 0
+
+    runs: dict[tuple[int, str], list[sqlite3.Row]] = {}
+    for row in rows:
+        runs.setdefault((row["user_id"], row["event_date"]), []).append(row)
+
+    timestamp = now_iso()
+    for (user_id, event_date), events in runs.items():
+        ndjson = "\n".join(
+            json.dumps({column: event[column] for column in EVENT_COLUMNS}, ensure_ascii=False, separators=(",", ":"))
+            for event in events
+        )
+        connection.execute(
+            """
+            INSERT INTO goal_event_segments (
+                user_id, event_date, first_id, last_id, event_count, events, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                user_id,
+                event_date,
+                events[0]["id"],
+                events[-1]["id"],
+                len(events),
+                zlib.compress(ndjson.encode()),
+                timestamp,
+            ),
+        )
+        counts: dict[str, int] = {}
+        for event in events:
+            counts[event["action_type"]] = counts.get(event["action_type"], 0) + 1
+        connection.executemany(
+            """
+            INSERT INTO goal_event_daily_counts (user_id, event_date, action_type, cnt)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (user_id, event_date, action_type) DO UPDATE SET cnt = cnt + excluded.cnt
+            """,
+            [(user_id, event_date, action_type, cnt) for action_type, cnt in counts.items()],
+        )
+
+    connection.executemany("DELETE FROM goal_action_events WHERE id = ?", [(row["id"],) for row in rows])
+    return len(rows)
+
+
+def read_archived_events(
+    connection: sqlite3.Connection,
+    user_id: int,
+    event_date: str,
+    before_id: int | None,
+    limit: int,
+) -> list[dict[str, Any]]:
+    """Archived events of a user's day, newest first, ids below ``before_id``.
+
+    Only the segments that can hold such ids are decompressed.
+    """
+    segments = connection.execute(
+        """
+        SELECT events FROM goal_event_segments
+        WHERE user_id = ? AND event_date = ? AND first_id < ?
+        ORDER BY last_id DESC
+        """,
+        (user_id, event_date, before_id if before_id is not None else 2**63 - 1),
+    )
+    events: list[dict[str, Any]] = []
+    for segment in segments:
+        lines = zlib.decompress(segment["events"]).decode().split("\n")
+        for line in reversed(lines):
+            event = json.loads(line)
+            if before_id is not None and event["id"] >= before_id:
+                continue
+            events.append(event)
+            if len(events) == limit:
+                return events
+    return events
+
+
+def read_event_counts(
+    connection: sqlite3.Connection, user_id: int, first_day: date, last_day: date
+) -> dict[str, dict[str, int]]:
+    """Events per day and action_type: live events plus the archived rollup."""
+    rows = connection.execute(
+        """
+        SELECT e.event_date, e.action_type, COUNT(*) AS cnt
+        FROM goal_action_events e
+        JOIN goals g ON e.goal_id = g.id
+        WHERE e.event_date BETWEEN ? AND ? AND g.user_id = ?
+        GROUP BY e.event_date, e.action_type
+        UNION ALL
+        SELECT event_date, action_type, cnt
+        FROM goal_event_daily_counts
+        WHERE user_id = ? AND event_date BETWEEN ? AND ?
+        """,
+        (first_day.isoformat(), last_day.isoformat(), user_id, user_id, first_day.isoformat(), last_day.isoformat()),
+    ).fetchall()
+    days: dict[str, dict[str, int]] = {}
+    for row in rows:
+        counts = days.setdefault(row["event_date"], {})
+        counts[row["action_type"]] = counts.get(row["action_type"], 0) + row["cnt"]
+    return dict(sorted(days.items()))
+
+
+class EventArchiver:
+    """Background thread that moves old goal_action_events into the archive.
+
+    Every ``interval_seconds`` it archives events dated more than
+    ``after_days`` days ago, ``batch_size`` events per write job, until none
+    are left. Each batch is a short job of its own on the DB executor, so the
+    write lock is never held for a whole pass and API writes queued meanwhile
+    run between batches.
+    """
+
+    def __init__(self, pool: ConnectionPool, after_days: int, batch_size: int, interval_seconds: float) -> None:
+        self._pool = pool
+        self.after_days = after_days
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._archived = 0
+        self._batches = 0
+        self._last_run_at: str | None = None
+
+    def start(self) -> None:
+        with self._condition:
+            self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="event-archiver", daemon=True)
+        self._thread.start()
+        logger.info("Event archiver started (events older than %s days)", self.after_days)
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self) -> dict[str, Any]:
+        return {"archived": self._archived, "batches": self._batches, "last_run_at": self._last_run_at}
+
+    def _wait(self, seconds: float) -> bool:
+        with self._condition:
+            if not self._stopping:
+                self._condition.wait(timeout=seconds)
+            return not self._stopping
+
+    def archive_pass(self) -> int:
+        """Archive everything past the horizon in batches; returns the event count."""
+        before_date = (date.today() - timedelta(days=self.after_days)).isoformat()
+        archived = 0
+        while True:
+            moved = get_executor().submit_write(archive_events_batch, before_date, self.batch_size).result()
+            archived += moved
+            self._archived += moved
+            self._batches += 1
+            if moved < self.batch_size or not self._wait(BATCH_PAUSE_SECONDS):
+                break
+        self._last_run_at = now_iso()
+        return archived
+
+    def _run(self) -> None:
+        delay = 0.0
+        while self._wait(delay):
+            started = time.monotonic()
+            try:
+                archived = self.archive_pass()
+            except Exception as exc:
+                if isinstance(exc, (ExecutorOverloadedError, PoolTimeoutError)) or is_busy_error(exc):
+                    logger.warning("Event archive pass deferred: %s", exc)
+                else:
+                    logger.exception("Event archive pass failed")
+                delay = RETRY_DELAY_SECONDS
+                continue
+            if archived:
+                logger.info("Archived %s events in %.2fs", archived, time.monotonic() - started)
+            delay = self.interval_seconds
+
+
+_archiver: EventArchiver | None = None
+_archiver_lock = threading.Lock()
+
+
+def get_event_archiver() -> EventArchiver | None:
+    return _archiver
+
+
+def start_event_archiver() -> EventArchiver | None:
+    """Start the archiver unless EVENT_ARCHIVE_AFTER_DAYS is 0."""
+    global _archiver
+    with _archiver_lock:
+        if _archiver is None:
+            settings = get_settings()
+            if settings.event_archive_after_days <= 0:
+                logger.info("Event archiver disabled (EVENT_ARCHIVE_AFTER_DAYS is 0)")
+                return None
+            _archiver = EventArchiver(
+                get_pool(),
+                settings.event_archive_after_days,
+                settings.event_archive_batch_size,
+                settings.event_archive_interval_seconds,
+            )
+            _archiver.start()
+        return _archiver
+
+
+def stop_event_archiver() -> None:
+    global _archiver
+    with _archiver_lock:
+        if _archiver is not None:
+            _archiver.stop()
+            _archiver = None
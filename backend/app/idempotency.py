@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import TypeVar
+
+from fastapi import Depends, Header, Request, Response
+
+from app.auth import require_auth
+from app.cache import TTLCache
+from app.config import get_settings
+from app.db import now_iso
+from app.db_executor import db_read, db_write
+from app.errors import APIError
+
+T = TypeVar("T")
+
+MAX_KEY_LENGTH = 255
+# Larger responses (big batches) are replayed from the table only.
+MAX_CACHED_BODY_CHARS = 64 * 1024
+PRUNE_INTERVAL_SECONDS = 3600.0
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Body and extra response headers of a successful write.
+Rendered = tuple[dict[str, object], dict[str, str]]
+
+
+@dataclass(frozen=True)
+class IdempotencyKey:
+    user_id: int
+    key: str
+    fingerprint: str
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: str
+    status_code: int
+    body: str
+    headers: dict[str, str]
+
+
+_settings = get_settings()
+_responses: TTLCache[tuple[int, str], StoredResponse] = TTLCache(
+    _settings.idempotency_ttl_seconds, _settings.idempotency_cache_size
+)
+_next_prune = 0.0
+
+
+async def idempotency_key(
+    request: Request,
+    idempotency_key: str | None = Header(None),
+    user_id: int = Depends(require_auth),
+) -> IdempotencyKey | None:
+    """The request's Idempotency-Key, fingerprinted by method, path and body."""
+    if idempotency_key is None:
+        return None
+    if not 0 < len(idempotency_key) <= MAX_KEY_LENGTH or not idempotency_key.isprintable():
+        raise APIError("VALIDATION_ERROR", f"Idempotency-Key must be 1..{MAX_KEY_LENGTH} printable characters", 400)
+    digest = hashlib.sha256(f"{request.method} {request.url.path}\n".encode())
+    digest.update(await request.body())
+    return IdempotencyKey(user_id, idempotency_key, digest.hexdigest())
+
+
+def _encode(body: dict[str, object]) -> str:
+    # Same encoding as FastAPI's JSONResponse, so replays are byte-identical.
+    return json.dumps(body, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def _cutoff() -> str:
+    expires = datetime.now().astimezone() - timedelta(seconds=_settings.idempotency_ttl_seconds)
+    return expires.isoformat(timespec="seconds")
+
+
+def _load(connection: sqlite3.Connection, user_id: int, key: str) -> StoredResponse | None:
+    row = connection.execute(
+        """
+        SELECT fingerprint, status_code, body, headers FROM idempotency_keys
+        WHERE user_id = ? AND idempotency_key = ? AND created_at >= ?
+        """,
+        (user_id, key, _cutoff()),
+    ).fetchone()
+    if row is None:
+        return None
+    return StoredResponse(row["fingerprint"], row["status_code"], row["body"], json.loads(row["headers"]))
+
+
+def _run_once(
+    connection: sqlite3.Connection,
+    idempotency: IdempotencyKey,
+    job: Callable[[sqlite3.Connection], T],
+    render: Callable[[T], Rendered],
+    prune: bool,
+) -> tuple[StoredResponse, bool]:
+    """Run the write and store its response, unless the key already has one (a db_write job).
+
+    Returns (response, replayed). The key row is written in the job's own
+    savepoint, so a failing write stores nothing and can be retried.
+    """
+    if prune:
+        connection.execute("DELETE FROM idempotency_keys WHERE created_at < ?", (_cutoff(),))
+    stored = _load(connection, idempotency.user_id, idempotency.key)
+    if stored is not None:
+        return stored, True
+    body, headers = render(job(connection))
+    stored = StoredResponse(idempotency.fingerprint, 200, _encode(body), headers)
+    connection.execute(
+        """
+        INSERT OR REPLACE INTO idempotency_keys (
+            user_id, idempotency_key, fingerprint, status_code, body, headers, created_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            idempotency.user_id,
+            idempotency.key,
+            stored.fingerprint,
+            stored.status_code,
+            stored.body,
+            json.dumps(stored.headers),
+            now_iso(),
+        ),
+    )
+    return stored, False
+
+
+def _respond(idempotency: IdempotencyKey, stored: StoredResponse, replayed: bool) -> Response:
+    if stored.fingerprint != idempotency.fingerprint:
+        raise APIError("IDEMPOTENCY_KEY_REUSED", "Idempotency-Key was already used for a different request", 422)
+    headers = dict(stored.headers)
+    if replayed:
+        headers[REPLAYED_HEADER] = "true"
+    return Response(stored.body, stored.status_code, headers=headers, media_type="application/json")
+
+
+async def write_once(
+    idempotency: IdempotencyKey | None,
+    response: Response,
+    job: Callable[[sqlite3.Connection], T],
+    render: Callable[[T], Rendered],
+) -> dict[str, object] | Response:
+    """``db_write(job)`` rendered as the response, at most once per Idempotency-Key.
+
+    Without a key this is a plain write. With one, a repeat gets the stored
+    response (header ``Idempotent-Replayed: true``) from the in-memory cache
+    or the idempotency_keys table without running ``job`` again; the same key
+    with a different method, path or body is rejected with 422.
+    """
+    global _next_prune
+    if idempotency is None:
+        body, headers = render(await db_write(job))
+        response.headers.update(headers)
+        return body
+
+    cache_key = (idempotency.user_id, idempotency.key)
+    stored = _responses.get(cache_key)
+    if stored is not None:
+        return _respond(idempotency, stored, True)
+    # Another worker may have stored it; a read does not queue behind writes.
+    stored = await db_read(_load, idempotency.user_id, idempotency.key)
+    replayed = stored is not None
+    if stored is None:
+        prune = time.monotonic() >= _next_prune
+        stored, replayed = await db_write(_run_once, idempotency, job, render, prune)
+        if prune:
+            _next_prune = time.monotonic() + PRUNE_INTERVAL_SECONDS
+    if len(stored.body) <= MAX_CACHED_BODY_CHARS:
+        _responses.set(cache_key, stored)
+    return _respond(idempotency, stored, replayed)
@@ -8,11 +8,21 @@ from fastapi.exceptions import RequestValidationError
 
 from app.api.goals import router as goals_router
 from app.api.health import router as health_router
+from app.api.reminder_plan import router as reminder_plan_router
 from app.api.reminder_policy import router as reminder_policy_router
+from app.api.reminders import router as reminders_router
+from app.api.reminders import start_report_buffer, stop_report_buffer
+from app.api.stream import router as stream_router
+from app.api.stream import start_change_broker, stop_change_broker
 from app.config import get_settings
-from app.db import init_db, seed_single_user_defaults
+from app.db import close_pool, init_db, init_pool, seed_single_user_defaults, storage_pragmas
+from app.db_executor import start_db_executor, stop_db_executor
 from app.errors import APIError, api_error_handler, request_validation_error_handler
+from app.event_archive import start_event_archiver, stop_event_archiver
 from app.logging_config import setup_logging
+from app.reminders import start_reminder_scheduler, stop_reminder_scheduler
+from app.rollover import start_rollover_scheduler, stop_rollover_scheduler
+from app.snooze import start_snooze_waker, stop_snooze_waker
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -22,15 +32,39 @@ settings = get_settings()
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     logger.info("Initializing database at %s", settings.db_path)
-    init_db(settings.db_path)
-    seed_single_user_defaults(settings.db_path)
+    pragmas = storage_pragmas(settings)
+    init_db(settings.db_path, pragmas)
+    seed_single_user_defaults(settings.db_path, pragmas)
     logger.info("Database initialized and seeded")
-    yield
+    init_pool(settings)
+    logger.info("Connection pool ready (readers=%s)", settings.db_read_pool_size)
+    start_db_executor()
+    start_snooze_waker()
+    start_rollover_scheduler()
+    start_reminder_scheduler()
+    start_event_archiver()
+    await start_change_broker()
+    await start_report_buffer()
+    try:
+        yield
+    finally:
+        await stop_report_buffer()
+        await stop_change_broker()
+        stop_event_archiver()
+        stop_reminder_scheduler()
+        stop_rollover_scheduler()
+        stop_snooze_waker()
+        stop_db_executor()
+        close_pool()
+        logger.info("Connection pool closed")
 
 
 app = FastAPI(title=settings.app_name, version="0.1.0", lifespan=lifespan)
 app.include_router(health_router)
 app.include_router(goals_router)
 app.include_router(reminder_policy_router)
+app.include_router(reminder_plan_router)
+app.include_router(reminders_router)
+app.include_router(stream_router)
 app.add_exception_handler(APIError, api_error_handler)
 app.add_exception_handler(RequestValidationError, request_validation_error_handler)
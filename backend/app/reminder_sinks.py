@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import urllib.request
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Protocol
+
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+TELEGRAM_TIMEOUT_SECONDS = 10.0
+
+
+@dataclass(frozen=True)
+class Reminder:
+    goal_id: int
+    user_id: int
+    telegram_id: str | None
+    title: str
+    note: str | None
+    target_date: str
+    fired_at: str
+    ignore_count: int
+    persistence_mode: str
+    sound_enabled: bool
+
+
+class ReminderSink(Protocol):
+    """Where due reminders go. deliver() runs on the scheduler's delivery pool and may block.
+
+    It returns True when the reminder reached the user; only then is the goal
+    stamped as reminded.
+    """
+
+    def deliver(self, reminder: Reminder) -> bool: ...
+
+
+class LogSink:
+    """Logs the reminder; it reaches no one, so the goal is not stamped."""
+
+    def deliver(self, reminder: Reminder) -> bool:
+        logger.info(
+            "Reminder for user %s: goal %s %r (ignored %s times)",
+            reminder.user_id,
+            reminder.goal_id,
+            reminder.title,
+            reminder.ignore_count,
+        )
+        return False
+
+
+class MemorySink:
+    """Keeps delivered reminders in memory; for local runs and checks."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reminders: list[Reminder] = []
+
+    def deliver(self, reminder: Reminder) -> bool:
+        with self._lock:
+            self.reminders.append(reminder)
+        return True
+
+
+class TelegramSink:
+    """Sends the reminder to the user's Telegram chat through the Bot API."""
+
+    def __init__(self, bot_token: str) -> None:
+        if not bot_token:
+            raise ValueError("BOT_TOKEN is required for the telegram reminder sink")
+        self._url = f"{TELEGRAM_API_URL}/bot{bot_token}/sendMessage"
+
+    def deliver(self, reminder: Reminder) -> bool:
+        if reminder.telegram_id is None:
+            return False
+        text = f"⏰ Напоминание: {reminder.title}"
+        if reminder.note:
+            text += f"\n{reminder.note}"
+        body = json.dumps({
+            "chat_id": reminder.telegram_id,
+            "text": text,
+            "disable_notification": not reminder.sound_enabled,
+        }).encode()
+        request = urllib.request.Request(self._url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=TELEGRAM_TIMEOUT_SECONDS):
+            return True
+
+
+SINK_FACTORIES: dict[str, Callable[[Settings], ReminderSink]] = {
+    "log": lambda settings: LogSink(),
+    "memory": lambda settings: MemorySink(),
+    "telegram": lambda settings: TelegramSink(settings.bot_token),
+}
+
+
+def register_sink(name: str, factory: Callable[[Settings], ReminderSink]) -> None:
+    SINK_FACTORIES[name] = factory
+
+
+def build_sinks(settings: Settings) -> list[ReminderSink]:
+    """Sinks named in REMINDER_SINKS (comma-separated)."""
+    sinks = []
+    for name in (part.strip() for part in settings.reminder_sinks.split(",")):
+        if not name:
+            continue
+        try:
+            factory = SINK_FACTORIES[name]
+        except KeyError as exc:
+            raise ValueError(
+                f"Unknown REMINDER_SINKS entry '{name}', expected one of: {', '.join(SINK_FACTORIES)}"
+            ) from exc
+        sinks.append(factory(settings))
+    return sinks
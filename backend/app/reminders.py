@@ -0,0 +1,553 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import math
+import sqlite3
+import threading
+import time as time_module
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, tzinfo
+
+from app.config import get_settings
+from app.db import ConnectionPool, get_pool, now_iso
+from app.db_executor import get_executor
+from app.reminder_sinks import Reminder, ReminderSink, build_sinks
+from app.rollover import user_timezone
+
+logger = logging.getLogger(__name__)
+
+# Escalation never brings the interval below this (08-NOTIFICATION-SPEC).
+MIN_INTERVAL_MINUTES = 5
+# How often the change feed is read when no local commit woke the scheduler,
+# i.e. how late writes made by other workers are picked up.
+CHANGES_POLL_SECONDS = 1.0
+CHANGES_PAGE_SIZE = 1000
+RETRY_DELAY_SECONDS = 5.0
+# A claim not released after this long belongs to a worker that died mid-delivery.
+CLAIM_LEASE_SECONDS = 60.0
+# Threads that run the sinks, so a slow sink never holds up other due reminders.
+DELIVERY_WORKERS = 4
+MINUTES_PER_DAY = 24 * 60
+
+
+@dataclass(frozen=True)
+class UserContext:
+    timezone: tzinfo
+    telegram_id: str | None
+    policy: sqlite3.Row
+
+
+def load_user_contexts(connection: sqlite3.Connection, user_ids: Iterable[int]) -> dict[int, UserContext]:
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    rows = connection.execute(
+        f"""
+        SELECT u.id, u.timezone, u.telegram_id, p.* FROM users u
+        JOIN reminder_policies p ON p.user_id = u.id
+        WHERE u.id IN ({",".join("?" * len(user_ids))})
+        """,
+        user_ids,
+    ).fetchall()
+    return {row["id"]: UserContext(user_timezone(row["timezone"]), row["telegram_id"], row) for row in rows}
+
+
+def _parse_instant(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    # Offset-less values (global_pause_until) are in server local time.
+    return parsed if parsed.tzinfo is not None else parsed.astimezone()
+
+
+def _at(day: date, hhmm: str, tz: tzinfo) -> datetime:
+    return datetime.combine(day, time.fromisoformat(hhmm), tzinfo=tz)
+
+
+def effective_interval_minutes(policy: sqlite3.Row, ignore_count: int) -> int:
+    """interval_minutes, shortened by one escalation step per ignored reminder."""
+    interval = policy["interval_minutes"]
+    step = policy["escalation_step_minutes"]
+    if not policy["escalation_enabled"] or not step:
+        return interval
+    return max(min(interval, MIN_INTERVAL_MINUTES), interval - step * ignore_count)
+
+
+def next_fire_at(goal: sqlite3.Row, context: UserContext, now: datetime) -> datetime | None:
+    """When the goal should be reminded next, or None if not on its target day.
+
+    Follows 08-NOTIFICATION-SPEC: only active goals, only on target_date, only
+    inside the active window and outside the quiet period, not before the
+    global pause ends. The next reminder is the (escalated) interval after the
+    last one, or after creation for a goal never reminded; an overdue one
+    fires now.
+    """
+    if goal["status"] != "active":
+        return None
+    tz, policy = context.timezone, context.policy
+    target = date.fromisoformat(goal["target_date"])
+    if target < now.astimezone(tz).date():
+        return None
+
+    anchor = _parse_instant(goal["last_reminded_at"] or goal["created_at"])
+    interval = effective_interval_minutes(policy, goal["reminder_ignore_count"])
+    candidate = max(anchor + timedelta(minutes=interval), _at(target, policy["active_window_start"], tz))
+    if policy["global_pause_until"]:
+        candidate = max(candidate, _parse_instant(policy["global_pause_until"]))
+
+    # Reminders fire on whole minutes, like plan_day's minute grid: later
+    # instants round up, while the current minute already counts as now.
+    local = candidate.astimezone(tz)
+    if local.second or local.microsecond:
+        local = local.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    local = max(local, now.astimezone(tz).replace(second=0, microsecond=0))
+    if local.date() != target:
+        return None
+    if policy["quiet_period_enabled"] and policy["quiet_period_start"] and policy["quiet_period_end"]:
+        quiet_end = _at(target, policy["quiet_period_end"], tz)
+        if _at(target, policy["quiet_period_start"], tz) <= local < quiet_end:
+            local = quiet_end
+    if local > _at(target, policy["active_window_end"], tz):
+        return None
+    return local
+
+
+def _minute_of(day: date, instant: datetime, tz: tzinfo) -> int:
+    """Wall-clock minutes from the start of ``day`` to ``instant``, rounded up."""
+    local = instant.astimezone(tz).replace(tzinfo=None)
+    return math.ceil((local - datetime.combine(day, time.min)).total_seconds() / 60)
+
+
+def _clock_minute(hhmm: str) -> int:
+    parsed = time.fromisoformat(hhmm)
+    return parsed.hour * 60 + parsed.minute
+
+
+def _next_allowed_minutes(context: UserContext, day: date, now: datetime) -> list[int]:
+    """For each minute of the day, the first minute at or after it a reminder may fire.
+
+    The allowed minutes are a mask over the day's minute grid: the active
+    window (end inclusive) minus the quiet period, nothing before the current
+    minute or the end of the global pause. MINUTES_PER_DAY means "none left today".
+    """
+    policy = context.policy
+    allowed = bytearray(MINUTES_PER_DAY)
+    start, end = _clock_minute(policy["active_window_start"]), _clock_minute(policy["active_window_end"])
+    allowed[start : end + 1] = b"\x01" * (end + 1 - start)
+    if policy["quiet_period_enabled"] and policy["quiet_period_start"] and policy["quiet_period_end"]:
+        quiet_start, quiet_end = _clock_minute(policy["quiet_period_start"]), _clock_minute(policy["quiet_period_end"])
+        allowed[quiet_start:quiet_end] = bytes(max(0, quiet_end - quiet_start))
+    floor = _minute_of(day, now.replace(second=0, microsecond=0), context.timezone)
+    if policy["global_pause_until"]:
+        floor = max(floor, _minute_of(day, _parse_instant(policy["global_pause_until"]), context.timezone))
+    floor = min(max(floor, 0), MINUTES_PER_DAY)
+    allowed[:floor] = bytes(floor)
+
+    next_allowed = [MINUTES_PER_DAY] * (MINUTES_PER_DAY + 1)
+    for minute in range(MINUTES_PER_DAY - 1, -1, -1):
+        next_allowed[minute] = minute if allowed[minute] else next_allowed[minute + 1]
+    return next_allowed
+
+
+def plan_day(goals: Iterable[sqlite3.Row], context: UserContext, day: date, now: datetime) -> dict[int, list[datetime]]:
+    """Every reminder each goal would get on ``day`` if none is acted upon.
+
+    Same rules as next_fire_at, applied to the whole day at once: the mask is
+    built once per user, after which a goal costs one lookup per reminder, and
+    goals with the same anchor minute and ignore count share one schedule.
+    Fire times are whole minutes.
+    """
+    if day < now.astimezone(context.timezone).date():
+        return {goal["id"]: [] for goal in goals}
+    next_allowed = _next_allowed_minutes(context, day, now)
+    instants = [datetime.combine(day, time(minute // 60, minute % 60), tzinfo=context.timezone) for minute in range(MINUTES_PER_DAY)]
+    schedules: dict[tuple[int, int], list[datetime]] = {}
+    plan = {}
+    for goal in goals:
+        if goal["status"] != "active" or goal["target_date"] != day.isoformat():
+            plan[goal["id"]] = []
+            continue
+        anchor = _minute_of(day, _parse_instant(goal["last_reminded_at"] or goal["created_at"]), context.timezone)
+        key = (anchor, goal["reminder_ignore_count"])
+        if key not in schedules:
+            minutes = []
+            ignore_count = goal["reminder_ignore_count"]
+            minute = anchor + effective_interval_minutes(context.policy, ignore_count)
+            while minute < MINUTES_PER_DAY:
+                minute = next_allowed[max(minute, 0)]
+                if minute == MINUTES_PER_DAY:
+                    break
+                minutes.append(minute)
+                ignore_count += 1
+                minute += effective_interval_minutes(context.policy, ignore_count)
+            schedules[key] = [instants[minute] for minute in minutes]
+        plan[goal["id"]] = schedules[key]
+    return plan
+
+
+class DeadlineQueue:
+    """Min-heap of (fire time, goal id) with one live deadline per goal.
+
+    Rescheduling or cancelling is O(log n): the old heap entry is left in
+    place and skipped when it surfaces; the heap is rebuilt once stale
+    entries outnumber live ones.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[float, int, int]] = []
+        self._live: dict[int, tuple[float, int]] = {}
+        self._tokens = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def schedule(self, goal_id: int, fire_at: float) -> None:
+        current = self._live.get(goal_id)
+        if current is not None and current[0] == fire_at:
+            return
+        token = next(self._tokens)
+        self._live[goal_id] = (fire_at, token)
+        heapq.heappush(self._heap, (fire_at, token, goal_id))
+        if len(self._heap) > 2 * len(self._live) + 1024:
+            self._heap = [(at, entry_token, key) for key, (at, entry_token) in self._live.items()]
+            heapq.heapify(self._heap)
+
+    def cancel(self, goal_id: int) -> None:
+        self._live.pop(goal_id, None)
+
+    def _drop_stale(self) -> None:
+        while self._heap:
+            fire_at, token, goal_id = self._heap[0]
+            if self._live.get(goal_id) == (fire_at, token):
+                return
+            heapq.heappop(self._heap)
+
+    def next_deadline(self) -> float | None:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> list[int]:
+        due = []
+        self._drop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, goal_id = heapq.heappop(self._heap)
+            del self._live[goal_id]
+            due.append(goal_id)
+            self._drop_stale()
+        return due
+
+
+def _anchor(goal: sqlite3.Row) -> str:
+    return goal["last_reminded_at"] or goal["created_at"]
+
+
+def _reminder(goal: sqlite3.Row, context: UserContext, fired_at: str) -> Reminder:
+    return Reminder(
+        goal_id=goal["id"],
+        user_id=goal["user_id"],
+        telegram_id=context.telegram_id,
+        title=goal["title"],
+        note=goal["note"],
+        target_date=goal["target_date"],
+        fired_at=fired_at,
+        ignore_count=goal["reminder_ignore_count"],
+        persistence_mode=context.policy["persistence_mode"],
+        sound_enabled=bool(context.policy["sound_enabled"]),
+    )
+
+
+class ReminderScheduler:
+    """Background thread that fires goal reminders at their next-fire time.
+
+    Every active goal has one deadline in a DeadlineQueue. The thread tails
+    sync_changes (woken after each local group commit, polling otherwise)
+    and recomputes only the goals that changed, or all goals of a user whose
+    policy changed. A due goal is re-checked and claimed in one write job,
+    so with several workers only one of them delivers it to the sinks;
+    last_reminded_at is stamped only when a sink reached the user. The sinks
+    run on a small delivery pool, which hands the goal's next fire time back
+    to this thread.
+    """
+
+    def __init__(self, pool: ConnectionPool, sinks: Sequence[ReminderSink]) -> None:
+        self._pool = pool
+        self._sinks = list(sinks)
+        self._queue = DeadlineQueue()
+        self._users: dict[int, UserContext] = {}
+        self._cursor = 0
+        self._condition = threading.Condition()
+        self._changed = False
+        self._delivered: list[tuple[int, float]] = []
+        self._delivery: ThreadPoolExecutor | None = None
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._fired = 0
+        self._undelivered = 0
+
+    def start(self) -> None:
+        self._cursor, goals, users = get_executor().submit_read(self._read_active_goals).result()
+        self._users.update(users)
+        self._reschedule(goals)
+        self._stopping = False
+        self._delivery = ThreadPoolExecutor(max_workers=DELIVERY_WORKERS, thread_name_prefix="reminder-delivery")
+        get_executor().add_commit_listener(self.notify)
+        self._thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+        self._thread.start()
+        logger.info("Reminder scheduler started with %s pending reminders", len(self._queue))
+
+    def stop(self) -> None:
+        get_executor().remove_commit_listener(self.notify)
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._delivery is not None:
+            # Claims of reminders still in flight expire with their lease.
+            self._delivery.shutdown(wait=False, cancel_futures=True)
+            self._delivery = None
+
+    def notify(self) -> None:
+        """Called after a commit: read the change feed on the next turn."""
+        with self._condition:
+            self._changed = True
+            self._condition.notify()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": len(self._queue),
+            "fired": self._fired,
+            "undelivered": self._undelivered,
+            "cursor": self._cursor,
+        }
+
+    @staticmethod
+    def _read_active_goals(connection: sqlite3.Connection) -> tuple[int, list[sqlite3.Row], dict[int, UserContext]]:
+        """Read job: the change feed cursor, every goal that may still fire and their users."""
+        cursor = connection.execute("SELECT COALESCE(MAX(seq), 0) FROM sync_changes").fetchone()[0]
+        goals = connection.execute(
+            "SELECT * FROM goals WHERE status = 'active' AND target_date >= date('now', '-1 day')"
+        ).fetchall()
+        return cursor, goals, load_user_contexts(connection, {goal["user_id"] for goal in goals})
+
+    def _reschedule(self, goals: Iterable[sqlite3.Row]) -> None:
+        now = datetime.now().astimezone()
+        for goal in goals:
+            context = self._users.get(goal["user_id"])
+            fire_at = next_fire_at(goal, context, now) if context is not None else None
+            if fire_at is None:
+                self._queue.cancel(goal["id"])
+            else:
+                self._queue.schedule(goal["id"], fire_at.timestamp())
+
+    @staticmethod
+    def _read_changes(
+        connection: sqlite3.Connection, cursor: int, known_users: frozenset[int]
+    ) -> tuple[list[sqlite3.Row], list[sqlite3.Row], dict[int, UserContext]]:
+        """Read job: one page of the change feed after ``cursor``.
+
+        Returns the changes, the goals to reschedule and the user contexts to
+        (re)load: users whose policy changed and users not known yet.
+        """
+        changes = connection.execute(
+            "SELECT seq, user_id, entity, entity_id, deleted FROM sync_changes WHERE seq > ? ORDER BY seq LIMIT ?",
+            (cursor, CHANGES_PAGE_SIZE),
+        ).fetchall()
+        policy_users = {row["user_id"] for row in changes if row["entity"] == "policy"}
+        goal_ids = {row["entity_id"] for row in changes if row["entity"] == "goal" and not row["deleted"]}
+        goals = []
+        if goal_ids:
+            goals = connection.execute(
+                f"SELECT * FROM goals WHERE id IN ({','.join('?' * len(goal_ids))})", list(goal_ids)
+            ).fetchall()
+        if policy_users:
+            # Every pending goal of the user may move with the new policy.
+            goals += connection.execute(
+                f"""
+                SELECT * FROM goals
+                WHERE user_id IN ({",".join("?" * len(policy_users))})
+                    AND status = 'active' AND target_date >= date('now', '-1 day')
+                """,
+                list(policy_users),
+            ).fetchall()
+        user_ids = policy_users | ({goal["user_id"] for goal in goals} - known_users)
+        return changes, goals, load_user_contexts(connection, user_ids)
+
+    def _apply_changes(self) -> None:
+        has_more = True
+        while has_more:
+            changes, goals, users = get_executor().submit_read(
+                self._read_changes, self._cursor, frozenset(self._users)
+            ).result()
+            if not changes:
+                return
+            has_more = len(changes) == CHANGES_PAGE_SIZE
+            self._cursor = changes[-1]["seq"]
+            self._users.update(users)
+            for row in changes:
+                if row["entity"] == "goal" and row["deleted"]:
+                    self._queue.cancel(row["entity_id"])
+            self._reschedule(goals)
+
+    def _claim(self, connection: sqlite3.Connection, goal_id: int) -> tuple[sqlite3.Row | None, datetime | None]:
+        """Write job: (goal, None) if its reminder is due and now ours, else (None, when to look again)."""
+        goal = connection.execute("SELECT * FROM goals WHERE id = ?", (goal_id,)).fetchone()
+        context = self._users.get(goal["user_id"]) if goal is not None else None
+        if context is None:
+            return None, None
+        now = datetime.now().astimezone()
+        fire_at = next_fire_at(goal, context, now)
+        if fire_at is None or fire_at > now:
+            # Changed meanwhile, or already reminded by another worker.
+            return None, fire_at
+        timestamp = now_iso()
+        lease_expired = (now - timedelta(seconds=CLAIM_LEASE_SECONDS)).isoformat(timespec="seconds")
+        claimed = connection.execute(
+            """
+            INSERT INTO reminder_claims (goal_id, anchor, claimed_at) VALUES (?, ?, ?)
+            ON CONFLICT (goal_id) DO UPDATE SET anchor = excluded.anchor, claimed_at = excluded.claimed_at
+            WHERE reminder_claims.anchor != excluded.anchor OR julianday(reminder_claims.claimed_at) < julianday(?)
+            RETURNING goal_id
+            """,
+            (goal_id, _anchor(goal), timestamp, lease_expired),
+        ).fetchone()
+        if claimed is not None:
+            return goal, None
+        # Another worker is delivering it. Its stamp reschedules the goal here
+        # through the change feed; if it reaches no one or dies, nothing is
+        # stamped, so look again once its lease is over.
+        held = connection.execute("SELECT claimed_at FROM reminder_claims WHERE goal_id = ?", (goal_id,)).fetchone()
+        return None, _parse_instant(held["claimed_at"]) + timedelta(seconds=CLAIM_LEASE_SECONDS)
+
+    @staticmethod
+    def _finish(connection: sqlite3.Connection, goal: sqlite3.Row, delivered: bool) -> sqlite3.Row | None:
+        """Write job: release the claim and, if a sink delivered, stamp last_reminded_at."""
+        stamped = None
+        if delivered:
+            # Reminder bookkeeping leaves version alone, so a reminder never
+            # makes the user's next If-Match action fail with 412. Ignores
+            # are counted from the phone's acks only, not here.
+            stamped = connection.execute(
+                """
+                UPDATE goals SET last_reminded_at = ?
+                WHERE id = ? AND COALESCE(last_reminded_at, created_at) = ?
+                RETURNING *
+                """,
+                (now_iso(), goal["id"], _anchor(goal)),
+            ).fetchone()
+        connection.execute(
+            "DELETE FROM reminder_claims WHERE goal_id = ? AND anchor = ?", (goal["id"], _anchor(goal))
+        )
+        return stamped
+
+    def _fire(self, goal_id: int) -> None:
+        goal, fire_at = get_executor().submit_write(self._claim, goal_id).result()
+        if goal is None:
+            if fire_at is not None:
+                self._queue.schedule(goal_id, fire_at.timestamp())
+            return
+        assert self._delivery is not None
+        self._delivery.submit(self._deliver, goal, self._users[goal["user_id"]])
+
+    def _deliver(self, goal: sqlite3.Row, context: UserContext) -> None:
+        """Delivery pool: run the sinks, release the claim and hand back the next fire time."""
+        goal_id = goal["id"]
+        try:
+            fire_at = self._deliver_claimed(goal, context)
+        except Exception:
+            logger.exception("Reminder for goal %s failed", goal_id)
+            fire_at = datetime.now().astimezone() + timedelta(seconds=RETRY_DELAY_SECONDS)
+        if fire_at is not None:
+            with self._condition:
+                self._delivered.append((goal_id, fire_at.timestamp()))
+                self._condition.notify()
+
+    def _deliver_claimed(self, goal: sqlite3.Row, context: UserContext) -> datetime | None:
+        goal_id = goal["id"]
+        reminder = _reminder(goal, context, now_iso())
+        delivered = False
+        for sink in self._sinks:
+            try:
+                delivered = sink.deliver(reminder) or delivered
+            except Exception:
+                logger.exception("Reminder sink %s failed for goal %s", type(sink).__name__, goal_id)
+        stamped = get_executor().submit_write(self._finish, goal, delivered).result()
+        with self._condition:
+            if delivered:
+                self._fired += 1
+            else:
+                self._undelivered += 1
+        now = datetime.now().astimezone()
+        if stamped is not None:
+            fire_at = next_fire_at(stamped, context, now)
+        else:
+            # Reached no one (or a report moved the goal on meanwhile): nothing
+            # was stamped, so look at it again one interval later.
+            interval = effective_interval_minutes(context.policy, goal["reminder_ignore_count"])
+            fire_at = now + timedelta(minutes=interval)
+        return fire_at
+
+    def _wait(self) -> bool:
+        """Sleep until a change, a delivery, the next deadline or the poll interval; False when stopping."""
+        with self._condition:
+            if not self._changed and not self._delivered and not self._stopping:
+                timeout = CHANGES_POLL_SECONDS
+                deadline = self._queue.next_deadline()
+                if deadline is not None:
+                    timeout = max(0.0, min(timeout, deadline - time_module.time()))
+                self._condition.wait(timeout=timeout)
+            self._changed = False
+            return not self._stopping
+
+    def _run(self) -> None:
+        while self._wait():
+            try:
+                self._apply_changes()
+            except Exception:
+                logger.exception("Failed to read the change feed for reminders")
+                with self._condition:
+                    self._condition.wait(timeout=RETRY_DELAY_SECONDS)
+                continue
+            with self._condition:
+                delivered, self._delivered = self._delivered, []
+            for goal_id, fire_at in delivered:
+                self._queue.schedule(goal_id, fire_at)
+            for goal_id in self._queue.pop_due(time_module.time()):
+                try:
+                    self._fire(goal_id)
+                except Exception:
+                    logger.exception("Reminder for goal %s failed", goal_id)
+                    self._queue.schedule(goal_id, time_module.time() + RETRY_DELAY_SECONDS)
+
+
+_scheduler: ReminderScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_reminder_scheduler() -> ReminderScheduler | None:
+    return _scheduler
+
+
+def start_reminder_scheduler() -> ReminderScheduler | None:
+    """Start the scheduler unless REMINDER_SINKS is empty."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            sinks = build_sinks(get_settings())
+            if not sinks:
+                logger.info("Reminder scheduler disabled (REMINDER_SINKS is empty)")
+                return None
+            _scheduler = ReminderScheduler(get_pool(), sinks)
+            _scheduler.start()
+        return _scheduler
+
+
+def stop_reminder_scheduler() -> None:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.stop()
+            _scheduler = None
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import sqlite3
+import threading
+import time as time_module
+from datetime import date, datetime, time, timedelta, tzinfo
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from app.db import ConnectionPool, get_pool, now_iso
+from app.db_executor import get_executor
+
+logger = logging.getLogger(__name__)
+
+# How often the scheduler re-reads users to pick up new ones or timezone changes.
+USERS_REFRESH_SECONDS = 3600.0
+RETRY_DELAY_SECONDS = 30.0
+# job_runs rows older than this are pruned by the rollover job itself.
+JOB_RUNS_KEEP_DAYS = 7
+
+
+def user_timezone(name: str | None) -> tzinfo:
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            logger.warning("Unknown user timezone %r, falling back to server time", name)
+    local_tz = datetime.now().astimezone().tzinfo
+    assert local_tz is not None
+    return local_tz
+
+
+def user_today(connection: sqlite3.Connection, user_id: int) -> date:
+    row = connection.execute("SELECT timezone FROM users WHERE id = ?", (user_id,)).fetchone()
+    return datetime.now(user_timezone(row["timezone"] if row else None)).date()
+
+
+def rollover_overdue_goals(connection: sqlite3.Connection, user_id: int, today: date) -> list[sqlite3.Row]:
+    """AUTO_MOVE_TO_TOMORROW for every overdue active/snoozed goal of a user.
+
+    One UPDATE ... RETURNING moves the goals (target_date + 1 day), and one
+    executemany writes their auto_moved_to_tomorrow events. Returns the moved
+    rows ordered by (target_date, id). The caller commits (or runs it as a
+    DB executor write job).
+    """
+    timestamp = now_iso()
+    moved = connection.execute(
+        """
+        UPDATE goals
+        SET target_date = date(target_date, '+1 day'), status = 'active', snooze_until = NULL,
+            reminder_ignore_count = 0, updated_at = ?, version = version + 1
+        WHERE user_id = ? AND status IN ('active', 'snoozed') AND target_date < ?
+        RETURNING *
+        """,
+        (timestamp, user_id, today.isoformat()),
+    ).fetchall()
+    moved.sort(key=lambda row: (row["target_date"], row["id"]))
+
+    connection.executemany(
+        """
+        INSERT INTO goal_action_events (goal_id, action_type, action_payload, source, created_at, event_date)
+        VALUES (?, 'auto_moved_to_tomorrow', ?, 'backend_auto', ?, ?)
+        """,
+        [
+            (
+                row["id"],
+                json.dumps({
+                    "from": (date.fromisoformat(row["target_date"]) - timedelta(days=1)).isoformat(),
+                    "to": row["target_date"],
+                }),
+                timestamp,
+                timestamp[:10],
+            )
+            for row in moved
+        ],
+    )
+    return moved
+
+
+def claim_daily_run(connection: sqlite3.Connection, job: str, user_id: int, run_date: date) -> bool:
+    """Record that ``job`` ran for the user on ``run_date``; False if already claimed.
+
+    Every uvicorn worker runs its own scheduler, so the claim (in the same
+    transaction as the job's writes) makes sure only one of them does the work.
+    """
+    cursor = connection.execute(
+        "INSERT OR IGNORE INTO job_runs (job, user_id, run_date, created_at) VALUES (?, ?, ?, ?)",
+        (job, user_id, run_date.isoformat(), now_iso()),
+    )
+    return cursor.rowcount == 1
+
+
+def prune_job_runs(connection: sqlite3.Connection, job: str, user_id: int, before: date) -> int:
+    """Delete the user's ``job`` claims for run dates before ``before``."""
+    cursor = connection.execute(
+        "DELETE FROM job_runs WHERE job = ? AND user_id = ? AND run_date < ?",
+        (job, user_id, before.isoformat()),
+    )
+    return cursor.rowcount
+
+
+def _user_timezones(connection: sqlite3.Connection) -> list[sqlite3.Row]:
+    return connection.execute("SELECT id, timezone FROM users").fetchall()
+
+
+def _next_midnight(tz: tzinfo, now: float) -> float:
+    local_now = datetime.fromtimestamp(now, tz)
+    tomorrow = local_now.date() + timedelta(days=1)
+    return datetime.combine(tomorrow, time.min, tzinfo=tz).timestamp()
+
+
+class MidnightRollover:
+    """Background thread that runs the rollover at local midnight for each user.
+
+    Deadlines are kept in a min-heap of (next_midnight, user_id) computed in
+    the user's users.timezone. A catch-up run happens at startup for days the
+    app was not running.
+    """
+
+    def __init__(self, pool: ConnectionPool) -> None:
+        self._pool = pool
+        self._deadlines: list[tuple[float, int]] = []
+        self._timezones: dict[int, tzinfo] = {}
+        self._next_refresh = 0.0
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+
+    def start(self) -> None:
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="midnight-rollover", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _refresh_users(self) -> None:
+        rows = get_executor().submit_read(_user_timezones).result()
+        now = time_module.time()
+        with self._condition:
+            known = set(self._timezones)
+            self._timezones = {int(row["id"]): user_timezone(row["timezone"]) for row in rows}
+            for user_id in self._timezones.keys() - known:
+                heapq.heappush(self._deadlines, (now, user_id))
+            self._next_refresh = now + USERS_REFRESH_SECONDS
+
+    def _next_due(self) -> list[int] | None:
+        with self._condition:
+            while not self._stopping:
+                now = time_module.time()
+                wake_at = self._next_refresh
+                if self._deadlines:
+                    wake_at = min(wake_at, self._deadlines[0][0])
+                if wake_at > now:
+                    self._condition.wait(timeout=wake_at - now)
+                    continue
+                due = []
+                while self._deadlines and self._deadlines[0][0] <= now:
+                    due.append(heapq.heappop(self._deadlines)[1])
+                return due
+            return None
+
+    def _rollover_user(self, user_id: int) -> None:
+        tz = self._timezones[user_id]
+        today = datetime.now(tz).date()
+
+        def rollover(connection: sqlite3.Connection) -> list[sqlite3.Row] | None:
+            if not claim_daily_run(connection, "rollover", user_id, today):
+                return None
+            prune_job_runs(connection, "rollover", user_id, today - timedelta(days=JOB_RUNS_KEEP_DAYS))
+            return rollover_overdue_goals(connection, user_id, today)
+
+        moved = get_executor().submit_write(rollover).result()
+        if moved is not None:
+            logger.info("Rollover for user %s on %s moved %s goals", user_id, today, len(moved))
+
+    def _run(self) -> None:
+        while True:
+            try:
+                if time_module.time() >= self._next_refresh:
+                    self._refresh_users()
+            except Exception:
+                logger.exception("Failed to load users for rollover scheduling")
+                self._next_refresh = time_module.time() + RETRY_DELAY_SECONDS
+
+            due = self._next_due()
+            if due is None:
+                return
+            for user_id in due:
+                if user_id not in self._timezones:
+                    continue
+                try:
+                    self._rollover_user(user_id)
+                    next_run = _next_midnight(self._timezones[user_id], time_module.time())
+                except Exception:
+                    logger.exception("Scheduled rollover failed for user %s", user_id)
+                    next_run = time_module.time() + RETRY_DELAY_SECONDS
+                with self._condition:
+                    heapq.heappush(self._deadlines, (next_run, user_id))
+
+
+_scheduler: MidnightRollover | None = None
+_scheduler_lock = threading.Lock()
+
+
+def start_rollover_scheduler() -> MidnightRollover:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = MidnightRollover(get_pool())
+            _scheduler.start()
+        return _scheduler
+
+
+def stop_rollover_scheduler() -> None:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.stop()
+            _scheduler = None
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from app.db import ConnectionPool, PoolTimeoutError, get_pool, is_busy_error, now_iso
+from app.db_executor import ExecutorOverloadedError, get_executor
+
+logger = logging.getLogger(__name__)
+
+# Delay before retrying a wake-up pass that failed (busy writer, I/O error).
+RETRY_DELAY_SECONDS = 1.0
+
+
+def wake_expired_snoozes(connection: sqlite3.Connection) -> int:
+    """Return every snoozed goal whose snooze_until has passed to 'active'.
+
+    One set-based UPDATE over idx_goals_snooze_due. snooze_until values carry
+    their own UTC offset, so they are compared via julianday() rather than as
+    strings. Runs as a write job on the DB executor.
+    """
+    timestamp = now_iso()
+    cursor = connection.execute(
+        """
+        UPDATE goals
+        SET status = 'active', snooze_until = NULL, updated_at = ?, version = version + 1
+        WHERE status = 'snoozed' AND julianday(snooze_until) <= julianday(?)
+        """,
+        (timestamp, timestamp),
+    )
+    return cursor.rowcount
+
+
+def _snoozed_until(connection: sqlite3.Connection) -> list[sqlite3.Row]:
+    return connection.execute(
+        "SELECT snooze_until FROM goals WHERE status = 'snoozed' AND snooze_until IS NOT NULL"
+    ).fetchall()
+
+
+def _deadline(snooze_until: str) -> float:
+    value = datetime.fromisoformat(snooze_until)
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return value.timestamp()
+
+
+class SnoozeWaker:
+    """Background thread that wakes snoozed goals when their snooze ends.
+
+    Pending deadlines live in a min-heap; the thread sleeps until the earliest
+    one and then runs a single wake_expired_snoozes pass, so reads never have
+    to write. Stale deadlines (goal completed or re-snoozed meanwhile) only
+    cause a harmless no-op pass.
+    """
+
+    def __init__(self, pool: ConnectionPool) -> None:
+        self._pool = pool
+        self._deadlines: list[float] = []
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+
+    def start(self) -> None:
+        rows = get_executor().submit_read(_snoozed_until).result()
+        with self._condition:
+            for row in rows:
+                heapq.heappush(self._deadlines, _deadline(row["snooze_until"]))
+            # Catch up on anything that expired while the app was down.
+            heapq.heappush(self._deadlines, time.time())
+            self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="snooze-waker", daemon=True)
+        self._thread.start()
+        logger.info("Snooze waker started with %s pending deadlines", len(rows))
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def schedule(self, snooze_until: str) -> None:
+        with self._condition:
+            deadline = _deadline(snooze_until)
+            heapq.heappush(self._deadlines, deadline)
+            if self._deadlines[0] == deadline:
+                self._condition.notify()
+
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._deadlines)
+
+    def _wait_until_due(self) -> bool:
+        with self._condition:
+            while not self._stopping:
+                if not self._deadlines:
+                    self._condition.wait()
+                    continue
+                delay = self._deadlines[0] - time.time()
+                if delay > 0:
+                    self._condition.wait(timeout=delay)
+                    continue
+                now = time.time()
+                while self._deadlines and self._deadlines[0] <= now:
+                    heapq.heappop(self._deadlines)
+                return True
+            return False
+
+    def _run(self) -> None:
+        while self._wait_until_due():
+            try:
+                woken = get_executor().submit_write(wake_expired_snoozes).result()
+            except Exception as exc:
+                # Overload and a busy database are expected under load; anything
+                # else is a bug worth a traceback. Either way, retry later.
+                if not isinstance(exc, (ExecutorOverloadedError, PoolTimeoutError)) and not is_busy_error(exc):
+                    logger.exception("Snooze wake-up pass failed")
+                with self._condition:
+                    heapq.heappush(self._deadlines, time.time() + RETRY_DELAY_SECONDS)
+                continue
+            if woken:
+                logger.info("Woke %s snoozed goals", woken)
+
+
+_waker: SnoozeWaker | None = None
+_waker_lock = threading.Lock()
+
+
+def get_snooze_waker() -> SnoozeWaker:
+    global _waker
+    if _waker is None:
+        with _waker_lock:
+            if _waker is None:
+                _waker = SnoozeWaker(get_pool())
+    return _waker
+
+
+def start_snooze_waker() -> SnoozeWaker:
+    waker = get_snooze_waker()
+    waker.start()
+    return waker
+
+
+def stop_snooze_waker() -> None:
+    global _waker
+    with _waker_lock:
+        if _waker is not None:
+            _waker.stop()
+            _waker = None
@@ -1,6 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import random
+import time
+import uuid
+from collections import deque
 from datetime import date
 from typing import Any
 
@@ -8,44 +13,152 @@ import aiohttp
 
 logger = logging.getLogger(__name__)
 
+# Statuses that mean the backend did not run the request (overloaded DB
+# executor, proxy in front of a restarting worker), so it is safe to resend.
+RETRY_STATUSES = frozenset({502, 503, 504})
+RETRY_BACKOFF_SECONDS = 0.2
+RETRY_BACKOFF_MAX_SECONDS = 2.0
+# Latency samples kept per endpoint for percentiles.
+LATENCY_SAMPLES = 512
+
+
+class BackendAPIError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"API error: {status} {message}")
+        self.status = status
+
+
+class EndpointMetrics:
+    """Request counters and recent latencies for one endpoint."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies_ms: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def snapshot(self) -> dict[str, Any]:
+        samples = sorted(self.latencies_ms)
+
+        def percentile(fraction: float) -> float | None:
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(len(samples) * fraction))], 1)
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(samples[-1], 1) if samples else None,
+        }
+
 
 class BackendAPIClient:
-    def __init__(self, base_url: str, token: str):
+    """Backend client sharing one keep-alive connection pool for all requests.
+
+    Call ``start()`` before the first request and ``close()`` at shutdown.
+    Every request carries an Idempotency-Key, so connection errors,
+    timeouts and 502/503/504 are retried (with jittered exponential
+    backoff) without creating goals twice.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        timeout_seconds: float = 10.0,
+        retries: int = 2,
+        pool_size: int = 20,
+    ):
         self.base_url = base_url.rstrip("/")
         self.token = token
         self.headers = {"Authorization": f"Bearer {token}"} if token else {}
-    
-    async def create_goal(self, title: str, target_date: str | None = None) -> dict[str, Any]:
+        self.timeout = aiohttp.ClientTimeout(total=timeout_seconds)
+        self.retries = retries
+        self.pool_size = pool_size
+        self.metrics: dict[str, EndpointMetrics] = {}
+        self._session: aiohttp.ClientSession | None = None
+
+    async def start(self) -> None:
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=30,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=self.timeout,
+            )
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {path: metrics.snapshot() for path, metrics in self.metrics.items()}
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        payload: dict[str, Any],
+        idempotency_key: str | None = None,
+    ) -> dict[str, Any]:
+        if self._session is None:
+            raise RuntimeError("BackendAPIClient is not started")
+        # One key for all attempts: the backend applies the request once.
+        headers = {"Idempotency-Key": idempotency_key or uuid.uuid4().hex}
+        metrics = self.metrics.setdefault(path, EndpointMetrics())
+        metrics.requests += 1
+        for attempt in range(self.retries + 1):
+            started = time.monotonic()
+            try:
+                async with self._session.request(method, f"{self.base_url}{path}", json=payload, headers=headers) as resp:
+                    if resp.status in (200, 201):
+                        result = await resp.json()
+                        metrics.latencies_ms.append((time.monotonic() - started) * 1000)
+                        return result
+                    error_text = await resp.text()
+                    error: Exception = BackendAPIError(resp.status, error_text)
+                    retryable = resp.status in RETRY_STATUSES
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as exc:
+                error, retryable = exc, True
+            metrics.latencies_ms.append((time.monotonic() - started) * 1000)
+            if not retryable or attempt == self.retries:
+                metrics.errors += 1
+                logger.error(f"{method} {path} failed after {attempt + 1} attempt(s): {error!r}")
+                raise error
+            metrics.retries += 1
+            delay = min(RETRY_BACKOFF_MAX_SECONDS, RETRY_BACKOFF_SECONDS * 2**attempt)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+        raise AssertionError("unreachable")
+
+    async def create_goal(
+        self,
+        title: str,
+        target_date: str | None = None,
+        idempotency_key: str | None = None,
+    ) -> dict[str, Any]:
         """Create a single goal"""
-        url = f"{self.base_url}/api/goals"
         payload = {
             "title": title,
             "target_date": target_date or date.today().isoformat(),
             "source": "telegram",
         }
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload, headers=self.headers) as resp:
-                if resp.status == 200 or resp.status == 201:
-                    return await resp.json()
-                else:
-                    error_text = await resp.text()
-                    logger.error(f"Failed to create goal: {resp.status} {error_text}")
-                    raise Exception(f"API error: {resp.status}")
-    
-    async def create_goals_batch(self, titles: list[str], target_date: str | None = None) -> dict[str, Any]:
+        return await self._request("POST", "/api/goals", payload, idempotency_key)
+
+    async def create_goals_batch(
+        self,
+        titles: list[str],
+        target_date: str | None = None,
+        idempotency_key: str | None = None,
+    ) -> dict[str, Any]:
         """Create multiple goals at once"""
-        url = f"{self.base_url}/api/goals/batch"
         target = target_date or date.today().isoformat()
-        
         items = [{"title": title, "target_date": target, "source": "telegram"} for title in titles]
-        payload = {"items": items}
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload, headers=self.headers) as resp:
-                if resp.status == 200 or resp.status == 201:
-                    return await resp.json()
-                else:
-                    error_text = await resp.text()
-                    logger.error(f"Failed to create batch: {resp.status} {error_text}")
-                    raise Exception(f"API error: {resp.status}")
+        return await self._request("POST", "/api/goals/batch", {"items": items}, idempotency_key)
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+from aiogram.types import Message
+
+logger = logging.getLogger(__name__)
+
+FlushCallback = Callable[[list[Message], list[str]], Awaitable[None]]
+
+
+@dataclass
+class _PendingChat:
+    messages: list[Message] = field(default_factory=list)
+    lines: list[str] = field(default_factory=list)
+    timer: asyncio.TimerHandle | None = None
+
+
+class ChatBatcher:
+    """Coalesces goal lines sent to one chat in quick succession.
+
+    The first message of a burst opens a window of ``window_seconds``; lines
+    from messages arriving in that window are collected and handed to
+    ``flush`` in one call, so a burst costs one backend request and one
+    reply. Reaching ``max_items`` lines flushes at once.
+    """
+
+    def __init__(self, flush: FlushCallback, window_seconds: float = 0.5, max_items: int = 50):
+        self._flush = flush
+        self.window_seconds = window_seconds
+        self.max_items = max_items
+        self._pending: dict[int, _PendingChat] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def add(self, message: Message, lines: list[str]) -> None:
+        chat_id = message.chat.id
+        pending = self._pending.setdefault(chat_id, _PendingChat())
+        pending.messages.append(message)
+        pending.lines.extend(lines)
+        if len(pending.lines) >= self.max_items or self.window_seconds <= 0:
+            self._start_flush(chat_id)
+        elif pending.timer is None:
+            loop = asyncio.get_running_loop()
+            pending.timer = loop.call_later(self.window_seconds, self._start_flush, chat_id)
+
+    async def close(self) -> None:
+        """Flush every open window and wait for in-flight flushes."""
+        for chat_id in list(self._pending):
+            self._start_flush(chat_id)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _start_flush(self, chat_id: int) -> None:
+        pending = self._pending.pop(chat_id, None)
+        if pending is None:
+            return
+        if pending.timer is not None:
+            pending.timer.cancel()
+        task = asyncio.create_task(self._run_flush(pending), name=f"goal-batch-{chat_id}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_flush(self, pending: _PendingChat) -> None:
+        try:
+            await self._flush(pending.messages, pending.lines)
+        except Exception:
+            logger.exception(f"Failed to flush {len(pending.lines)} lines from {len(pending.messages)} messages")
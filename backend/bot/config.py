@@ -9,6 +9,26 @@ class BotConfig:
     bot_token: str
     backend_url: str
     backend_token: str
+    backend_timeout_seconds: float
+    backend_retries: int
+    backend_pool_size: int
+    batch_window_seconds: float
+    batch_max_items: int
+    spool_path: str
+    spool_batch_size: int
+    mode: str
+    telegram_secret: str
+    webhook_url: str
+    webhook_path: str
+    webhook_host: str
+    webhook_port: int
+    webhook_workers: int
+    webhook_queue_size: int
+    telegram_api_url: str
+    send_rate: float
+    chat_send_rate: float
+    chat_send_burst: int
+    send_concurrency: int
 
 
 def get_bot_config() -> BotConfig:
@@ -19,8 +39,35 @@ def get_bot_config() -> BotConfig:
     backend_url = os.getenv("BACKEND_URL", "http://localhost:8000")
     backend_token = os.getenv("MVP_TOKEN", "")
     
+    mode = os.getenv("BOT_MODE", "polling")
+    if mode not in ("polling", "webhook"):
+        raise ValueError("BOT_MODE must be 'polling' or 'webhook'")
+    telegram_secret = os.getenv("TELEGRAM_SECRET", "")
+    if mode == "webhook" and not telegram_secret:
+        raise ValueError("TELEGRAM_SECRET environment variable is required in webhook mode")
+    
     return BotConfig(
         bot_token=bot_token,
         backend_url=backend_url,
         backend_token=backend_token,
+        backend_timeout_seconds=float(os.getenv("BACKEND_TIMEOUT_SECONDS", "10")),
+        backend_retries=int(os.getenv("BACKEND_RETRIES", "2")),
+        backend_pool_size=int(os.getenv("BACKEND_POOL_SIZE", "20")),
+        batch_window_seconds=int(os.getenv("BOT_BATCH_WINDOW_MS", "500")) / 1000,
+        batch_max_items=int(os.getenv("BOT_BATCH_MAX_ITEMS", "50")),
+        spool_path=os.getenv("BOT_SPOOL_PATH", "data/bot_spool.db"),
+        spool_batch_size=int(os.getenv("BOT_SPOOL_BATCH_SIZE", "500")),
+        mode=mode,
+        telegram_secret=telegram_secret,
+        webhook_url=os.getenv("WEBHOOK_URL", ""),
+        webhook_path=os.getenv("WEBHOOK_PATH", "/telegram/webhook"),
+        webhook_host=os.getenv("WEBHOOK_HOST", "0.0.0.0"),
+        webhook_port=int(os.getenv("WEBHOOK_PORT", "8081")),
+        webhook_workers=int(os.getenv("WEBHOOK_WORKERS", "16")),
+        webhook_queue_size=int(os.getenv("WEBHOOK_QUEUE_SIZE", "100")),
+        telegram_api_url=os.getenv("TELEGRAM_API_URL", ""),
+        send_rate=float(os.getenv("BOT_SEND_RATE", "25")),
+        chat_send_rate=float(os.getenv("BOT_CHAT_SEND_RATE", "1")),
+        chat_send_burst=int(os.getenv("BOT_CHAT_SEND_BURST", "3")),
+        send_concurrency=int(os.getenv("BOT_SEND_CONCURRENCY", "8")),
     )
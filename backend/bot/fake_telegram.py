@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Offline stand-in for Telegram, for trying and load-testing webhook mode.
+
+Serves a fake Bot API that accepts every method (and records sendMessage),
+then posts text-message updates to the bot's webhook and reports how fast
+they were accepted and answered. Run the bot with BOT_MODE=webhook and
+TELEGRAM_API_URL pointing at this server, e.g.:
+
+    TELEGRAM_API_URL=http://127.0.0.1:8082 BOT_MODE=webhook python -m bot.main
+    python -m bot.fake_telegram --updates 2000 --chats 100
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+import aiohttp
+from aiohttp import web
+
+# Same as bot.webhook.SECRET_HEADER; not imported to keep aiogram out of this tool.
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class FakeBotAPI:
+    """Answers Bot API calls with ``ok``; sendMessage calls are kept in ``sent``."""
+
+    def __init__(self):
+        self.sent: list[tuple[float, int, str]] = []
+        self.calls: Counter[str] = Counter()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        return app
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        if method == "getMe":
+            result: object = {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}
+        elif method == "sendMessage":
+            chat_id = int(params["chat_id"])
+            self.sent.append((time.monotonic(), chat_id, str(params.get("text", ""))))
+            result = {
+                "message_id": len(self.sent),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": params.get("text", ""),
+            }
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+
+def text_update(update_id: int, chat_id: int, text: str) -> dict[str, object]:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Load"},
+            "text": text,
+        },
+    }
+
+
+async def send_updates(
+    webhook_url: str, secret: str, updates: int, chats: int, concurrency: int
+) -> tuple[list[float], Counter[int]]:
+    """Post ``updates`` messages spread over ``chats`` chats; returns (latencies in ms, statuses)."""
+    latencies: list[float] = []
+    statuses: Counter[int] = Counter()
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for update_id in range(1, updates + 1):
+        queue.put_nowait(update_id)
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        while not queue.empty():
+            update_id = queue.get_nowait()
+            payload = text_update(update_id, 1000 + update_id % chats, f"Goal {update_id}")
+            started = time.monotonic()
+            async with session.post(webhook_url, json=payload, headers={SECRET_HEADER: secret}) as resp:
+                statuses[resp.status] += 1
+            latencies.append((time.monotonic() - started) * 1000)
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+    return latencies, statuses
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--webhook", default="http://127.0.0.1:8081/telegram/webhook")
+    parser.add_argument("--secret", default="change-me")
+    parser.add_argument("--port", type=int, default=8082, help="port of the fake Bot API")
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--wait", type=float, default=5.0, help="seconds to wait for replies")
+    args = parser.parse_args()
+
+    api = FakeBotAPI()
+    runner = web.AppRunner(api.app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+    try:
+        started = time.monotonic()
+        latencies, statuses = await send_updates(args.webhook, args.secret, args.updates, args.chats, args.concurrency)
+        sent_for = time.monotonic() - started
+        await asyncio.sleep(args.wait)
+    finally:
+        await runner.cleanup()
+
+    print(f"updates: {args.updates} in {sent_for:.2f}s ({args.updates / sent_for:.0f}/s), statuses {dict(statuses)}")
+    print(f"webhook latency: p50 {_percentile(latencies, 0.5):.1f} ms, p95 {_percentile(latencies, 0.95):.1f} ms")
+    if api.sent:
+        last_reply = max(sent_at for sent_at, _, _ in api.sent) - started
+        print(f"replies: {len(api.sent)} to {len({chat for _, chat, _ in api.sent})} chats, last after {last_reply:.2f}s")
+    else:
+        print("replies: none")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -6,19 +6,56 @@ from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import Message
 
-from bot.api_client import BackendAPIClient
+from bot.batcher import ChatBatcher
+from bot.sender import ReplySender
+from bot.spool import GoalSpool
 
 logger = logging.getLogger(__name__)
 router = Router()
 
 
-def setup_handlers(api_client: BackendAPIClient) -> Router:
-    """Setup all bot handlers with API client"""
+async def create_goals(spool: GoalSpool, sender: ReplySender, messages: list[Message], lines: list[str]) -> None:
+    """Queue the goals collected from one chat and answer once"""
+    reply_to = messages[-1]
+    try:
+        # On disk before we answer; the spool sends them to the backend.
+        await spool.add(reply_to.chat.id, lines)
+    except Exception as e:
+        logger.error(f"Failed to spool goals: {e}", exc_info=True)
+        sender.send(
+            reply_to.chat.id,
+            "❌ Не удалось добавить цели. Попробуй позже."
+        )
+        return
+    
+    if len(lines) == 1:
+        sender.send(
+            reply_to.chat.id,
+            f"✅ Цель добавлена на сегодня:\n{lines[0]}"
+        )
+    else:
+        goals_text = "\n".join(f"• {line}" for line in lines)
+        sender.send(
+            reply_to.chat.id,
+            f"✅ Добавлено целей на сегодня: {len(lines)}\n\n{goals_text}"
+        )
+    logger.info(f"Spooled {len(lines)} goals from {len(messages)} messages for user {reply_to.from_user.id}")
+
+
+def notify_dropped(sender: ReplySender, chat_id: int, titles: list[str]) -> None:
+    """Tell the user a spooled goal was rejected by the backend"""
+    goals_text = "\n".join(f"• {title}" for title in titles)
+    sender.send(chat_id, f"⚠️ Не удалось сохранить цель, добавь её заново:\n{goals_text}")
+
+
+def setup_handlers(batcher: ChatBatcher, sender: ReplySender) -> Router:
+    """Setup all bot handlers"""
     
     @router.message(Command("start"))
     async def cmd_start(message: Message):
         """Handle /start command"""
-        await message.answer(
+        sender.send(
+            message.chat.id,
             "Привет! Я бот для быстрого добавления важных дел.\n\n"
             "Просто отправь мне текст — и он станет целью на сегодня.\n"
             "Можешь отправить несколько строк — каждая станет отдельной целью.\n\n"
@@ -30,7 +67,8 @@ def setup_handlers(api_client: BackendAPIClient) -> Router:
     @router.message(Command("help"))
     async def cmd_help(message: Message):
         """Handle /help command"""
-        await message.answer(
+        sender.send(
+            message.chat.id,
             "Как пользоваться ботом:\n\n"
             "1️⃣ Отправь одну строку → одна цель на сегодня\n"
             "   Пример: Проверить тетради 10А\n\n"
@@ -47,41 +85,20 @@ def setup_handlers(api_client: BackendAPIClient) -> Router:
     async def handle_text(message: Message):
         """Handle all text messages - create goals"""
         if not message.text:
-            await message.answer("Пришли текстовое сообщение с целью")
+            sender.send(message.chat.id, "Пришли текстовое сообщение с целью")
             return
         
         text = message.text.strip()
         if not text:
-            await message.answer("Сообщение пустое")
+            sender.send(message.chat.id, "Сообщение пустое")
             return
         
         lines = [line.strip() for line in text.split("\n") if line.strip()]
         
         if not lines:
-            await message.answer("Не удалось извлечь цели из сообщения")
+            sender.send(message.chat.id, "Не удалось извлечь цели из сообщения")
             return
         
-        try:
-            if len(lines) == 1:
-                # Single goal
-                result = await api_client.create_goal(lines[0])
-                await message.answer(
-                    f"✅ Цель добавлена на сегодня:\n{lines[0]}"
-                )
-                logger.info(f"Created single goal for user {message.from_user.id}: {lines[0]}")
-            else:
-                # Multiple goals (batch)
-                result = await api_client.create_goals_batch(lines)
-                count = result.get("data", {}).get("created_count", len(lines))
-                goals_text = "\n".join(f"• {line}" for line in lines)
-                await message.answer(
-                    f"✅ Добавлено целей на сегодня: {count}\n\n{goals_text}"
-                )
-                logger.info(f"Created {count} goals for user {message.from_user.id}")
-        except Exception as e:
-            logger.error(f"Failed to create goals: {e}", exc_info=True)
-            await message.answer(
-                "❌ Не удалось добавить цели. Попробуй позже или проверь, что backend запущен."
-            )
+        batcher.add(message, lines)
     
     return router
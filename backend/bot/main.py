@@ -5,13 +5,20 @@ import asyncio
 import logging
 import os
 import sys
+from functools import partial
 
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from dotenv import load_dotenv
 
 from bot.api_client import BackendAPIClient
+from bot.batcher import ChatBatcher
 from bot.config import get_bot_config
-from bot.handlers import setup_handlers
+from bot.handlers import create_goals, notify_dropped, setup_handlers
+from bot.sender import ReplySender
+from bot.spool import GoalSpool
+from bot.webhook import run_webhook
 
 # Setup logging
 logging.basicConfig(
@@ -30,27 +37,74 @@ async def main():
         config = get_bot_config()
     except ValueError as e:
         logger.error(f"Configuration error: {e}")
-        logger.error("Please set BOT_TOKEN environment variable")
         sys.exit(1)
     
     logger.info(f"Starting bot with backend at {config.backend_url}")
     
     # Initialize bot and dispatcher
-    bot = Bot(token=config.bot_token)
+    session = None
+    if config.telegram_api_url:
+        # Local Bot API server, or bot.fake_telegram for offline runs
+        session = AiohttpSession(api=TelegramAPIServer.from_base(config.telegram_api_url))
+    bot = Bot(token=config.bot_token, session=session)
     dp = Dispatcher()
     
     # Setup API client
-    api_client = BackendAPIClient(config.backend_url, config.backend_token)
+    api_client = BackendAPIClient(
+        config.backend_url,
+        config.backend_token,
+        timeout_seconds=config.backend_timeout_seconds,
+        retries=config.backend_retries,
+        pool_size=config.backend_pool_size,
+    )
+    await api_client.start()
+    
+    # All replies go through one rate-limited queue
+    sender = ReplySender(
+        bot,
+        global_rate=config.send_rate,
+        chat_rate=config.chat_send_rate,
+        chat_burst=config.chat_send_burst,
+        concurrency=config.send_concurrency,
+    )
+    await sender.start()
+    
+    # Goals go to the local spool first; it sends them to the backend
+    spool = GoalSpool(
+        config.spool_path,
+        api_client,
+        batch_size=config.spool_batch_size,
+        on_dropped=partial(notify_dropped, sender),
+    )
+    await spool.start()
+    
+    # Coalesce bursts of messages per chat into one spool write and reply
+    batcher = ChatBatcher(
+        partial(create_goals, spool, sender),
+        window_seconds=config.batch_window_seconds,
+        max_items=config.batch_max_items,
+    )
     
     # Register handlers
-    router = setup_handlers(api_client)
+    router = setup_handlers(batcher, sender)
     dp.include_router(router)
     
-    # Start polling
-    logger.info("Bot started. Press Ctrl+C to stop.")
+    logger.info(f"Bot started in {config.mode} mode. Press Ctrl+C to stop.")
     try:
-        await dp.start_polling(bot)
+        if config.mode == "webhook":
+            await run_webhook(bot, dp, config)
+        else:
+            await dp.start_polling(bot)
     finally:
+        await batcher.close()
+        await sender.close()
+        logger.info(f"Reply sender stats: {sender.stats()}")
+        pending = await spool.pending()
+        if pending:
+            logger.info(f"{pending} goals stay in the spool until the next start")
+        await spool.close()
+        logger.info(f"Backend API stats: {api_client.stats()}")
+        await api_client.close()
         await bot.session.close()
 
 
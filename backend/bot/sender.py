@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections import OrderedDict
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+# Telegram's limit for one message.
+MAX_MESSAGE_LENGTH = 4096
+MERGE_SEPARATOR = "\n\n"
+# Idle per-chat buckets are forgotten once this many chats are tracked.
+MAX_TRACKED_CHATS = 10000
+
+
+class TokenBucket:
+    """``rate`` tokens per second, holding at most ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available (0 when one is)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class ReplySender:
+    """Central outbound queue for bot messages, paced to Telegram's limits.
+
+    ``send()`` only queues the text. One task sends the queue oldest chat
+    first, taking a token from the global bucket (``global_rate`` messages/s,
+    evenly spaced) and from the chat's own bucket (``chat_rate``/s, bursts of
+    ``chat_burst``), with at most ``concurrency`` requests in flight and one
+    per chat so a chat's messages keep their order. Texts still queued for a
+    chat are merged into one message while they fit. A 429 puts the message
+    back and pauses all sending for the ``retry_after`` Telegram asks for.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        global_rate: float = 25.0,
+        chat_rate: float = 1.0,
+        chat_burst: int = 3,
+        concurrency: int = 8,
+    ):
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.concurrency = concurrency
+        # No burst globally: a full bucket of 25 plus 25/s would be 50 in the first second.
+        self._global = TokenBucket(global_rate, 1)
+        self._chats: dict[int, TokenBucket] = {}
+        self._pending: OrderedDict[int, list[str]] = OrderedDict()
+        self._in_flight: set[int] = set()
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._paused_until = 0.0
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._counters = {"queued": 0, "merged": 0, "sent": 0, "retry_after": 0, "failed": 0}
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="reply-sender")
+
+    async def close(self, drain_timeout: float = 10.0) -> None:
+        """Send what is queued (up to ``drain_timeout``), then stop."""
+        deadline = time.monotonic() + drain_timeout
+        while (self._pending or self._in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._pending:
+            logger.warning(f"Dropping unsent replies for {len(self._pending)} chats")
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        for task in list(self._tasks):
+            task.cancel()
+
+    def send(self, chat_id: int, text: str) -> None:
+        self._counters["queued"] += 1
+        texts = self._pending.setdefault(chat_id, [])
+        if texts and len(texts[-1]) + len(MERGE_SEPARATOR) + len(text) <= MAX_MESSAGE_LENGTH:
+            texts[-1] += MERGE_SEPARATOR + text
+            self._counters["merged"] += 1
+        else:
+            texts.append(text)
+        self._wake.set()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            **self._counters,
+            "pending_chats": len(self._pending),
+            "in_flight": len(self._in_flight),
+        }
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_TRACKED_CHATS:
+                now = time.monotonic()
+                self._chats = {
+                    chat: bucket
+                    for chat, bucket in self._chats.items()
+                    if chat in self._pending or chat in self._in_flight or not bucket.is_full(now)
+                }
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _dispatch(self) -> float | None:
+        """Start every send allowed now; returns seconds until the next one may be, None if idle."""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        wait: float | None = None
+        for chat_id in list(self._pending):
+            if len(self._in_flight) >= self.concurrency:
+                break
+            if chat_id in self._in_flight:
+                continue
+            chat_bucket = self._chat_bucket(chat_id)
+            delay = chat_bucket.delay(now)
+            if delay > 0:
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            delay = self._global.delay(now)
+            if delay > 0:
+                return delay if wait is None else min(wait, delay)
+            chat_bucket.take(now)
+            self._global.take(now)
+            texts = self._pending[chat_id]
+            text = texts.pop(0)
+            if texts:
+                # Other chats go first before this one's next message.
+                self._pending.move_to_end(chat_id)
+            else:
+                del self._pending[chat_id]
+            self._in_flight.add(chat_id)
+            task = asyncio.create_task(self._deliver(chat_id, text))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return wait
+
+    async def _deliver(self, chat_id: int, text: str) -> None:
+        try:
+            await self.bot.send_message(chat_id, text)
+            self._counters["sent"] += 1
+        except TelegramRetryAfter as exc:
+            self._counters["retry_after"] += 1
+            logger.warning(f"Telegram flood control, pausing sends for {exc.retry_after}s")
+            self._paused_until = max(self._paused_until, time.monotonic() + exc.retry_after)
+            # Back at the head of its chat, and the chat at the head of the queue.
+            self._pending.setdefault(chat_id, []).insert(0, text)
+            self._pending.move_to_end(chat_id, last=False)
+        except Exception:
+            self._counters["failed"] += 1
+            logger.exception(f"Failed to send a message to chat {chat_id}")
+        finally:
+            self._in_flight.discard(chat_id)
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            wait = self._dispatch()
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), wait)
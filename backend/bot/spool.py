@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import random
+import sqlite3
+import threading
+import uuid
+from collections.abc import Callable
+from datetime import date, datetime
+from pathlib import Path
+
+from bot.api_client import BackendAPIClient, BackendAPIError
+
+logger = logging.getLogger(__name__)
+
+SPOOL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spooled_goals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    target_date TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    batch_key TEXT
+);
+"""
+# Idle drainer re-checks the spool this often (rows left by another process).
+POLL_SECONDS = 30.0
+BACKOFF_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+
+class GoalSpool:
+    """Local SQLite queue of goals not yet sent to the backend.
+
+    Goals are written here first and the user is answered right away; a
+    background task sends the spool to ``POST /api/goals/batch`` in chunks
+    of ``batch_size`` goals, oldest first, and deletes what the backend
+    accepted. While the backend is down or answers 5xx the task backs off
+    exponentially with jitter; the file keeps the goals across restarts.
+    A chunk the backend rejects as invalid is split in halves until the bad
+    goals are alone; only those are dropped and passed to ``on_dropped``
+    (chat id, titles) so the user can be told.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        api_client: BackendAPIClient,
+        batch_size: int = 500,
+        on_dropped: Callable[[int, list[str]], None] | None = None,
+    ):
+        self.path = path
+        self.api_client = api_client
+        self.batch_size = batch_size
+        self.on_dropped = on_dropped
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self.sent = 0
+        self.dropped = 0
+
+    async def start(self) -> None:
+        await asyncio.to_thread(self._open)
+        self._task = asyncio.create_task(self._run(), name="goal-spool-drainer")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._connection is not None:
+            with self._lock:
+                self._connection.close()
+            self._connection = None
+
+    async def add(self, chat_id: int, titles: list[str], target_date: str | None = None) -> None:
+        """Persist the goals and wake the drainer; returns once they are on disk."""
+        target = target_date or date.today().isoformat()
+        await asyncio.to_thread(self._insert, chat_id, titles, target)
+        self._wake.set()
+
+    async def pending(self) -> int:
+        return await asyncio.to_thread(self._count)
+
+    def _open(self) -> None:
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SPOOL_SCHEMA)
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(spooled_goals)")}
+        if "batch_key" not in columns:
+            connection.execute("ALTER TABLE spooled_goals ADD COLUMN batch_key TEXT")
+        self._connection = connection
+
+    def _insert(self, chat_id: int, titles: list[str], target_date: str) -> None:
+        created_at = datetime.now().astimezone().isoformat(timespec="seconds")
+        with self._lock:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT INTO spooled_goals (chat_id, title, target_date, created_at) VALUES (?, ?, ?, ?)",
+                    [(chat_id, title, target_date, created_at) for title in titles],
+                )
+
+    def _count(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM spooled_goals").fetchone()[0]
+
+    def _next_chunk(self) -> tuple[str, str, list[int], list[int], list[str]]:
+        """The oldest chunk: (batch key, date, ids, chat ids, titles); empty ids when the spool is empty.
+
+        A chunk is fixed, with its Idempotency-Key, the first time it is read,
+        so every resend (also after a restart) is the same request and the
+        backend creates its goals once.
+        """
+        with self._lock:
+            first = self._connection.execute(
+                "SELECT batch_key, target_date FROM spooled_goals ORDER BY id LIMIT 1"
+            ).fetchone()
+            if first is None:
+                return "", "", [], [], []
+            batch_key, target_date = first
+            if batch_key is None:
+                batch_key = uuid.uuid4().hex
+                with self._connection:
+                    self._connection.execute(
+                        """
+                        UPDATE spooled_goals SET batch_key = ?
+                        WHERE id IN (
+                            SELECT id FROM spooled_goals
+                            WHERE target_date = ? AND batch_key IS NULL
+                            ORDER BY id
+                            LIMIT ?
+                        )
+                        """,
+                        (batch_key, target_date, self.batch_size),
+                    )
+            rows = self._connection.execute(
+                "SELECT id, chat_id, title FROM spooled_goals WHERE batch_key = ? ORDER BY id", (batch_key,)
+            ).fetchall()
+        return batch_key, target_date, [row[0] for row in rows], [row[1] for row in rows], [row[2] for row in rows]
+
+    def _split(self, ids: list[int]) -> None:
+        """Pin each half of a rejected chunk to a new batch key; the older half goes next."""
+        middle = len(ids) // 2
+        with self._lock:
+            with self._connection:
+                for half in (ids[:middle], ids[middle:]):
+                    self._connection.execute(
+                        f"UPDATE spooled_goals SET batch_key = ? WHERE id IN ({','.join('?' * len(half))})",
+                        [uuid.uuid4().hex, *half],
+                    )
+
+    def _delete(self, ids: list[int]) -> None:
+        with self._lock:
+            with self._connection:
+                self._connection.execute(
+                    f"DELETE FROM spooled_goals WHERE id IN ({','.join('?' * len(ids))})", ids
+                )
+
+    async def _send_next(self) -> bool:
+        """Send one chunk; False when the spool is empty."""
+        batch_key, target_date, ids, chat_ids, titles = await asyncio.to_thread(self._next_chunk)
+        if not ids:
+            return False
+        try:
+            await self.api_client.create_goals_batch(titles, target_date, idempotency_key=f"spool-{batch_key}")
+        except BackendAPIError as exc:
+            if exc.status >= 500 or exc.status in (401, 403, 429):
+                raise
+            # Rejected as invalid: resending would fail forever. Narrow it
+            # down so one bad goal does not take the others with it.
+            if len(ids) > 1:
+                logger.warning(f"Backend rejected a chunk of {len(ids)} spooled goals, splitting it: {exc}")
+                await asyncio.to_thread(self._split, ids)
+                return True
+            logger.error(f"Backend rejected spooled goal {titles[0]!r} for chat {chat_ids[0]}, dropping it: {exc}")
+            self.dropped += 1
+            if self.on_dropped is not None:
+                self.on_dropped(chat_ids[0], titles)
+        else:
+            self.sent += len(ids)
+        await asyncio.to_thread(self._delete, ids)
+        return True
+
+    async def _run(self) -> None:
+        failures = 0
+        while True:
+            # Cleared before reading, so goals added meanwhile wake the next wait.
+            self._wake.clear()
+            try:
+                sent = await self._send_next()
+            except Exception as exc:
+                failures += 1
+                delay = min(BACKOFF_MAX_SECONDS, BACKOFF_SECONDS * 2 ** (failures - 1))
+                logger.warning(f"Backend unavailable, retrying spool in {delay:.1f}s: {exc!r}")
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+                continue
+            if failures:
+                logger.info("Backend is back, draining spool")
+                failures = 0
+            if not sent:
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._wake.wait(), POLL_SECONDS)
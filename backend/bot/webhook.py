@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hmac
+import logging
+import signal
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+from bot.config import BotConfig
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def _chat_key(update: Update) -> int:
+    """Updates of one chat go to the same worker, so they are handled in order."""
+    event = update.event
+    chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None)
+    return user.id if user is not None else update.update_id
+
+
+class WebhookServer:
+    """Receives Telegram updates over HTTPS and feeds them to the dispatcher.
+
+    The request handler only checks the secret token, parses the update and
+    queues it, so Telegram gets its 200 right away. ``workers`` tasks process
+    the updates; each chat is pinned to one worker (and its queue of
+    ``queue_size``), which keeps a chat's messages in order while different
+    chats run concurrently. A full queue answers 503 and Telegram resends
+    later. ``stop()`` refuses new updates and drains the queued ones.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        dp: Dispatcher,
+        secret: str,
+        path: str = "/telegram/webhook",
+        workers: int = 16,
+        queue_size: int = 100,
+    ):
+        self.bot = bot
+        self.dp = dp
+        self.secret = secret
+        self.path = path
+        self._queues: list[asyncio.Queue[Update]] = [asyncio.Queue(maxsize=queue_size) for _ in range(workers)]
+        self._workers: list[asyncio.Task[None]] = []
+        self._runner: web.AppRunner | None = None
+        self._accepting = False
+        self.received = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self._handle)
+        return app
+
+    async def start(self, host: str, port: int) -> None:
+        self._workers = [
+            asyncio.create_task(self._work(queue), name=f"webhook-worker-{index}")
+            for index, queue in enumerate(self._queues)
+        ]
+        self._accepting = True
+        # aiogram already logs every update; skip the per-request access log.
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info(f"Webhook server listening on {host}:{port}{self.path}")
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        self._accepting = False
+        pending = sum(queue.qsize() for queue in self._queues)
+        if pending:
+            logger.info(f"Draining {pending} queued updates")
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), drain_timeout)
+        except TimeoutError:
+            logger.warning(f"Drain timed out, {sum(q.qsize() for q in self._queues)} updates dropped")
+        for task in self._workers:
+            task.cancel()
+        for task in self._workers:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._workers = []
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "queued": sum(queue.qsize() for queue in self._queues),
+        }
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token.encode(), self.secret.encode()):
+            return web.Response(status=401)
+        if not self._accepting:
+            return web.Response(status=503)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except ValueError:
+            return web.Response(status=400)
+        queue = self._queues[_chat_key(update) % len(self._queues)]
+        try:
+            queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return web.Response(status=503)
+        self.received += 1
+        return web.Response()
+
+    async def _work(self, queue: asyncio.Queue[Update]) -> None:
+        while True:
+            update = await queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception:
+                self.failed += 1
+                logger.exception(f"Failed to process update {update.update_id}")
+            finally:
+                queue.task_done()
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher, config: BotConfig) -> None:
+    """Serve the webhook until SIGINT/SIGTERM, then drain and return."""
+    server = WebhookServer(
+        bot,
+        dp,
+        config.telegram_secret,
+        path=config.webhook_path,
+        workers=config.webhook_workers,
+        queue_size=config.webhook_queue_size,
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await dp.emit_startup(bot=bot)
+    await server.start(config.webhook_host, config.webhook_port)
+    if config.webhook_url:
+        await bot.set_webhook(
+            f"{config.webhook_url.rstrip('/')}{config.webhook_path}",
+            secret_token=config.telegram_secret,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        logger.info(f"Webhook registered at {config.webhook_url}")
+    try:
+        await stop.wait()
+    finally:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+        await server.stop()
+        logger.info(f"Webhook stats: {server.stats()}")
+        await dp.emit_shutdown(bot=bot)
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+# Settings are read once per process, so the test database has to be chosen
+# before anything imports the app.
+_DB_DIR = tempfile.TemporaryDirectory()
+os.environ["DB_PATH"] = str(Path(_DB_DIR.name) / "test.db")
+os.environ["MVP_TOKEN"] = "test-token"
+os.environ["REMINDER_SINKS"] = ""
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client() -> Iterator[TestClient]:
+    with TestClient(app, headers={"Authorization": "Bearer test-token"}) as test_client:
+        yield test_client
@@ -0,0 +1,159 @@
+"""Group commit: one transaction per group, one savepoint per job."""
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, wait
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from app.db import ConnectionPool
+from app.db_executor import DBExecutor
+
+TIMEOUT = 5
+
+
+@pytest.fixture
+def pool(tmp_path: Path) -> Iterator[ConnectionPool]:
+    pool = ConnectionPool(tmp_path / "executor.db", busy_retries=3, busy_backoff_ms=1)
+    with pool.writer() as connection:
+        connection.execute("CREATE TABLE items (value INTEGER PRIMARY KEY)")
+        connection.commit()
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def executor(pool: ConnectionPool) -> Iterator[DBExecutor]:
+    executor = DBExecutor(pool, group_window_ms=0)
+    executor.start()
+    yield executor
+    executor.stop()
+
+
+def _insert(connection: sqlite3.Connection, value: int) -> int:
+    connection.execute("INSERT INTO items (value) VALUES (?)", (value,))
+    return value
+
+
+def _stored(pool: ConnectionPool) -> list[int]:
+    with pool.reader() as connection:
+        return [row["value"] for row in connection.execute("SELECT value FROM items ORDER BY value")]
+
+
+def _hold_writer(executor: DBExecutor) -> threading.Event:
+    """Keep the writer busy until the returned event is set, so later jobs queue up as one group."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def hold(connection: sqlite3.Connection) -> None:
+        started.set()
+        release.wait(TIMEOUT)
+
+    executor.submit_write(hold)
+    assert started.wait(TIMEOUT)
+    return release
+
+
+def _group(executor: DBExecutor, *jobs: Callable[..., Any]) -> list[Future[Any]]:
+    """Run the jobs as one group and wait for all of them."""
+    release = _hold_writer(executor)
+    futures = [executor.submit_write(job) for job in jobs]
+    groups = executor.stats()["groups_committed"]
+    release.set()
+    _, pending = wait(futures, TIMEOUT)
+    assert not pending
+    # The holder's group plus exactly one group for the queued jobs.
+    assert executor.stats()["groups_committed"] == groups + 2
+    return futures
+
+
+def test_failing_job_rolls_back_alone(executor: DBExecutor, pool: ConnectionPool) -> None:
+    def fail(connection: sqlite3.Connection) -> None:
+        _insert(connection, 2)
+        raise ValueError("bad row")
+
+    first, failed, last = _group(
+        executor,
+        lambda connection: _insert(connection, 1),
+        fail,
+        lambda connection: _insert(connection, 3),
+    )
+
+    assert first.result() == 1
+    assert isinstance(failed.exception(), ValueError)
+    assert last.result() == 3
+    assert _stored(pool) == [1, 3]
+    assert executor.stats()["writes_failed"] == 1
+
+
+def test_busy_error_retries_the_whole_group(executor: DBExecutor, pool: ConnectionPool) -> None:
+    runs = {"other": 0, "busy": 0}
+
+    def other(connection: sqlite3.Connection) -> int:
+        runs["other"] += 1
+        return _insert(connection, 1)
+
+    def busy_once(connection: sqlite3.Connection) -> int:
+        runs["busy"] += 1
+        if runs["busy"] == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return _insert(connection, 2)
+
+    first, second = _group(executor, other, busy_once)
+
+    assert (first.result(), second.result()) == (1, 2)
+    # The rolled back first attempt left nothing behind; both jobs ran again.
+    assert runs == {"other": 2, "busy": 2}
+    assert _stored(pool) == [1, 2]
+    assert executor.stats()["busy_retries"] == 1
+
+
+def test_results_are_released_after_commit(executor: DBExecutor, pool: ConnectionPool) -> None:
+    second_running = threading.Event()
+    finish_second = threading.Event()
+    seen_on_release: list[list[int]] = []
+
+    def slow(connection: sqlite3.Connection) -> int:
+        second_running.set()
+        finish_second.wait(TIMEOUT)
+        return _insert(connection, 2)
+
+    release = _hold_writer(executor)
+    first = executor.submit_write(_insert, 1)
+    first.add_done_callback(lambda _: seen_on_release.append(_stored(pool)))
+    second = executor.submit_write(slow)
+    release.set()
+
+    assert second_running.wait(TIMEOUT)
+    # The first job is done but its group has not committed yet.
+    assert not first.done()
+    finish_second.set()
+    assert first.result(TIMEOUT) == 1
+    assert second.result(TIMEOUT) == 2
+    # A reader sees the row by the time the result is handed out.
+    assert seen_on_release == [[1, 2]]
+
+
+def test_cancelled_job_is_skipped(executor: DBExecutor, pool: ConnectionPool) -> None:
+    ran: list[int] = []
+
+    def record(value: int) -> Callable[[sqlite3.Connection], int]:
+        def job(connection: sqlite3.Connection) -> int:
+            ran.append(value)
+            return _insert(connection, value)
+
+        return job
+
+    release = _hold_writer(executor)
+    cancelled = executor.submit_write(record(1))
+    kept = executor.submit_write(record(2))
+    assert cancelled.cancel()
+    release.set()
+
+    assert kept.result(TIMEOUT) == 2
+    assert ran == [2]
+    assert _stored(pool) == [2]
@@ -0,0 +1,88 @@
+"""plan_day's minute grid against next_fire_at iterated one reminder at a time."""
+from __future__ import annotations
+
+import random
+from datetime import date, datetime, timedelta
+from typing import Any
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.db import DEFAULT_POLICY
+from app.reminders import UserContext, next_fire_at, plan_day
+
+TZ = ZoneInfo("Europe/Paris")
+GOALS_PER_POLICY = 20
+POLICIES_PER_SEED = 30
+
+
+def _scalar_plan(goal: dict[str, Any], context: UserContext, now: datetime) -> list[datetime]:
+    """Every reminder of the day, assuming each one is ignored."""
+    goal = dict(goal)
+    fire_times = []
+    while (fire_at := next_fire_at(goal, context, now)) is not None:
+        fire_times.append(fire_at)
+        goal["last_reminded_at"] = fire_at.isoformat()
+        goal["reminder_ignore_count"] += 1
+    return fire_times
+
+
+def _instant(rnd: random.Random, day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, rnd.randrange(23), rnd.randrange(60), rnd.randrange(60), tzinfo=TZ)
+
+
+def _random_policy(rnd: random.Random, day: date) -> dict[str, Any]:
+    return {
+        **DEFAULT_POLICY,
+        "user_id": 1,
+        "updated_at": day.isoformat(),
+        "interval_minutes": rnd.choice([5, 10, 15, 30, 45, 60, 90]),
+        "escalation_enabled": rnd.choice([0, 1]),
+        "escalation_step_minutes": rnd.choice([None, 1, 5, 10]),
+        "quiet_period_enabled": rnd.choice([0, 1]),
+        "active_window_start": rnd.choice(["00:00", "06:00", "08:30", "09:00"]),
+        "active_window_end": rnd.choice(["18:00", "21:00", "23:59"]),
+        "global_pause_until": rnd.choice([None, _instant(rnd, day).isoformat()]),
+    }
+
+
+def _random_goal(rnd: random.Random, goal_id: int, day: date) -> dict[str, Any]:
+    created = _instant(rnd, day) - timedelta(hours=rnd.choice([0, 12]))
+    return {
+        "id": goal_id,
+        "status": "active",
+        "target_date": day.isoformat(),
+        "created_at": created.isoformat(),
+        "last_reminded_at": rnd.choice([None, created.isoformat()]),
+        "reminder_ignore_count": rnd.randrange(5),
+    }
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_plan_day_matches_scalar_reference(seed: int) -> None:
+    rnd = random.Random(seed)
+    day = date(2026, 10, 18)
+    for _ in range(POLICIES_PER_SEED):
+        context = UserContext(TZ, None, _random_policy(rnd, day))
+        # Half planned during the day itself, half the evening before.
+        now = _instant(rnd, day) if rnd.random() < 0.5 else datetime(2026, 10, 17, 12, tzinfo=TZ)
+        goals = [_random_goal(rnd, goal_id, day) for goal_id in range(GOALS_PER_POLICY)]
+        plan = plan_day(goals, context, day, now)
+        for goal in goals:
+            assert plan[goal["id"]] == _scalar_plan(goal, context, now), (context.policy, now, goal)
+
+
+def test_overdue_goal_fires_in_the_current_minute() -> None:
+    context = UserContext(TZ, None, {**DEFAULT_POLICY, "active_window_start": "00:00", "active_window_end": "23:59"})
+    now = datetime(2026, 10, 18, 10, 30, 40, tzinfo=TZ)
+    goal = {
+        "id": 1,
+        "status": "active",
+        "target_date": "2026-10-18",
+        "created_at": (now - timedelta(hours=2)).isoformat(),
+        "last_reminded_at": None,
+        "reminder_ignore_count": 0,
+    }
+    fire_at = next_fire_at(goal, context, now)
+    assert fire_at is not None and fire_at <= now
+    assert plan_day([goal], context, now.date(), now)[1][0] == fire_at
@@ -0,0 +1,65 @@
+"""Mutations build their responses from RETURNING rows; these must match a fresh SELECT."""
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+GOAL_ACTIONS = [
+    ("put", "", {"title": "renamed", "note": "a note", "priority": "high"}),
+    ("post", "/complete", None),
+    ("post", "/snooze", {"minutes": 15}),
+    ("post", "/move-to-tomorrow", None),
+    ("post", "/cancel", None),
+]
+
+
+def _create_goal(client: TestClient, title: str) -> dict[str, Any]:
+    response = client.post("/api/goals", json={"title": title, "note": "note"})
+    assert response.status_code == 200
+    return response.json()["data"]["goal"]
+
+
+def _reselected_goal(client: TestClient, goal_id: int) -> dict[str, Any]:
+    return client.get(f"/api/goals/{goal_id}").json()["data"]["goal"]
+
+
+def _reselected_event(client: TestClient, event: dict[str, Any]) -> dict[str, Any]:
+    items = client.get("/api/goals/events", params={"date": event["created_at"][:10]}).json()["data"]["items"]
+    return next(item for item in items if item["id"] == event["id"])
+
+
+def test_create_goal_matches_reselect(client: TestClient) -> None:
+    goal = _create_goal(client, "created")
+    assert goal == _reselected_goal(client, goal["id"])
+
+
+@pytest.mark.parametrize(("method", "path", "body"), GOAL_ACTIONS, ids=[path or "update" for _, path, _ in GOAL_ACTIONS])
+def test_goal_action_matches_reselect(client: TestClient, method: str, path: str, body: dict[str, Any] | None) -> None:
+    goal = _create_goal(client, f"action{path}")
+    response = client.request(method.upper(), f"/api/goals/{goal['id']}{path}", json=body)
+    assert response.status_code == 200
+    data = response.json()["data"]
+
+    assert data["goal"] == _reselected_goal(client, goal["id"])
+    assert data["goal"]["version"] == goal["version"] + 1
+    assert data["event"] == _reselected_event(client, data["event"])
+    assert data["event"]["goal_id"] == goal["id"]
+
+
+@pytest.mark.parametrize(
+    ("path", "body"),
+    [
+        ("", {"interval_minutes": 45, "quiet_period_enabled": False}),
+        ("/global-pause", {"minutes": 30}),
+        ("/global-pause/clear", None),
+    ],
+    ids=["update", "global-pause", "global-pause-clear"],
+)
+def test_policy_write_matches_reselect(client: TestClient, path: str, body: dict[str, Any] | None) -> None:
+    method = "PUT" if not path else "POST"
+    response = client.request(method, f"/api/reminder-policy{path}", json=body)
+    assert response.status_code == 200
+    policy = response.json()["data"]["policy"]
+    assert policy == client.get("/api/reminder-policy").json()["data"]["policy"]